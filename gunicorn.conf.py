@@ -0,0 +1,59 @@
+"""Gunicorn settings of production web service, tuned for persistent
+database connections. Every value could be overridden with environment variable.
+
+    gunicorn -c gunicorn.conf.py myflights.wsgi
+"""
+
+import os
+import shutil
+import multiprocessing
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+
+# Threaded workers keep serving requests while other threads wait on database.
+# Every thread keeps its own database connection for `DATABASE_CONN_MAX_AGE`,
+# so there are up to `workers * threads` connections, multiplexed by PgBouncer.
+worker_class = 'gthread'
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+
+# Connections from nginx upstream are kept open between requests
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 75))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = timeout
+
+# Workers are restarted now and then to bound growth of in-process caches,
+# with jitter so they don't restart all at once
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = max_requests // 10
+
+# Application is imported once before forking, workers share its memory.
+# Database connections are opened lazily, so none is shared between workers.
+preload_app = True
+
+# Worker heartbeat files are kept in memory instead of container filesystem
+worker_tmp_dir = os.getenv('GUNICORN_WORKER_TMP_DIR', '/dev/shm')
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG')
+
+# Workers write their metrics to files in memory, `metrics` view served
+# by any of them sums up all files. Files of exited workers are added up
+# in a single one, so counters never go backwards as workers are restarted.
+os.environ.setdefault('METRICS_DIR', '/dev/shm/myflights-metrics')
+
+
+def on_starting(server):
+    # Metrics of previous run would be summed up with ones of new workers
+    shutil.rmtree(os.environ['METRICS_DIR'], ignore_errors=True)
+
+
+def worker_exit(server, worker):
+    from myflights.apps.core.metrics import registry
+
+    registry.flush()
+
+
+def child_exit(server, worker):
+    from myflights.apps.core.metrics import registry
+
+    registry.archive(worker.pid)
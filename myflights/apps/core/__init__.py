@@ -0,0 +1 @@
+default_app_config = 'myflights.apps.core.apps.CoreConfig'
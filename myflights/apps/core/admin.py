@@ -1,8 +1,120 @@
+from functools import reduce
+from operator import or_
+
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
 
+from . import resolvers
 from .models import Airline, Airport, Route, Flight
+from .utils import estimated_count
+
+
+class EstimatedCountPaginator(Paginator):
+    """Takes number of objects of unfiltered changelist from planner statistics
+    (`pg_class.reltuples`) instead of `COUNT(*)` scanning the whole table.
+    Filtered changelists and small tables are counted exactly,
+    but no further than `max_count` objects.
+    """
+
+    # Tables with fewer estimated rows are counted exactly
+    exact_count_limit = 10000
+    # Filtered changelists show at most this number of objects
+    max_count = 100000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset.model)
+            if estimate > self.exact_count_limit:
+                return estimate
+        return queryset.order_by().values('pk')[: self.max_count].count()
+
+
+class CodeSearchAdmin(admin.ModelAdmin):
+    """Searches objects by IATA or ICAO code of related Airport or Airline.
+    Codes are resolved to primary keys in memory, so search filters
+    on indexed foreign keys instead of joining and scanning related tables.
+    Numeric terms match primary key, other terms fall back to `search_fields`.
+    """
+
+    # Lookups matched with primary key of Airport or Airline found by code
+    airport_lookups = ()
+    airline_lookups = ()
+    # Search `search_fields` with terms which are neither codes nor numbers
+    text_search = True
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+
+        conditions = []
+        airport = resolvers.airports.by_code(term) if self.airport_lookups else None
+        if airport is not None:
+            conditions += [Q(**{lookup: airport.pk}) for lookup in self.airport_lookups]
+        airline = resolvers.airlines.by_code(term) if self.airline_lookups else None
+        if airline is not None:
+            conditions += [Q(**{lookup: airline.pk}) for lookup in self.airline_lookups]
+
+        if conditions:
+            return queryset.filter(reduce(or_, conditions)), False
+        if term.isdigit():
+            return queryset.filter(pk=int(term)), False
+        if not self.text_search:
+            return queryset.none(), False
+        return super().get_search_results(request, queryset, search_term)
+
+
+@admin.register(Airline)
+class AirlineAdmin(CodeSearchAdmin):
+    list_display = ('name', 'iata', 'icao', 'callsign', 'country', 'is_active')
+    list_filter = ('is_active',)
+    search_fields = ('name', 'callsign')
+    airline_lookups = ('pk',)
+
+
+@admin.register(Airport)
+class AirportAdmin(CodeSearchAdmin):
+    list_display = ('name', 'iata', 'icao', 'city_name', 'country')
+    search_fields = ('name', 'city_name')
+    airport_lookups = ('pk',)
+
+
+@admin.register(Route)
+class RouteAdmin(CodeSearchAdmin):
+    list_display = (
+        'id',
+        'airline',
+        'origin_airport',
+        'destination_airport',
+        'stops',
+        'equipment',
+        'distance_km',
+    )
+    list_select_related = ('airline', 'origin_airport', 'destination_airport')
+    autocomplete_fields = ('airline', 'origin_airport', 'destination_airport')
+    search_fields = ('=equipment',)
+    airport_lookups = ('origin_airport_id', 'destination_airport_id')
+    airline_lookups = ('airline_id',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
 
-admin.site.register(Airline)
-admin.site.register(Airport)
-admin.site.register(Route)
-admin.site.register(Flight)
+@admin.register(Flight)
+class FlightAdmin(CodeSearchAdmin):
+    list_display = ('id', 'route', 'departure_date', 'arrival_date')
+    list_select_related = (
+        'route__origin_airport',
+        'route__destination_airport',
+        'route__airline',
+    )
+    raw_id_fields = ('route',)
+    search_fields = ('=id',)
+    airport_lookups = ('origin_airport_id', 'destination_airport_id')
+    airline_lookups = ('route__airline_id',)
+    text_search = False
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,378 @@
+from django.http import HttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+
+from myflights.apps.core.caching import cache_response
+from myflights.apps.core.models import (
+    Airline,
+    AirlineRouteCount,
+    Airport,
+    AirportDegree,
+    CountryConnectivity,
+    EquipmentUsage,
+    Flight,
+    Route,
+)
+from myflights.apps.core.utils import BadRequest, json_dumps
+
+# Serialized fields of resources. Nested dicts describe related objects,
+# which are fetched with joins of the same query.
+AIRPORT_REF = dict.fromkeys(('id', 'iata', 'icao', 'name'))
+AIRLINE_REF = dict.fromkeys(('id', 'iata', 'icao', 'name'))
+AIRPORT_FIELDS = dict.fromkeys(
+    (
+        'id',
+        'name',
+        'city_name',
+        'country',
+        'iata',
+        'icao',
+        'latitude',
+        'longitude',
+        'altitude',
+        'timezone_offset',
+        'timezone',
+        'openflights_id',
+    )
+)
+AIRLINE_FIELDS = dict.fromkeys(
+    (
+        'id',
+        'name',
+        'alias',
+        'iata',
+        'icao',
+        'callsign',
+        'country',
+        'is_active',
+        'openflights_id',
+    )
+)
+ROUTE_FIELDS = {
+    'id': None,
+    'airline': AIRLINE_REF,
+    'origin_airport': AIRPORT_REF,
+    'destination_airport': AIRPORT_REF,
+    'stops': None,
+    'equipment': None,
+    'distance_km': None,
+}
+FLIGHT_FIELDS = {
+    'id': None,
+    'route': {
+        'id': None,
+        'airline': AIRLINE_REF,
+        'origin_airport': AIRPORT_REF,
+        'destination_airport': AIRPORT_REF,
+    },
+    'departure_date': None,
+    'arrival_date': None,
+}
+
+AIRPORT_DEGREE_FIELDS = {
+    'airport': dict(AIRPORT_REF, country=None),
+    'routes': None,
+    'outgoing_routes': None,
+    'incoming_routes': None,
+    'destinations': None,
+    'origins': None,
+    'airlines': None,
+}
+AIRLINE_ROUTE_COUNT_FIELDS = {
+    'airline': dict(AIRLINE_REF, country=None),
+    'routes': None,
+    'airports': None,
+    'countries': None,
+}
+COUNTRY_CONNECTIVITY_FIELDS = dict.fromkeys(
+    ('origin_country', 'destination_country', 'routes', 'airlines', 'airport_pairs')
+)
+EQUIPMENT_USAGE_FIELDS = dict.fromkeys(('equipment', 'routes', 'airlines'))
+
+
+def lookups(fields, prefix=''):
+    """Flattens serialized fields to lookups of `QuerySet.values`.
+
+    :param fields: serialized fields, nested dicts for related objects.
+    :type fields: Dict[str, Optional[dict]]
+    :param prefix: lookup prefix of related object
+    :type prefix: str
+    :rtype: List[str]
+    """
+
+    result = []
+    for name, nested in fields.items():
+        if nested is None:
+            result.append(prefix + name)
+        else:
+            result.extend(lookups(nested, f'{prefix}{name}__'))
+    return result
+
+
+def nest(row, fields, prefix=''):
+    """Builds nested representation of object from flat row of `QuerySet.values`.
+    Missing related objects are represented with None.
+
+    :param row: values keyed by lookups
+    :type row: Dict[str, Any]
+    :param fields: serialized fields, nested dicts for related objects.
+    :type fields: Dict[str, Optional[dict]]
+    :param prefix: lookup prefix of related object
+    :type prefix: str
+    :rtype: Optional[Dict[str, Any]]
+    """
+
+    if prefix and row[f'{prefix}id'] is None:
+        return None
+
+    return {
+        name: row[prefix + name]
+        if nested is None
+        else nest(row, nested, f'{prefix}{name}__')
+        for name, nested in fields.items()
+    }
+
+
+class JSONResponse(HttpResponse):
+    """HTTP response with data serialized by `json_dumps`.
+    """
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=json_dumps(data), **kwargs)
+
+
+class ResourceView(View):
+    """Read-only JSON resource of model objects.
+    List is paginated with keyset on primary key: next page starts `after`
+    the last primary key of current one, so deep pages cost as much as first one.
+    Query parameters: `after` primary key, `limit` page size and
+    `fields` comma separated subset of serialized fields.
+    """
+
+    http_method_names = ['get', 'head', 'options']
+
+    # Queryset of objects exposed by resource
+    queryset = None
+    # Serialized fields, nested dicts for related objects
+    fields = {}
+    page_size = 100
+    max_page_size = 1000
+
+    def _int_param(self, name, default):
+        """Reads non-negative integer query parameter.
+
+        :param name: parameter name
+        :type name: str
+        :param default: value of missing parameter
+        :type default: Optional[int]
+        :rtype: Optional[int]
+        :raises BadRequest: if value is not a non-negative integer.
+        """
+
+        value = self.request.GET.get(name)
+        if value in (None, ''):
+            return default
+        if not value.isdigit():
+            raise BadRequest(f'{name} must be a non-negative integer')
+        return int(value)
+
+    def _selected_fields(self):
+        """Picks fields selected with `fields` query parameter.
+
+        :rtype: Dict[str, Optional[dict]]
+        :raises BadRequest: if unknown field is selected.
+        """
+
+        selected = self.request.GET.get('fields')
+        if not selected:
+            return self.fields
+
+        names = [name.strip() for name in selected.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise BadRequest(
+                f'Unknown fields {", ".join(unknown)}, '
+                f'choose from {", ".join(self.fields)}'
+            )
+        return {name: self.fields[name] for name in names}
+
+    def _rows(self, queryset, fields):
+        """Queries rows of selected fields, related objects included with joins.
+
+        :param queryset: objects to be serialized
+        :type queryset: django.db.models.QuerySet
+        :param fields: selected fields
+        :type fields: Dict[str, Optional[dict]]
+        :rtype: django.db.models.QuerySet
+        """
+        return queryset.values('pk', *lookups(fields))
+
+    def _filter(self, queryset):
+        """Override to filter listed objects by query parameters.
+
+        :param queryset: listed objects
+        :type queryset: django.db.models.QuerySet
+        :rtype: django.db.models.QuerySet
+        :raises BadRequest: if parameter is invalid.
+        """
+        return queryset
+
+    def get(self, request, pk=None):
+        try:
+            fields = self._selected_fields()
+            if pk is not None:
+                return self.detail(pk, fields)
+            return self.list(fields)
+        except BadRequest as e:
+            return JSONResponse({'error': str(e)}, status=400)
+
+    def detail(self, pk, fields):
+        """Responds with single object.
+
+        :param pk: primary key
+        :type pk: int
+        :param fields: selected fields
+        :type fields: Dict[str, Optional[dict]]
+        :rtype: JSONResponse
+        """
+
+        row = self._rows(self.queryset.filter(pk=pk), fields).first()
+        if row is None:
+            return JSONResponse({'error': 'Not found'}, status=404)
+        return JSONResponse(nest(row, fields))
+
+    def list(self, fields):
+        """Responds with page of objects ordered by primary key
+        and link to the next page if there is one.
+
+        :param fields: selected fields
+        :type fields: Dict[str, Optional[dict]]
+        :rtype: JSONResponse
+        """
+
+        after = self._int_param('after', None)
+        limit = self._int_param('limit', self.page_size)
+        if not 1 <= limit <= self.max_page_size:
+            raise BadRequest(f'limit must be between 1 and {self.max_page_size}')
+
+        queryset = self._filter(self.queryset).order_by('pk')
+        if after is not None:
+            queryset = queryset.filter(pk__gt=after)
+        rows = list(self._rows(queryset, fields)[: limit + 1])
+
+        next_url = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            params = self.request.GET.copy()
+            params['after'] = rows[-1]['pk']
+            next_url = f'{self.request.path}?{params.urlencode()}'
+
+        return JSONResponse(
+            {'results': [nest(row, fields) for row in rows], 'next': next_url}
+        )
+
+
+@method_decorator(cache_response, name='dispatch')
+class AirportResource(ResourceView):
+    queryset = Airport.objects.alive()
+    fields = AIRPORT_FIELDS
+
+
+@method_decorator(cache_response, name='dispatch')
+class AirlineResource(ResourceView):
+    queryset = Airline.objects.alive()
+    fields = AIRLINE_FIELDS
+
+
+@method_decorator(cache_response, name='dispatch')
+class RouteResource(ResourceView):
+    """Routes, filtered by distance range with `min_distance_km`
+    and `max_distance_km` query parameters.
+    """
+
+    queryset = Route.objects.alive()
+    fields = ROUTE_FIELDS
+
+    def _filter(self, queryset):
+        return queryset.distance_between(
+            self._int_param('min_distance_km', None),
+            self._int_param('max_distance_km', None),
+        )
+
+
+class FlightResource(ResourceView):
+    queryset = Flight.objects.all()
+    fields = FLIGHT_FIELDS
+
+
+@method_decorator(cache_response, name='dispatch')
+class StatisticsView(ResourceView):
+    """Read-only JSON list of precomputed statistics, the highest counts first.
+    Query parameters: `order` counter to order by, `limit` number of rows,
+    `fields` comma separated subset of serialized fields and filters
+    of `filters`, e.g. country codes.
+    """
+
+    # Counters rows could be ordered by, the first one is default
+    orderings = ()
+    # Lookups of case insensitive filters by query parameter
+    filters = {}
+
+    def list(self, fields):
+        """Responds with top rows by selected counter.
+
+        :param fields: selected fields
+        :type fields: Dict[str, Optional[dict]]
+        :rtype: JSONResponse
+        """
+
+        order = self.request.GET.get('order') or self.orderings[0]
+        if order not in self.orderings:
+            raise BadRequest(f'order must be one of {", ".join(self.orderings)}')
+        limit = self._int_param('limit', self.page_size)
+        if not 1 <= limit <= self.max_page_size:
+            raise BadRequest(f'limit must be between 1 and {self.max_page_size}')
+
+        queryset = self.queryset.order_by(f'-{order}', 'pk')
+        for name, lookup in self.filters.items():
+            value = self.request.GET.get(name)
+            if value:
+                queryset = queryset.filter(**{lookup: value.strip().upper()})
+        rows = self._rows(queryset, fields)[:limit]
+
+        return JSONResponse({'results': [nest(row, fields) for row in rows]})
+
+
+class AirportStatistics(StatisticsView):
+    queryset = AirportDegree.objects.all()
+    fields = AIRPORT_DEGREE_FIELDS
+    orderings = (
+        'routes',
+        'outgoing_routes',
+        'incoming_routes',
+        'destinations',
+        'origins',
+        'airlines',
+    )
+    filters = {'country': 'airport__country'}
+
+
+class AirlineStatistics(StatisticsView):
+    queryset = AirlineRouteCount.objects.all()
+    fields = AIRLINE_ROUTE_COUNT_FIELDS
+    orderings = ('routes', 'airports', 'countries')
+    filters = {'country': 'airline__country'}
+
+
+class CountryStatistics(StatisticsView):
+    queryset = CountryConnectivity.objects.all()
+    fields = COUNTRY_CONNECTIVITY_FIELDS
+    orderings = ('routes', 'airlines', 'airport_pairs')
+    filters = {'origin': 'origin_country', 'destination': 'destination_country'}
+
+
+class EquipmentStatistics(StatisticsView):
+    queryset = EquipmentUsage.objects.all()
+    fields = EQUIPMENT_USAGE_FIELDS
+    orderings = ('routes', 'airlines')
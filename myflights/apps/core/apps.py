@@ -2,4 +2,8 @@ from django.apps import AppConfig
 
 
 class CoreConfig(AppConfig):
-    name = 'core'
+    name = 'myflights.apps.core'
+    label = 'core'
+
+    def ready(self):
+        from myflights.apps.core import signals  # noqa: F401
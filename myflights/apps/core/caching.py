@@ -0,0 +1,185 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from myflights.apps.core.versioning import current_state
+
+
+class LRUCache:
+    """Mapping kept in process memory and bounded by number of entries,
+    the least recently used entries are evicted first.
+    """
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Returns cached value, None if it is missing.
+
+        :param key: key
+        :type key: str
+        :rtype: Any
+        """
+
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, size):
+        """Caches value, evicting the least recently used values over size.
+
+        :param key: key
+        :type key: str
+        :param value: value
+        :type value: Any
+        :param size: max number of entries
+        :type size: int
+        """
+
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class ResponseCache:
+    """Content of responses of current dataset version, keyed by request path
+    and query parameters. Responses are kept in process memory,
+    up to `RESPONSE_CACHE_SIZE` of the most recently used ones.
+    If `RESPONSE_CACHE` names one of `CACHES`, like shared Redis cache,
+    responses are kept there too, so other processes don't render them again.
+    """
+
+    def __init__(self):
+        self.local = LRUCache()
+        self.version = None
+
+    def key(self, request, version):
+        """Makes cache key of request, independent of query parameters order.
+
+        :param request: HTTP request
+        :type request: django.http.HttpRequest
+        :param version: dataset version
+        :type version: int
+        :rtype: str
+        """
+
+        query = urlencode(
+            sorted(
+                (name, value)
+                for name, values in request.GET.lists()
+                for value in values
+            )
+        )
+        digest = hashlib.md5(f'{request.path}?{query}'.encode()).hexdigest()
+        return f'responses:{version}:{digest}'
+
+    def get(self, key, version):
+        """Returns cached content and content type, None if response is not cached.
+
+        :param key: cache key
+        :type key: str
+        :param version: dataset version of key
+        :type version: int
+        :rtype: Optional[Tuple[bytes, str]]
+        """
+
+        if self.version != version:
+            # Responses of previous versions will never be requested again
+            self.local.clear()
+            self.version = version
+
+        entry = self.local.get(key)
+        if entry is None and settings.RESPONSE_CACHE is not None:
+            entry = caches[settings.RESPONSE_CACHE].get(key)
+            if entry is not None:
+                self.local.set(key, entry, settings.RESPONSE_CACHE_SIZE)
+        return entry
+
+    def set(self, key, entry):
+        """Caches response content and content type in both tiers.
+
+        :param key: cache key
+        :type key: str
+        :param entry: content and content type
+        :type entry: Tuple[bytes, str]
+        """
+
+        self.local.set(key, entry, settings.RESPONSE_CACHE_SIZE)
+        if settings.RESPONSE_CACHE is not None:
+            caches[settings.RESPONSE_CACHE].set(
+                key, entry, settings.RESPONSE_CACHE_TIMEOUT
+            )
+
+    def clear(self):
+        """Drops responses kept in process memory.
+        """
+        self.local.clear()
+
+
+# Responses shared by all requests of the process
+responses = ResponseCache()
+
+
+def cache_response(view):
+    """Caches successful GET responses of view which depends on request path,
+    query parameters and Airports, Airlines and Routes only.
+    Responses are cached until dataset version changes and carry `ETag`
+    of dataset version and `Last-Modified` time of its bump, so clients
+    and proxies revalidate them with conditional requests answered with 304
+    without running view. Disabled if `RESPONSE_CACHE_SIZE` is 0.
+
+    :param view: view function
+    :type view: Callable[..., django.http.HttpResponse]
+    :rtype: Callable[..., django.http.HttpResponse]
+    """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not settings.RESPONSE_CACHE_SIZE or request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+
+        version, updated_at = current_state()
+        etag = f'W/"{version}"'
+        last_modified = int(updated_at.timestamp()) if updated_at else None
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            key = responses.key(request, version)
+            entry = responses.get(key, version)
+            if entry is not None:
+                content, content_type = entry
+                response = HttpResponse(content, content_type=content_type)
+            else:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200 or response.streaming:
+                    return response
+                responses.set(key, (response.content, response['Content-Type']))
+
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(
+            response, public=True, max_age=settings.RESPONSE_CACHE_MAX_AGE
+        )
+        return response
+
+    return wrapper
@@ -0,0 +1,28 @@
+import numpy as np
+
+# Mean Earth radius
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Calculates great-circle distance between points given in degrees.
+    Accepts scalars or numpy arrays of the same shape, which are processed vectorized.
+
+    :param lat1: latitude of first point(s)
+    :type lat1: Union[float, numpy.ndarray]
+    :param lon1: longitude of first point(s)
+    :type lon1: Union[float, numpy.ndarray]
+    :param lat2: latitude of second point(s)
+    :type lat2: Union[float, numpy.ndarray]
+    :param lon2: longitude of second point(s)
+    :type lon2: Union[float, numpy.ndarray]
+    :returns: distance(s) in kilometers
+    :rtype: Union[float, numpy.ndarray]
+    """
+
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
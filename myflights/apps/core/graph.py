@@ -0,0 +1,418 @@
+import heapq
+from collections import defaultdict, namedtuple
+from itertools import count
+
+import numpy as np
+
+from myflights.apps.core.geo import haversine_km
+from myflights.apps.core.models import Airline, Airport, Route
+from myflights.apps.core.versioning import VersionedCache
+
+Leg = namedtuple('Leg', ['origin', 'destination', 'distance_km', 'airlines'])
+Itinerary = namedtuple('Itinerary', ['distance_km', 'legs'])
+
+
+class RouteGraph:
+    """Directed graph of Routes between Airports kept in compressed sparse row
+    (CSR) arrays: outgoing edges of airport node `n` are `indptr[n]:indptr[n + 1]`.
+    Every edge joins all Routes between the same pair of Airports,
+    its weight is great-circle distance between them.
+    Nodes are Airports sorted by primary key.
+    """
+
+    def __init__(self, airports, airlines, routes):
+        """Initializes `RouteGraph` instance.
+
+        :param airports: rows of Airport pk, iata, icao, name, latitude and longitude.
+        :type airports: Iterable[Tuple[int, str, str, str, float, float]]
+        :param airlines: rows of Airline pk, iata, icao and name.
+        :type airlines: Iterable[Tuple[int, str, str, str]]
+        :param routes: rows of Route origin and destination Airport pks and Airline pk.
+        :type routes: Iterable[Tuple[int, int, Optional[int]]]
+        """
+
+        airports = sorted(airports)
+        self.airport_pks = np.array([row[0] for row in airports], dtype=np.int64)
+        self.latitudes = np.array([row[4] for row in airports], dtype=np.float64)
+        self.longitudes = np.array([row[5] for row in airports], dtype=np.float64)
+        self.airports = {
+            pk: (iata, icao, name) for pk, iata, icao, name, *_ in airports
+        }
+
+        self.airport_codes = {}
+        for pk, iata, icao, *_ in airports:
+            for code in (iata, icao):
+                if code:
+                    self.airport_codes.setdefault(code.upper(), pk)
+
+        self.airlines = {}
+        self.airline_codes = defaultdict(list)
+        for pk, iata, icao, name in airlines:
+            self.airlines[pk] = (iata, icao, name)
+            for code in {iata, icao} - {None, ''}:
+                self.airline_codes[code.upper()].append(pk)
+
+        routes = np.array(
+            [
+                (origin, destination, -1 if airline is None else airline)
+                for origin, destination, airline in routes
+            ],
+            dtype=np.int64,
+        ).reshape(-1, 3)
+        self._build_edges(routes)
+
+    def _nodes(self, pks):
+        """Maps Airport pks to node indices, unknown Airports are mapped to -1.
+
+        :param pks: Airport primary keys
+        :type pks: numpy.ndarray
+        :rtype: numpy.ndarray
+        """
+
+        if not len(self.airport_pks):
+            return np.full(len(pks), -1)
+
+        nodes = np.searchsorted(self.airport_pks, pks)
+        nodes = np.minimum(nodes, len(self.airport_pks) - 1)
+        return np.where(self.airport_pks[nodes] == pks, nodes, -1)
+
+    def _build_edges(self, routes):
+        """Builds CSR arrays of edges and per edge arrays of operating Airlines.
+
+        :param routes: array of origin Airport pk, destination Airport pk
+        and Airline pk (-1 if unknown) rows.
+        :type routes: numpy.ndarray
+        """
+
+        origins = self._nodes(routes[:, 0])
+        destinations = self._nodes(routes[:, 1])
+        airlines = routes[:, 2]
+
+        valid = (origins >= 0) & (destinations >= 0) & (origins != destinations)
+        origins, destinations, airlines = (
+            origins[valid],
+            destinations[valid],
+            airlines[valid],
+        )
+
+        order = np.lexsort((airlines, destinations, origins))
+        origins, destinations, airlines = (
+            origins[order],
+            destinations[order],
+            airlines[order],
+        )
+
+        changed = np.ones(len(origins), dtype=bool)
+        changed[1:] = (np.diff(origins) != 0) | (np.diff(destinations) != 0)
+        duplicated = np.zeros(len(origins), dtype=bool)
+        duplicated[1:] = ~changed[1:] & (np.diff(airlines) == 0)
+        keep = ~duplicated
+        origins, destinations, airlines, changed = (
+            origins[keep],
+            destinations[keep],
+            airlines[keep],
+            changed[keep],
+        )
+
+        starts = np.flatnonzero(changed)
+        edge_origins = origins[starts]
+        edge_destinations = destinations[starts]
+
+        self.indptr = np.zeros(len(self.airport_pks) + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(edge_origins, minlength=len(self.airport_pks)),
+            out=self.indptr[1:],
+        )
+        self.indices = edge_destinations
+        self.weights = haversine_km(
+            self.latitudes[edge_origins],
+            self.longitudes[edge_origins],
+            self.latitudes[edge_destinations],
+            self.longitudes[edge_destinations],
+        )
+        self.airline_indptr = np.append(starts, len(airlines))
+        self.edge_airlines = airlines
+
+        # Plain lists are much faster than numpy arrays for scalar access in search
+        self._indptr = self.indptr.tolist()
+        self._indices = self.indices.tolist()
+        self._weights = self.weights.tolist()
+        self._airline_indptr = self.airline_indptr.tolist()
+        self._edge_airlines = self.edge_airlines.tolist()
+
+    @classmethod
+    def from_database(cls):
+        """Builds graph of all Routes between Airports not deleted from dataset.
+
+        :rtype: RouteGraph
+        """
+
+        return cls(
+            Airport.objects.alive().values_list(
+                'pk', 'iata', 'icao', 'name', 'latitude', 'longitude'
+            ),
+            Airline.objects.alive().values_list('pk', 'iata', 'icao', 'name'),
+            Route.objects.alive()
+            .values_list('origin_airport_id', 'destination_airport_id', 'airline_id')
+            .iterator(),
+        )
+
+    @property
+    def edge_count(self):
+        """Number of edges, i.e. directly connected pairs of Airports.
+
+        :rtype: int
+        """
+        return len(self.indices)
+
+    def airport_by_code(self, code):
+        """Finds Airport pk by IATA or ICAO code. Returns None if Airport not found.
+
+        :param code: 3-letter IATA or 4-letter ICAO code
+        :type code: str
+        :rtype: Optional[int]
+        """
+        return self.airport_codes.get(code.strip().upper())
+
+    def airlines_by_code(self, code):
+        """Finds pks of all Airlines with given IATA or ICAO code.
+
+        :param code: 2-letter IATA or 3-letter ICAO code
+        :type code: str
+        :rtype: List[int]
+        """
+        return self.airline_codes.get(code.strip().upper(), [])
+
+    def _node(self, pk):
+        """Maps Airport pk to node index.
+
+        :param pk: Airport primary key
+        :type pk: int
+        :rtype: int
+        :raises KeyError: if Airport is not in the graph.
+        """
+
+        node = int(self._nodes(np.array([pk]))[0])
+        if node < 0:
+            raise KeyError(pk)
+        return node
+
+    def _allowed_edges(self, airlines):
+        """Marks edges operated by any of given Airlines.
+
+        :param airlines: Airline primary keys
+        :type airlines: Iterable[int]
+        :rtype: List[bool]
+        """
+
+        operated = np.isin(self.edge_airlines, list(airlines)).astype(np.int64)
+        if not len(operated):
+            return []
+        return (np.add.reduceat(operated, self.airline_indptr[:-1]) > 0).tolist()
+
+    def _search(
+        self, source, target, allowed=None, banned_edges=(), banned_nodes=(), legs=None
+    ):
+        """Finds shortest path between nodes with A* search guided by
+        great-circle distance to target, which never overestimates remaining distance.
+        When number of legs is limited search state is (node, legs), and state is
+        skipped if node was already reached with fewer legs, since it was reached
+        with shorter distance too.
+
+        :param source: source node
+        :type source: int
+        :param target: target node
+        :type target: int
+        :param allowed: flags of edges allowed to be used. Default is all edges
+        :type allowed: List[bool]
+        :param banned_edges: edges not allowed to be used.
+        :type banned_edges: Set[int]
+        :param banned_nodes: nodes not allowed to be visited.
+        :type banned_nodes: Set[int]
+        :param legs: max number of edges in path. Default is unlimited
+        :type legs: int
+        :returns: distance, nodes and edges of path or None if there is no path.
+        :rtype: Optional[Tuple[float, Tuple[int, ...], Tuple[int, ...]]]
+        """
+
+        indptr, indices, weights = self._indptr, self._indices, self._weights
+        estimates = haversine_km(
+            self.latitudes,
+            self.longitudes,
+            self.latitudes[target],
+            self.longitudes[target],
+        ).tolist()
+
+        tie = count()
+        queue = [(estimates[source], 0.0, 0, next(tie), source, None)]
+        reached = {}
+
+        while queue:
+            _, distance, used, _, node, path = heapq.heappop(queue)
+            if reached.get(node, used + 1) <= used:
+                continue
+            reached[node] = used
+
+            if node == target:
+                edges = []
+                while path is not None:
+                    edge, path = path
+                    edges.append(edge)
+                edges.reverse()
+                nodes = (source,) + tuple(indices[edge] for edge in edges)
+                return distance, nodes, tuple(edges)
+
+            if legs is not None and used >= legs:
+                continue
+
+            for edge in range(indptr[node], indptr[node + 1]):
+                if allowed is not None and not allowed[edge]:
+                    continue
+                if edge in banned_edges:
+                    continue
+                neighbour = indices[edge]
+                if neighbour in banned_nodes:
+                    continue
+                if reached.get(neighbour, used + 2) <= used + 1:
+                    continue
+                neighbour_distance = distance + weights[edge]
+                heapq.heappush(
+                    queue,
+                    (
+                        neighbour_distance + estimates[neighbour],
+                        neighbour_distance,
+                        used + 1,
+                        next(tie),
+                        neighbour,
+                        (edge, path),
+                    ),
+                )
+
+        return None
+
+    def _itinerary(self, nodes, edges, airlines=None):
+        """Describes path as itinerary.
+
+        :param nodes: path nodes
+        :type nodes: Tuple[int, ...]
+        :param edges: path edges
+        :type edges: Tuple[int, ...]
+        :param airlines: allowed Airline pks. Default is all Airlines
+        :type airlines: Set[int]
+        :rtype: Itinerary
+        """
+
+        legs = []
+        for origin, destination, edge in zip(nodes, nodes[1:], edges):
+            start, end = self._airline_indptr[edge], self._airline_indptr[edge + 1]
+            operators = [
+                airline
+                for airline in self._edge_airlines[start:end]
+                if airline >= 0 and (airlines is None or airline in airlines)
+            ]
+            legs.append(
+                Leg(
+                    int(self.airport_pks[origin]),
+                    int(self.airport_pks[destination]),
+                    self._weights[edge],
+                    operators,
+                )
+            )
+
+        return Itinerary(sum(leg.distance_km for leg in legs), legs)
+
+    def shortest_path(self, origin, destination, max_stops=None, airlines=None):
+        """Finds shortest itinerary between Airports.
+
+        :param origin: origin Airport pk
+        :type origin: int
+        :param destination: destination Airport pk
+        :type destination: int
+        :param max_stops: max number of intermediate Airports. Default is unlimited
+        :type max_stops: int
+        :param airlines: pks of Airlines allowed to operate legs. Default is any Airline
+        :type airlines: Iterable[int]
+        :returns: shortest itinerary or None if Airports are not connected.
+        :rtype: Optional[Itinerary]
+        """
+
+        itineraries = self.itineraries(origin, destination, 1, max_stops, airlines)
+        return itineraries[0] if itineraries else None
+
+    def itineraries(self, origin, destination, k=1, max_stops=None, airlines=None):
+        """Finds up to `k` shortest loopless itineraries between Airports
+        with Yen's algorithm, ordered by distance.
+
+        :param origin: origin Airport pk
+        :type origin: int
+        :param destination: destination Airport pk
+        :type destination: int
+        :param k: max number of itineraries
+        :type k: int
+        :param max_stops: max number of intermediate Airports. Default is unlimited
+        :type max_stops: int
+        :param airlines: pks of Airlines allowed to operate legs. Default is any Airline
+        :type airlines: Iterable[int]
+        :rtype: List[Itinerary]
+        :raises KeyError: if origin or destination Airport is not in the graph.
+        """
+
+        source, target = self._node(origin), self._node(destination)
+        if source == target:
+            return []
+
+        allowed = None
+        if airlines is not None:
+            airlines = set(airlines)
+            allowed = self._allowed_edges(airlines)
+        legs = None if max_stops is None else max_stops + 1
+
+        shortest = self._search(source, target, allowed, legs=legs)
+        if shortest is None:
+            return []
+
+        paths = [shortest]
+        seen = {shortest[2]}
+        candidates = []
+
+        while len(paths) < k:
+            _, nodes, edges = paths[-1]
+
+            for i in range(len(edges)):
+                root = edges[:i]
+                banned_edges = {
+                    path_edges[i]
+                    for _, _, path_edges in paths
+                    if len(path_edges) > i and path_edges[:i] == root
+                }
+                spur = self._search(
+                    nodes[i],
+                    target,
+                    allowed,
+                    banned_edges,
+                    set(nodes[:i]),
+                    None if legs is None else legs - i,
+                )
+                if spur is None:
+                    continue
+
+                _, spur_nodes, spur_edges = spur
+                path_edges = root + spur_edges
+                if path_edges in seen:
+                    continue
+                seen.add(path_edges)
+
+                distance = sum(self._weights[edge] for edge in path_edges)
+                heapq.heappush(
+                    candidates, (distance, nodes[:i] + spur_nodes, path_edges)
+                )
+
+            if not candidates:
+                break
+            paths.append(heapq.heappop(candidates))
+
+        return [self._itinerary(nodes, edges, airlines) for _, nodes, edges in paths]
+
+
+# Graph shared by all requests of the process, rebuilt when dataset changes
+route_graph = VersionedCache(RouteGraph.from_database)
@@ -0,0 +1,305 @@
+import io
+import sys
+import logging
+from abc import ABC, abstractmethod
+from datetime import date, datetime, time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, models, transaction
+
+
+class BaseLoader(ABC):
+    """Abstract class that provides interface to save batches of model objects
+    to database. Use as context manager, loading is finished on exit.
+    """
+
+    def __init__(self, Model, batch_size=100):
+        """Initializes `BaseLoader` instance.
+
+        :param Model: model class of objects to be saved.
+        :type Model: Type[django.db.models.Model]
+        :param batch_size: max number of objects saved with single statement.
+        :type batch_size: int
+        """
+
+        self.Model = Model
+        self.batch_size = batch_size
+        self.saved = 0
+
+    def _log(self, msg):
+        """Logs tagged warning messages.
+
+        :param msg: message to be logged
+        :type msg: str
+        """
+
+        logging.warning(f'[{self.Model}] {msg}')
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.finish()
+
+    def start(self):
+        """Override to prepare database before first batch is written.
+        """
+        pass
+
+    @abstractmethod
+    def write(self, objects):
+        """Abstract method. Save given batch of model objects in subclasses.
+
+        :param objects: model objects to be saved.
+        :type objects: List[django.db.models.Model]
+        """
+        pass
+
+    def finish(self):
+        """Override to complete loading after last batch is written.
+        """
+        pass
+
+
+class ORMLoader(BaseLoader):
+    """Saves objects with `bulk_create`.
+    """
+
+    def write(self, objects):
+        """Saves given batch of model objects using `bulk_create`.
+
+        :param objects: model objects to be saved.
+        :type objects: List[django.db.models.Model]
+        """
+
+        self.Model.objects.bulk_create(objects, self.batch_size)
+        self.saved += len(objects)
+
+
+class CopyLoader(BaseLoader):
+    """Streams rows into temporary staging table with PostgreSQL `COPY ... FROM STDIN`
+    and moves them to model's table with single `INSERT ... SELECT` on exit.
+    Rows referring to missing objects are reported and skipped before insertion.
+    Whole load runs in one transaction.
+    """
+
+    def __init__(self, Model, batch_size=100):
+        """Initializes `CopyLoader` instance.
+
+        :param Model: model class of objects to be saved.
+        :type Model: Type[django.db.models.Model]
+        :param batch_size: kept for compatibility, every written batch is sent
+        with single `COPY` statement.
+        :type batch_size: int
+        """
+
+        if connection.vendor != 'postgresql':
+            raise ImproperlyConfigured('CopyLoader requires PostgreSQL database')
+
+        super().__init__(Model, batch_size)
+
+        self.fields = [
+            field
+            for field in Model._meta.concrete_fields
+            if not isinstance(field, models.AutoField)
+        ]
+        self.table = connection.ops.quote_name(Model._meta.db_table)
+        self.staging_table = connection.ops.quote_name(
+            f'staging_{Model._meta.db_table}'
+        )
+        self.atomic = transaction.atomic()
+
+    @property
+    def columns(self):
+        """Quoted and comma separated columns of all loaded fields.
+
+        :rtype: str
+        """
+        return ', '.join(
+            connection.ops.quote_name(field.column) for field in self.fields
+        )
+
+    def _execute(self, sql, params=None):
+        """Executes SQL statement and returns number of affected rows.
+
+        :param sql: SQL statement
+        :type sql: str
+        :param params: statement parameters
+        :type params: List[Any]
+        :rtype: int
+        """
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount
+
+    def start(self):
+        """Opens transaction and creates empty staging table.
+        """
+
+        self.atomic.__enter__()
+        self._execute(
+            f'CREATE TEMPORARY TABLE {self.staging_table} ON COMMIT DROP AS '
+            f'SELECT {self.columns} FROM {self.table} WITH NO DATA'
+        )
+
+    def _row(self, obj):
+        """Converts model object to sequence of database values in `fields` order.
+
+        :param obj: model object
+        :type obj: django.db.models.Model
+        :rtype: List[Any]
+        """
+
+        return [
+            field.get_db_prep_save(field.pre_save(obj, add=True), connection)
+            for field in self.fields
+        ]
+
+    def write(self, objects):
+        """Copies given batch of model objects to staging table.
+
+        :param objects: model objects to be saved.
+        :type objects: List[django.db.models.Model]
+        """
+
+        self.write_rows(self._row(obj) for obj in objects)
+
+    def write_rows(self, rows):
+        """Copies rows of database values in `fields` order to staging table.
+        Use to load large amount of data without creating model objects.
+
+        :param rows: rows of database values.
+        :type rows: Iterable[Sequence[Any]]
+        """
+
+        buffer = io.StringIO()
+        count = 0
+        for row in rows:
+            buffer.write('\t'.join(copy_value(value) for value in row))
+            buffer.write('\n')
+            count += 1
+        buffer.seek(0)
+
+        self.write_text(buffer, count)
+
+    def write_text(self, buffer, count):
+        """Copies rows already formatted for PostgreSQL `COPY` text format,
+        with columns in `fields` order, to staging table.
+        Use when rows are formatted in bulk, for example with NumPy.
+
+        :param buffer: text file object with tab separated lines.
+        :type buffer: TextIO
+        :param count: number of rows in buffer
+        :type count: int
+        """
+
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {self.staging_table} ({self.columns}) FROM STDIN', buffer
+            )
+
+        self.saved += count
+
+    def _discard_unresolved(self):
+        """Reports and deletes staged rows with foreign keys referring to missing objects.
+        """
+
+        for field in self.fields:
+            if not field.is_relation:
+                continue
+
+            column = connection.ops.quote_name(field.column)
+            target = field.target_field
+            condition = (
+                f's.{column} IS NOT NULL AND NOT EXISTS ('
+                f'SELECT 1 FROM {connection.ops.quote_name(target.model._meta.db_table)} t '
+                f'WHERE t.{connection.ops.quote_name(target.column)} = s.{column})'
+            )
+
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT DISTINCT s.{column} FROM {self.staging_table} s '
+                    f'WHERE {condition} ORDER BY 1 LIMIT 10'
+                )
+                samples = [value for value, in cursor.fetchall()]
+
+            if not samples:
+                continue
+
+            discarded = self._execute(
+                f'DELETE FROM {self.staging_table} s WHERE {condition}'
+            )
+            self._log(
+                f'{discarded} rows won\'t be imported due to missing '
+                f'{target.model.__name__} referenced by {field.name}: {samples}'
+            )
+
+    def finish(self):
+        """Moves staged rows to model's table.
+        """
+
+        self._discard_unresolved()
+        self.saved = self._execute(
+            f'INSERT INTO {self.table} ({self.columns}) '
+            f'SELECT {self.columns} FROM {self.staging_table}'
+        )
+        self._execute(f'DROP TABLE {self.staging_table}')
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Finishes loading and commits transaction,
+        rolls it back if loading was interrupted by exception.
+        """
+
+        try:
+            super().__exit__(exc_type, exc_value, traceback)
+        except Exception:
+            self.atomic.__exit__(*sys.exc_info())
+            raise
+        else:
+            self.atomic.__exit__(exc_type, exc_value, traceback)
+
+
+def copy_value(value):
+    """Formats database value for PostgreSQL `COPY` text format.
+
+    :param value: database value
+    :type value: Any
+    :rtype: str
+    """
+
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+
+LOADERS = {'orm': ORMLoader, 'copy': CopyLoader}
+
+
+def get_loader_class(name):
+    """Returns loader class registered under given name.
+
+    :param name: loader name, one of `LOADERS` keys.
+    :type name: str
+    :rtype: Type[BaseLoader]
+    """
+
+    try:
+        return LOADERS[name]
+    except KeyError:
+        raise ImproperlyConfigured(
+            f'Unknown loader {name!r}, choose one of {", ".join(LOADERS)}'
+        )
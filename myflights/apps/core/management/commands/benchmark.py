@@ -0,0 +1,451 @@
+import csv
+import json
+import time
+import shutil
+import logging
+import platform
+import statistics
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+
+from myflights.apps.core.models import Airline, Airport, Flight, Route
+
+DATA_DIR = Path('data')
+# Scaled datasets are kept between runs, next to country names cache
+SYNTHETIC_DIR = DATA_DIR / '.cache' / 'benchmark'
+BASELINE_FILE = Path('benchmarks') / 'baseline.json'
+# Files copied to every scaled dataset as they are
+SHARED_FILES = ('metadata.json', 'country_aliases.json')
+# Columns of OpenFlights ids in CSV files, by file and referenced file
+ID_COLUMNS = {
+    'airlines.csv': {0: 'airlines.csv'},
+    'airports.csv': {0: 'airports.csv'},
+    'routes.csv': {1: 'airlines.csv', 3: 'airports.csv', 5: 'airports.csv'},
+}
+
+
+def _id(value):
+    """Parses OpenFlights id from CSV, returns None for missing or malformed ones.
+
+    :param value: CSV field
+    :type value: str
+    :rtype: Optional[int]
+    """
+
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def scale_dataset(source_dir, target_dir, scale):
+    """Writes synthetic dataset made of `scale` copies of OpenFlights CSV files.
+    Every copy gets its own range of OpenFlights ids and Routes of a copy refer
+    to Airports and Airlines of the same copy, so copies are independent networks.
+
+    :param source_dir: directory with original CSV files and metadata
+    :type source_dir: pathlib.Path
+    :param target_dir: directory of scaled dataset, created if missing
+    :type target_dir: pathlib.Path
+    :param scale: number of copies
+    :type scale: int
+    """
+
+    target_dir.mkdir(parents=True, exist_ok=True)
+    for name in SHARED_FILES:
+        if (source_dir / name).exists():
+            shutil.copyfile(source_dir / name, target_dir / name)
+
+    rows = {}
+    for name in ID_COLUMNS:
+        with open(source_dir / name, newline='') as f:
+            rows[name] = list(csv.reader(f))
+
+    # Ids of every copy are shifted past the largest id of the original file
+    offsets = {
+        name: max(filter(None, (_id(row[0]) for row in rows[name])), default=0) + 1
+        for name in ('airlines.csv', 'airports.csv')
+    }
+
+    for name, columns in ID_COLUMNS.items():
+        with open(target_dir / name, 'w', newline='') as f:
+            writer = csv.writer(f)
+            for copy in range(scale):
+                for row in rows[name]:
+                    row = list(row)
+                    for column, referenced in columns.items():
+                        value = _id(row[column])
+                        if value is not None:
+                            row[column] = str(value + copy * offsets[referenced])
+                    writer.writerow(row)
+
+
+def measure(func, repeat=1, warmup=0):
+    """Calls function repeatedly and summarizes elapsed times.
+
+    :param func: function without arguments
+    :type func: Callable[[], Any]
+    :param repeat: number of measured calls
+    :type repeat: int
+    :param warmup: number of calls before measured ones
+    :type warmup: int
+    :returns: number of runs, min, median and mean seconds
+    :rtype: Dict[str, float]
+    """
+
+    for _ in range(warmup):
+        func()
+
+    elapsed = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed.append(time.perf_counter() - started)
+
+    return {
+        'runs': repeat,
+        'min': min(elapsed),
+        'median': statistics.median(elapsed),
+        'mean': statistics.mean(elapsed),
+    }
+
+
+def compare(results, baseline, max_ratio):
+    """Compares median times of benchmarks present in both results.
+
+    :param results: current results by scale and benchmark name
+    :type results: Dict[str, Dict[str, Dict[str, float]]]
+    :param baseline: baseline results of the same shape
+    :type baseline: Dict[str, Dict[str, Dict[str, float]]]
+    :param max_ratio: ratio of current to baseline median considered a regression
+    :type max_ratio: float
+    :returns: scale, benchmark name, baseline and current medians, their ratio
+    and whether it is a regression.
+    :rtype: List[Tuple[str, str, float, float, float, bool]]
+    """
+
+    comparison = []
+    for scale, benchmarks in results.items():
+        for name, stats in benchmarks.items():
+            base = baseline.get(scale, {}).get(name)
+            if base is None:
+                continue
+            ratio = stats['median'] / base['median'] if base['median'] else 1.0
+            comparison.append(
+                (scale, name, base['median'], stats['median'], ratio, ratio > max_ratio)
+            )
+    return comparison
+
+
+def sample_queries():
+    """Makes representative ORM queries, parameterized with the busiest Airport
+    and Airline of imported data so they are the same between runs.
+
+    :returns: functions evaluating queries by benchmark name
+    :rtype: Dict[str, Callable[[], Any]]
+    """
+
+    airport = (
+        Airport.objects.annotate(route_count=Count('outgoing_routes'))
+        .order_by('-route_count', 'pk')
+        .first()
+    )
+    airline = (
+        Airline.objects.exclude(icao=None)
+        .annotate(route_count=Count('routes'))
+        .order_by('-route_count', 'pk')
+        .first()
+    )
+    if airport is None or airline is None:
+        return {}
+
+    middle = Route.objects.order_by('pk').values_list('pk', flat=True)[
+        Route.objects.count() // 2
+    ]
+    destination_id = (
+        Route.objects.filter(origin_airport=airport)
+        .order_by('pk')
+        .values_list('destination_airport_id', flat=True)
+        .first()
+    )
+    since = Flight.objects.order_by('departure_date').values_list(
+        'departure_date', flat=True
+    ).first() or datetime.now(timezone.utc)
+    until = since + timedelta(hours=12)
+
+    return {
+        'airport_by_iata': lambda: list(Airport.objects.filter(iata=airport.iata)),
+        'airline_by_icao': lambda: list(Airline.objects.filter(icao=airline.icao)),
+        'airports_by_name': lambda: list(
+            Airport.objects.filter(name__icontains=airport.name[:5])[:20]
+        ),
+        'routes_from_airport': lambda: list(
+            Route.objects.filter(origin_airport=airport).select_related(
+                'airline', 'destination_airport'
+            )
+        ),
+        'routes_between_airports': lambda: list(
+            Route.objects.filter(
+                origin_airport=airport, destination_airport_id=destination_id
+            )
+        ),
+        'routes_page': lambda: list(
+            Route.objects.alive()
+            .filter(pk__gt=middle)
+            .order_by('pk')
+            .values('pk', 'airline__name', 'origin_airport__iata')[:100]
+        ),
+        'airline_route_counts': lambda: list(
+            Airline.objects.annotate(route_count=Count('routes')).order_by(
+                '-route_count'
+            )[:10]
+        ),
+        'airports_by_country': lambda: list(
+            Airport.objects.values('country').annotate(count=Count('pk'))
+        ),
+        'departures_board': lambda: list(
+            Flight.objects.departures(airport.pk, since, until)[:50]
+        ),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Times data preparation, import and representative queries '
+        'on synthetic datasets scaled from files in data directory. '
+        'Runs against a separate test database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scales',
+            default='1',
+            help='Comma separated dataset scales, like 1,10,100. Default is 1',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Number of measured runs of every query. Default is 20',
+        )
+        parser.add_argument(
+            '--flight-days',
+            type=int,
+            default=1,
+            help='Days of generated Flights schedule. Default is 1',
+        )
+        parser.add_argument(
+            '--loader', help='Loader used by importers, default is IMPORT_LOADER'
+        )
+        parser.add_argument('--output', help='File to write JSON results to')
+        parser.add_argument(
+            '--baseline',
+            default=str(BASELINE_FILE),
+            help=f'Baseline results to compare with. Default is {BASELINE_FILE}',
+        )
+        parser.add_argument(
+            '--save-baseline',
+            action='store_true',
+            help='Store results as baseline instead of comparing with it',
+        )
+        parser.add_argument(
+            '--max-ratio',
+            type=float,
+            default=1.25,
+            help='Slowdown against baseline reported as regression. Default is 1.25',
+        )
+        parser.add_argument(
+            '--keepdb', action='store_true', help='Keep benchmark database between runs'
+        )
+
+    def _log(self, msg):
+        self.stderr.write(msg)
+
+    def _dataset(self, scale):
+        """Returns directory of dataset of given scale, writes it if missing.
+
+        :param scale: number of copies of original data
+        :type scale: int
+        :rtype: pathlib.Path
+        """
+
+        target_dir = SYNTHETIC_DIR / f'{scale}x'
+        if not (target_dir / 'routes.csv').exists():
+            self._log(f'Writing {scale}x dataset to {target_dir}')
+            scale_dataset(DATA_DIR, target_dir, scale)
+        return target_dir
+
+    def _prepare(self, data_dir):
+        """Times load, cleanup and write steps of every data purger.
+
+        :param data_dir: dataset directory
+        :type data_dir: pathlib.Path
+        :rtype: Dict[str, Dict[str, float]]
+        """
+
+        from scripts.prepare_data import (
+            AirlineDataPurger,
+            AirportDataPurger,
+            RouteDataPurger,
+        )
+
+        results = {}
+        for Purger in (AirlineDataPurger, AirportDataPurger, RouteDataPurger):
+            purger = Purger(data_dir)
+            name = purger.metadata_key
+            for step in ('load', 'cleanup', 'write'):
+                results[f'prepare.{name}.{step}'] = measure(getattr(purger, step))
+        return results
+
+    def _import(self, data_dir, loader):
+        """Times load and save steps of every importer in dependency order.
+
+        :param data_dir: dataset directory with prepared JSON files
+        :type data_dir: pathlib.Path
+        :param loader: loader name
+        :type loader: Optional[str]
+        :rtype: Dict[str, Dict[str, float]]
+        """
+
+        from myflights.apps.core.scripts.clear_db import fast_purge
+        from myflights.apps.core.scripts.import_data import (
+            AirlineImporter,
+            AirportImporter,
+            RouteImporter,
+        )
+
+        fast_purge()
+
+        results = {}
+        for Importer in (AirlineImporter, AirportImporter, RouteImporter):
+            importer = Importer(data_dir=data_dir, loader=loader)
+            name = Importer.Model._meta.model_name
+            for step in ('load', 'save'):
+                results[f'import.{name}.{step}'] = measure(getattr(importer, step))
+        return results
+
+    def _generate(self, days):
+        """Times generation of Flights schedule of imported Routes.
+
+        :param days: number of days
+        :type days: int
+        :rtype: Dict[str, Dict[str, float]]
+        """
+
+        from myflights.apps.core.scripts.generate_flights import generate
+
+        start = datetime.now(timezone.utc).date()
+        return {'generate.flight': measure(lambda: generate(start, days))}
+
+    def _queries(self, repeat):
+        """Times representative queries on imported data.
+
+        :param repeat: number of measured runs of every query
+        :type repeat: int
+        :rtype: Dict[str, Dict[str, float]]
+        """
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        return {
+            f'query.{name}': measure(func, repeat, warmup=1)
+            for name, func in sample_queries().items()
+        }
+
+    def _metadata(self):
+        """Describes environment results were measured in.
+
+        :rtype: Dict[str, Any]
+        """
+
+        with connection.cursor() as cursor:
+            cursor.execute('SHOW server_version')
+            server_version = cursor.fetchone()[0]
+
+        return {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'postgresql': server_version,
+            'platform': platform.platform(),
+            'import_loader': settings.IMPORT_LOADER,
+        }
+
+    def _report(self, comparison, max_ratio):
+        """Writes comparison with baseline as table to stderr,
+        stdout is left for JSON results.
+
+        :param comparison: result of `compare`
+        :type comparison: List[Tuple[str, str, float, float, float, bool]]
+        :param max_ratio: regression threshold
+        :type max_ratio: float
+        """
+
+        self.stderr.write(
+            f'{"scale":>6} {"benchmark":<36} {"baseline":>10} {"current":>10} '
+            f'{"ratio":>6}'
+        )
+        for scale, name, base, current, ratio, regressed in comparison:
+            line = f'{scale:>6} {name:<36} {base:>10.4f} {current:>10.4f} {ratio:>6.2f}'
+            if regressed:
+                line = self.style.ERROR(f'{line} regressed over {max_ratio}')
+            self.stderr.write(line)
+
+    def handle(self, *args, **options):
+        logging.disable(logging.WARNING)
+        scales = [int(scale) for scale in options['scales'].split(',')]
+
+        old_name = settings.DATABASES['default']['NAME']
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options['keepdb'], serialize=False
+        )
+        try:
+            metadata = self._metadata()
+            results = {}
+            for scale in scales:
+                data_dir = self._dataset(scale)
+                self._log(f'Benchmarking {scale}x dataset')
+                results[f'{scale}x'] = {
+                    **self._prepare(data_dir),
+                    **self._import(data_dir, options['loader']),
+                    **self._generate(options['flight_days']),
+                    **self._queries(options['repeat']),
+                }
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options['keepdb']
+            )
+            logging.disable(logging.NOTSET)
+
+        report = {'metadata': metadata, 'results': results}
+        content = json.dumps(report, indent=2)
+        if options['output']:
+            Path(options['output']).write_text(content)
+        else:
+            self.stdout.write(content)
+
+        baseline_file = Path(options['baseline'])
+        if options['save_baseline']:
+            baseline_file.parent.mkdir(parents=True, exist_ok=True)
+            baseline_file.write_text(content)
+            self._log(f'Baseline saved to {baseline_file}')
+            return
+
+        if not baseline_file.exists():
+            self._log(f'No baseline at {baseline_file}, nothing to compare with')
+            return
+
+        baseline = json.loads(baseline_file.read_text())['results']
+        comparison = compare(results, baseline, options['max_ratio'])
+        self._report(comparison, options['max_ratio'])
+
+        regressed = [row for row in comparison if row[-1]]
+        if regressed:
+            raise CommandError(f'{len(regressed)} benchmarks regressed')
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from myflights.apps.core.statistics import refresh_statistics
+
+
+class Command(BaseCommand):
+    help = (
+        'Refreshes materialized views of Route statistics. '
+        'Views stay readable while they are refreshed, unless --blocking is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--blocking',
+            action='store_true',
+            help='Refresh faster, blocking reads of views until refresh is done',
+        )
+        parser.add_argument(
+            '--database', default='default', help='Database alias. Default is default'
+        )
+
+    def handle(self, *args, **options):
+        durations = refresh_statistics(
+            concurrently=not options['blocking'], using=options['database']
+        )
+        for view, duration in durations.items():
+            self.stdout.write(f'{view}: {duration:.3f}s')
@@ -0,0 +1,452 @@
+import os
+import json
+import time
+import fcntl
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+# Upper bounds of histogram buckets for durations in seconds and for query counts
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def _escape(value):
+    """Escapes label value for Prometheus text format.
+
+    :param value: label value
+    :type value: Any
+    :rtype: str
+    """
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    """Formats label set in Prometheus text format.
+
+    :param names: label names
+    :type names: Tuple[str, ...]
+    :param values: label values in `names` order
+    :type values: Tuple[str, ...]
+    :param extra: additional label name and value pairs
+    :type extra: Tuple[Tuple[str, str], ...]
+    :rtype: str
+    """
+
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Metric:
+    """Base class of metrics kept in process memory and exposed
+    in Prometheus text format. Values of every process are summed up
+    by `Registry` when `METRICS_DIR` is set.
+    """
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        """Initializes `Metric` instance.
+
+        :param name: metric name
+        :type name: str
+        :param documentation: help text
+        :type documentation: str
+        :param labelnames: names of labels
+        :type labelnames: Tuple[str, ...]
+        """
+
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+        self.registry = None
+
+    def _changed(self):
+        if self.registry is not None:
+            self.registry.changed()
+
+    def snapshot(self):
+        """Copies values of all label sets.
+
+        :rtype: Dict[Tuple[str, ...], Any]
+        """
+
+        with self.lock:
+            return {
+                labelvalues: self._copy(value)
+                for labelvalues, value in self.values.items()
+            }
+
+    def _copy(self, value):
+        """Override to copy mutable value.
+        """
+        return value
+
+    def merge(self, values, other):
+        """Override to add values of label sets of other process to values.
+
+        :param values: values by label values, updated in place
+        :type values: Dict[Tuple[str, ...], Any]
+        :param other: values by label values
+        :type other: Dict[Tuple[str, ...], Any]
+        """
+        pass
+
+    def _samples(self, values):
+        """Override to yield sample lines of all label sets.
+        """
+        pass
+
+    def render(self, values=None):
+        """Formats metric in Prometheus text format.
+
+        :param values: values by label values. Default is values of this process
+        :type values: Dict[Tuple[str, ...], Any]
+        :rtype: str
+        """
+
+        if values is None:
+            values = self.snapshot()
+        samples = list(self._samples(values))
+        header = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.kind}',
+        ]
+        return '\n'.join(header + samples)
+
+
+class Counter(Metric):
+    """Monotonically increasing number.
+    """
+
+    kind = 'counter'
+
+    def inc(self, *labelvalues, amount=1):
+        """Increments counter of given label values.
+
+        :param labelvalues: label values in `labelnames` order
+        :type labelvalues: str
+        :param amount: increment
+        :type amount: float
+        """
+
+        with self.lock:
+            self.values[labelvalues] = self.values.get(labelvalues, 0) + amount
+        self._changed()
+
+    def merge(self, values, other):
+        for labelvalues, value in other.items():
+            values[labelvalues] = values.get(labelvalues, 0) + value
+
+    def _samples(self, values):
+        for labelvalues, value in sorted(values.items()):
+            yield f'{self.name}{_labels(self.labelnames, labelvalues)} {value}'
+
+
+class Histogram(Metric):
+    """Distribution of observed values over cumulative buckets.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        """Initializes `Histogram` instance.
+
+        :param name: metric name
+        :type name: str
+        :param documentation: help text
+        :type documentation: str
+        :param labelnames: names of labels
+        :type labelnames: Tuple[str, ...]
+        :param buckets: upper bounds of buckets in ascending order,
+        `+Inf` bucket is added implicitly.
+        :type buckets: Tuple[float, ...]
+        """
+
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labelvalues):
+        """Counts observed value in its bucket.
+
+        :param value: observed value
+        :type value: float
+        :param labelvalues: label values in `labelnames` order
+        :type labelvalues: str
+        """
+
+        with self.lock:
+            counts, total = self.values.get(
+                labelvalues, ([0] * (len(self.buckets) + 1), 0)
+            )
+            counts[bisect_left(self.buckets, value)] += 1
+            self.values[labelvalues] = (counts, total + value)
+        self._changed()
+
+    def _copy(self, value):
+        counts, total = value
+        return list(counts), total
+
+    def merge(self, values, other):
+        for labelvalues, (counts, total) in other.items():
+            if labelvalues in values:
+                merged, merged_total = values[labelvalues]
+                counts = [a + b for a, b in zip(merged, counts)]
+                total += merged_total
+            values[labelvalues] = (list(counts), total)
+
+    def _samples(self, values):
+        bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+        for labelvalues, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                labels = _labels(self.labelnames, labelvalues, (('le', bound),))
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            labels = _labels(self.labelnames, labelvalues)
+            yield f'{self.name}_sum{labels} {total}'
+            yield f'{self.name}_count{labels} {cumulative}'
+
+
+# Values of processes which exited are added up in this file of `METRICS_DIR`
+ARCHIVE_FILENAME = 'archive.json'
+LOCK_FILENAME = '.lock'
+
+
+def _read_values(file):
+    """Reads values of metrics written by `Registry.flush`, empty if file is missing.
+
+    :param file: path to file
+    :type file: pathlib.Path
+    :returns: values by label values, by metric name
+    :rtype: Dict[str, Dict[Tuple[str, ...], Any]]
+    """
+
+    try:
+        with open(file) as f:
+            content = json.load(f)
+    except FileNotFoundError:
+        return {}
+    return {
+        name: {tuple(labelvalues): value for labelvalues, value in items}
+        for name, items in content.items()
+    }
+
+
+def _write_values(file, values):
+    """Replaces file with values of metrics atomically, so readers never
+    see partially written file.
+
+    :param file: path to file
+    :type file: pathlib.Path
+    :param values: values by label values, by metric name
+    :type values: Dict[str, Dict[Tuple[str, ...], Any]]
+    """
+
+    content = {name: list(items.items()) for name, items in values.items()}
+    temporary = file.with_name(f'.{file.name}.{os.getpid()}')
+    with open(temporary, 'w') as f:
+        json.dump(content, f)
+    os.replace(temporary, file)
+
+
+@contextmanager
+def _locked(directory, exclusive=False):
+    """Locks `METRICS_DIR` between processes reading values and archiving them.
+
+    :param directory: metrics directory
+    :type directory: pathlib.Path
+    :param exclusive: take exclusive lock instead of shared one
+    :type exclusive: bool
+    """
+
+    with open(directory / LOCK_FILENAME, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class Registry:
+    """Collection of metrics rendered together.
+
+    Every process of web server, like gunicorn worker, keeps its own values.
+    If `METRICS_DIR` is set, every process writes them to its own file there
+    at most every `METRICS_FLUSH_INTERVAL` seconds from background thread,
+    and `render` sums up files of all processes, including exited ones,
+    so that any process serves metrics of the whole server.
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self.dirty = False
+        self.flusher_pid = None
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        """Adds metric to registry.
+
+        :param metric: metric
+        :type metric: Metric
+        :returns: the same metric
+        :rtype: Metric
+        """
+
+        metric.registry = self
+        self.metrics.append(metric)
+        return metric
+
+    @property
+    def directory(self):
+        """Directory shared by processes, None if metrics are kept in process only.
+
+        :rtype: Optional[pathlib.Path]
+        """
+        return Path(settings.METRICS_DIR) if settings.METRICS_DIR else None
+
+    def changed(self):
+        """Marks values as changed, starting flusher thread in this process
+        if it is not running yet, e.g. in worker forked from master process.
+        """
+
+        self.dirty = True
+        if self.flusher_pid == os.getpid() or self.directory is None:
+            return
+        with self.lock:
+            if self.flusher_pid != os.getpid():
+                self.flusher_pid = os.getpid()
+                threading.Thread(target=self._flush_periodically, daemon=True).start()
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            if self.dirty:
+                self.flush()
+
+    def flush(self):
+        """Writes values of this process to its file in `METRICS_DIR`.
+        """
+
+        directory = self.directory
+        if directory is None:
+            return
+        with self.lock:
+            self.dirty = False
+            directory.mkdir(parents=True, exist_ok=True)
+            _write_values(
+                directory / f'{os.getpid()}.json',
+                {metric.name: metric.snapshot() for metric in self.metrics},
+            )
+
+    def collect(self):
+        """Sums up values of all processes written to `METRICS_DIR`,
+        values of this process are written first so they are up to date.
+
+        :returns: values by label values, by metric name
+        :rtype: Dict[str, Dict[Tuple[str, ...], Any]]
+        """
+
+        directory = self.directory
+        if directory is None:
+            return {metric.name: metric.snapshot() for metric in self.metrics}
+
+        self.flush()
+        collected = {metric.name: {} for metric in self.metrics}
+        with _locked(directory):
+            for file in directory.glob('*.json'):
+                self._merge(collected, _read_values(file))
+        return collected
+
+    def _merge(self, values, other):
+        """Adds values of metrics of other process to values.
+
+        :param values: values by label values, by metric name, updated in place
+        :type values: Dict[str, Dict[Tuple[str, ...], Any]]
+        :param other: values by label values, by metric name
+        :type other: Dict[str, Dict[Tuple[str, ...], Any]]
+        """
+
+        for metric in self.metrics:
+            if metric.name in other:
+                metric.merge(values.setdefault(metric.name, {}), other[metric.name])
+
+    def render(self):
+        """Formats all metrics in Prometheus text format.
+
+        :rtype: str
+        """
+
+        collected = self.collect()
+        return ''.join(
+            f'{metric.render(collected[metric.name])}\n' for metric in self.metrics
+        )
+
+    def archive(self, pid):
+        """Adds values of exited process to values of all exited processes,
+        so number of files does not grow as workers are restarted
+        and counters never go backwards.
+
+        :param pid: process id
+        :type pid: int
+        """
+
+        directory = self.directory
+        if directory is None or not (directory / f'{pid}.json').exists():
+            return
+
+        file = directory / f'{pid}.json'
+
+        archive = directory / ARCHIVE_FILENAME
+        with _locked(directory, exclusive=True):
+            archived = _read_values(archive)
+            self._merge(archived, _read_values(file))
+            _write_values(archive, archived)
+            file.unlink()
+
+
+# Metrics exposed by `metrics` view
+registry = Registry()
+requests_total = registry.register(
+    Counter(
+        'myflights_requests_total',
+        'Number of HTTP requests.',
+        ('view', 'method', 'status'),
+    )
+)
+request_duration = registry.register(
+    Histogram(
+        'myflights_request_duration_seconds',
+        'Time spent handling HTTP request.',
+        ('view', 'method'),
+    )
+)
+request_db_duration = registry.register(
+    Histogram(
+        'myflights_request_db_duration_seconds',
+        'Time spent executing SQL queries during HTTP request.',
+        ('view', 'method'),
+    )
+)
+request_queries = registry.register(
+    Histogram(
+        'myflights_request_queries',
+        'Number of SQL queries executed during HTTP request.',
+        ('view', 'method'),
+        buckets=COUNT_BUCKETS,
+    )
+)
+slow_requests_total = registry.register(
+    Counter(
+        'myflights_slow_requests_total',
+        'Number of HTTP requests over slow request thresholds.',
+        ('view', 'method'),
+    )
+)
@@ -0,0 +1,151 @@
+import re
+import time
+import logging
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from myflights.apps.core import metrics
+
+# Literals and lists of parameters collapsed by `fingerprint`
+PARAMETER_LIST = re.compile(r'\(\s*\?(\s*,\s*\?)*\s*\)')
+NUMBER = re.compile(r'\b\d+(\.\d+)?\b')
+STRING = re.compile(r"'(?:[^']|'')*'")
+
+
+def fingerprint(sql):
+    """Normalizes SQL statement so statements differing only in parameters,
+    including length of `IN` lists, have the same fingerprint.
+
+    :param sql: SQL statement with placeholders
+    :type sql: str
+    :rtype: str
+    """
+
+    sql = STRING.sub('?', sql.replace('%s', '?'))
+    sql = PARAMETER_LIST.sub('(...)', NUMBER.sub('?', sql))
+    return ' '.join(sql.split())
+
+
+class QueryRecorder:
+    """Database execute wrapper recording SQL statements and their durations.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def duration(self):
+        return sum(duration for sql, duration in self.queries)
+
+    def slowest(self, count):
+        """Returns slowest recorded statements with durations.
+
+        :param count: max number of statements
+        :type count: int
+        :rtype: List[Tuple[str, float]]
+        """
+        return sorted(self.queries, key=lambda query: query[1], reverse=True)[:count]
+
+    def duplicates(self):
+        """Counts fingerprints of statements executed more than once,
+        typical for N+1 queries.
+
+        :returns: fingerprints with number of executions, most frequent first.
+        :rtype: List[Tuple[str, int]]
+        """
+
+        counts = Counter(fingerprint(sql) for sql, duration in self.queries)
+        return [(sql, count) for sql, count in counts.most_common() if count > 1]
+
+
+class QueryInstrumentationMiddleware:
+    """Records number and duration of SQL queries and duration of every request.
+    Reports them to client with `Server-Timing` header and to Prometheus
+    with `metrics` view.
+    Requests slower than `SLOW_REQUEST_SECONDS` or running more than
+    `SLOW_REQUEST_QUERIES` queries are logged with slowest and duplicated statements.
+    """
+
+    # Number of slowest statements logged for slow requests
+    slowest_count = 5
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+
+        elapsed = time.perf_counter() - started
+        db_time = recorder.duration
+
+        response['Server-Timing'] = ', '.join(
+            [
+                f'db;dur={db_time * 1000:.1f};desc="{recorder.count} queries"',
+                f'app;dur={(elapsed - db_time) * 1000:.1f}',
+                f'total;dur={elapsed * 1000:.1f}',
+            ]
+        )
+
+        match = request.resolver_match
+        view = match.view_name if match else '<unresolved>'
+        labels = (view, request.method)
+        metrics.requests_total.inc(*labels, str(response.status_code))
+        metrics.request_duration.observe(elapsed, *labels)
+        metrics.request_db_duration.observe(db_time, *labels)
+        metrics.request_queries.observe(recorder.count, *labels)
+
+        if (
+            elapsed >= settings.SLOW_REQUEST_SECONDS
+            or recorder.count >= settings.SLOW_REQUEST_QUERIES
+        ):
+            metrics.slow_requests_total.inc(*labels)
+            self._log_slow(request, recorder, elapsed)
+
+        return response
+
+    def _log_slow(self, request, recorder, elapsed):
+        """Logs slow request with its slowest and duplicated statements.
+
+        :param request: HTTP request
+        :type request: django.http.HttpRequest
+        :param recorder: statements executed during request
+        :type recorder: QueryRecorder
+        :param elapsed: seconds spent on request
+        :type elapsed: float
+        """
+
+        lines = [
+            f'[{request.method} {request.get_full_path()}] Slow request: '
+            f'{elapsed * 1000:.1f}ms, {recorder.count} queries '
+            f'in {recorder.duration * 1000:.1f}ms'
+        ]
+        lines.append('Slowest queries:')
+        lines += [
+            f'  {duration * 1000:.1f}ms {sql}'
+            for sql, duration in recorder.slowest(self.slowest_count)
+        ]
+        duplicates = recorder.duplicates()
+        if duplicates:
+            lines.append('Duplicated queries:')
+            lines += [f'  {count}x {sql}' for sql, count in duplicates]
+        logging.warning('\n'.join(lines))
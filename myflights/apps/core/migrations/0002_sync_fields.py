@@ -0,0 +1,48 @@
+# Generated by Django 2.2.8 on 2026-10-18 03:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='airline',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=40, null=True, verbose_name='Hash of imported content'),
+        ),
+        migrations.AddField(
+            model_name='airline',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Date time when object vanished from dataset'),
+        ),
+        migrations.AddField(
+            model_name='airport',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=40, null=True, verbose_name='Hash of imported content'),
+        ),
+        migrations.AddField(
+            model_name='airport',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Date time when object vanished from dataset'),
+        ),
+        migrations.AddField(
+            model_name='route',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=40, null=True, verbose_name='Hash of imported content'),
+        ),
+        migrations.AddField(
+            model_name='route',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Date time when object vanished from dataset'),
+        ),
+        migrations.AlterField(
+            model_name='route',
+            name='equipment',
+            field=models.CharField(blank=True, max_length=100, null=True, verbose_name='3-letter codes for plane type'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 2.2.8 on 2026-10-18 03:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_dataset_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='airline',
+            name='openflights_id',
+            field=models.IntegerField(blank=True, null=True, unique=True, verbose_name='ID from OpenFlights database'),
+        ),
+        migrations.AlterField(
+            model_name='airport',
+            name='openflights_id',
+            field=models.IntegerField(blank=True, null=True, unique=True, verbose_name='ID from OpenFlights database'),
+        ),
+        migrations.AlterField(
+            model_name='flight',
+            name='route',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='flights', to='core.Route', verbose_name='Route of the flight'),
+        ),
+        migrations.AlterField(
+            model_name='route',
+            name='origin_airport',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='outgoing_routes', to='core.Airport', verbose_name='Origin Airport'),
+        ),
+        migrations.AddIndex(
+            model_name='airline',
+            index=models.Index(condition=models.Q(iata__isnull=False), fields=['iata'], name='core_airline_iata_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='airline',
+            index=models.Index(condition=models.Q(icao__isnull=False), fields=['icao'], name='core_airline_icao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='airport',
+            index=models.Index(condition=models.Q(iata__isnull=False), fields=['iata'], name='core_airport_iata_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='airport',
+            index=models.Index(condition=models.Q(icao__isnull=False), fields=['icao'], name='core_airport_icao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['route', 'departure_date'], name='core_flight_route_dep_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='route',
+            index=models.Index(fields=['origin_airport', 'destination_airport'], name='core_route_origin_dest_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+import logging
+
+from django.db import migrations
+
+# Trigram indexes serving substring and similarity search of Airports
+TRIGRAM_INDEXES = {
+    'core_airport_name_trgm_idx': 'name',
+    'core_airport_city_name_trgm_idx': 'city_name',
+}
+
+
+def trigrams_available(schema_editor):
+    """Checks if pg_trgm extension is installed or could be installed.
+    """
+
+    if schema_editor.connection.vendor != 'postgresql':
+        return False
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if not trigrams_available(schema_editor):
+        logging.warning('pg_trgm extension is not available, trigram indexes skipped')
+        return
+
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in TRIGRAM_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON core_airport '
+            f'USING gin ({column} gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for name in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [('core', '0004_code_indexes')]
+
+    operations = [migrations.RunPython(create_trigram_indexes, drop_trigram_indexes)]
@@ -0,0 +1,53 @@
+# Generated by Django 2.2.8 on 2026-10-18 03:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def airport_field(related_name, verbose_name, null):
+    return models.ForeignKey(
+        db_index=False,
+        editable=False,
+        null=null,
+        on_delete=django.db.models.deletion.CASCADE,
+        related_name=related_name,
+        to='core.Airport',
+        verbose_name=verbose_name,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flight',
+            name='origin_airport',
+            field=airport_field('departures', 'Origin Airport', null=True),
+        ),
+        migrations.AddField(
+            model_name='flight',
+            name='destination_airport',
+            field=airport_field('arrivals', 'Destination Airport', null=True),
+        ),
+        migrations.RunSQL(
+            'UPDATE core_flight f '
+            'SET origin_airport_id = r.origin_airport_id, '
+            'destination_airport_id = r.destination_airport_id '
+            'FROM core_route r WHERE r.id = f.route_id',
+            migrations.RunSQL.noop,
+        ),
+        migrations.AlterField(
+            model_name='flight',
+            name='origin_airport',
+            field=airport_field('departures', 'Origin Airport', null=False),
+        ),
+        migrations.AlterField(
+            model_name='flight',
+            name='destination_airport',
+            field=airport_field('arrivals', 'Destination Airport', null=False),
+        ),
+    ]
@@ -0,0 +1,95 @@
+from django.db import migrations
+
+COLUMNS = (
+    'id, created_at, updated_at, departure_date, arrival_date, '
+    'route_id, origin_airport_id, destination_airport_id'
+)
+
+# Flight table is recreated as partitioned by month of departure date.
+# Primary key has to include partition key. Rows are kept in default partition
+# until monthly partitions are created by `partitions.ensure_partitions`.
+PARTITION_SQL = f'''
+ALTER TABLE core_flight RENAME TO core_flight_unpartitioned;
+ALTER INDEX core_flight_route_dep_idx RENAME TO core_flight_route_dep_idx_unpartitioned;
+ALTER TABLE core_flight_unpartitioned
+    RENAME CONSTRAINT core_flight_pkey TO core_flight_pkey_unpartitioned;
+
+CREATE TABLE core_flight (
+    id integer NOT NULL DEFAULT nextval('core_flight_id_seq'),
+    created_at timestamp with time zone NOT NULL,
+    updated_at timestamp with time zone NOT NULL,
+    departure_date timestamp with time zone NOT NULL,
+    arrival_date timestamp with time zone NOT NULL,
+    route_id integer NOT NULL
+        CONSTRAINT core_flight_route_id_fk_core_route_id
+        REFERENCES core_route (id) DEFERRABLE INITIALLY DEFERRED,
+    origin_airport_id integer NOT NULL
+        CONSTRAINT core_flight_origin_airport_id_fk_core_airport_id
+        REFERENCES core_airport (id) DEFERRABLE INITIALLY DEFERRED,
+    destination_airport_id integer NOT NULL
+        CONSTRAINT core_flight_destination_airport_id_fk_core_airport_id
+        REFERENCES core_airport (id) DEFERRABLE INITIALLY DEFERRED,
+    CONSTRAINT core_flight_pkey PRIMARY KEY (id, departure_date)
+) PARTITION BY RANGE (departure_date);
+
+ALTER SEQUENCE core_flight_id_seq OWNED BY core_flight.id;
+
+CREATE TABLE core_flight_default PARTITION OF core_flight DEFAULT;
+
+INSERT INTO core_flight ({COLUMNS})
+SELECT {COLUMNS} FROM core_flight_unpartitioned;
+
+DROP TABLE core_flight_unpartitioned;
+
+CREATE INDEX core_flight_route_dep_idx ON core_flight (route_id, departure_date);
+
+-- Covering indexes of departure and arrival boards allow index only scans
+CREATE INDEX core_flight_departures_idx ON core_flight
+    (origin_airport_id, departure_date)
+    INCLUDE (id, route_id, destination_airport_id, arrival_date);
+
+CREATE INDEX core_flight_arrivals_idx ON core_flight
+    (destination_airport_id, arrival_date)
+    INCLUDE (id, route_id, origin_airport_id, departure_date);
+'''
+
+UNPARTITION_SQL = f'''
+ALTER TABLE core_flight RENAME TO core_flight_partitioned;
+ALTER INDEX core_flight_route_dep_idx RENAME TO core_flight_route_dep_idx_partitioned;
+ALTER TABLE core_flight_partitioned
+    RENAME CONSTRAINT core_flight_pkey TO core_flight_pkey_partitioned;
+
+CREATE TABLE core_flight (
+    id integer NOT NULL DEFAULT nextval('core_flight_id_seq')
+        CONSTRAINT core_flight_pkey PRIMARY KEY,
+    created_at timestamp with time zone NOT NULL,
+    updated_at timestamp with time zone NOT NULL,
+    departure_date timestamp with time zone NOT NULL,
+    arrival_date timestamp with time zone NOT NULL,
+    route_id integer NOT NULL
+        CONSTRAINT core_flight_route_id_fk_core_route_id
+        REFERENCES core_route (id) DEFERRABLE INITIALLY DEFERRED,
+    origin_airport_id integer NOT NULL
+        CONSTRAINT core_flight_origin_airport_id_fk_core_airport_id
+        REFERENCES core_airport (id) DEFERRABLE INITIALLY DEFERRED,
+    destination_airport_id integer NOT NULL
+        CONSTRAINT core_flight_destination_airport_id_fk_core_airport_id
+        REFERENCES core_airport (id) DEFERRABLE INITIALLY DEFERRED
+);
+
+ALTER SEQUENCE core_flight_id_seq OWNED BY core_flight.id;
+
+INSERT INTO core_flight ({COLUMNS})
+SELECT {COLUMNS} FROM core_flight_partitioned;
+
+DROP TABLE core_flight_partitioned;
+
+CREATE INDEX core_flight_route_dep_idx ON core_flight (route_id, departure_date);
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [('core', '0006_flight_airports')]
+
+    operations = [migrations.RunSQL(PARTITION_SQL, UNPARTITION_SQL)]
@@ -0,0 +1,168 @@
+# Generated by Django 2.2.8 on 2026-10-18 03:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_countries.fields
+
+# Statistics of Routes not deleted from dataset, precomputed for dashboards.
+# Unique indexes allow `REFRESH MATERIALIZED VIEW CONCURRENTLY`,
+# which doesn't block reads of views while they are refreshed.
+STATISTICS_SQL = '''
+CREATE MATERIALIZED VIEW core_airport_degree AS
+SELECT a.id AS airport_id,
+       COALESCE(o.routes, 0)::integer AS outgoing_routes,
+       COALESCE(i.routes, 0)::integer AS incoming_routes,
+       (COALESCE(o.routes, 0) + COALESCE(i.routes, 0))::integer AS routes,
+       COALESCE(o.airports, 0)::integer AS destinations,
+       COALESCE(i.airports, 0)::integer AS origins,
+       COALESCE(o.airlines, 0)::integer AS airlines
+FROM core_airport a
+LEFT JOIN (
+    SELECT origin_airport_id AS airport_id, count(*) AS routes,
+           count(DISTINCT destination_airport_id) AS airports,
+           count(DISTINCT airline_id) AS airlines
+    FROM core_route WHERE deleted_at IS NULL GROUP BY origin_airport_id
+) o ON o.airport_id = a.id
+LEFT JOIN (
+    SELECT destination_airport_id AS airport_id, count(*) AS routes,
+           count(DISTINCT origin_airport_id) AS airports
+    FROM core_route WHERE deleted_at IS NULL GROUP BY destination_airport_id
+) i ON i.airport_id = a.id
+WHERE a.deleted_at IS NULL;
+
+CREATE UNIQUE INDEX core_airport_degree_pkey ON core_airport_degree (airport_id);
+CREATE INDEX core_airport_degree_routes_idx ON core_airport_degree (routes);
+
+CREATE MATERIALIZED VIEW core_airline_route_count AS
+WITH served AS (
+    SELECT airline_id, origin_airport_id AS airport_id
+    FROM core_route WHERE deleted_at IS NULL
+    UNION
+    SELECT airline_id, destination_airport_id
+    FROM core_route WHERE deleted_at IS NULL
+)
+SELECT l.id AS airline_id,
+       COALESCE(r.routes, 0)::integer AS routes,
+       COALESCE(s.airports, 0)::integer AS airports,
+       COALESCE(s.countries, 0)::integer AS countries
+FROM core_airline l
+LEFT JOIN (
+    SELECT airline_id, count(*) AS routes
+    FROM core_route WHERE deleted_at IS NULL GROUP BY airline_id
+) r ON r.airline_id = l.id
+LEFT JOIN (
+    SELECT served.airline_id, count(*) AS airports,
+           count(DISTINCT a.country) AS countries
+    FROM served JOIN core_airport a ON a.id = served.airport_id
+    GROUP BY served.airline_id
+) s ON s.airline_id = l.id
+WHERE l.deleted_at IS NULL;
+
+CREATE UNIQUE INDEX core_airline_route_count_pkey
+    ON core_airline_route_count (airline_id);
+CREATE INDEX core_airline_route_count_routes_idx ON core_airline_route_count (routes);
+
+CREATE MATERIALIZED VIEW core_country_connectivity AS
+SELECT (row_number() OVER (ORDER BY o.country, d.country))::integer AS id,
+       o.country AS origin_country,
+       d.country AS destination_country,
+       count(*)::integer AS routes,
+       count(DISTINCT r.airline_id)::integer AS airlines,
+       count(DISTINCT (r.origin_airport_id, r.destination_airport_id))::integer
+           AS airport_pairs
+FROM core_route r
+JOIN core_airport o ON o.id = r.origin_airport_id
+JOIN core_airport d ON d.id = r.destination_airport_id
+WHERE r.deleted_at IS NULL
+GROUP BY o.country, d.country;
+
+CREATE UNIQUE INDEX core_country_connectivity_pkey
+    ON core_country_connectivity (origin_country, destination_country);
+CREATE INDEX core_country_connectivity_routes_idx
+    ON core_country_connectivity (routes);
+
+-- Equipment is space separated list of plane type codes
+CREATE MATERIALIZED VIEW core_equipment_usage AS
+SELECT e.code AS equipment,
+       count(*)::integer AS routes,
+       count(DISTINCT r.airline_id)::integer AS airlines
+FROM core_route r, unnest(string_to_array(r.equipment, ' ')) AS e(code)
+WHERE r.deleted_at IS NULL AND e.code <> ''
+GROUP BY e.code;
+
+CREATE UNIQUE INDEX core_equipment_usage_pkey ON core_equipment_usage (equipment);
+'''
+
+DROP_STATISTICS_SQL = '''
+DROP MATERIALIZED VIEW core_equipment_usage;
+DROP MATERIALIZED VIEW core_country_connectivity;
+DROP MATERIALIZED VIEW core_airline_route_count;
+DROP MATERIALIZED VIEW core_airport_degree;
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_partition_flights'),
+    ]
+
+    operations = [
+        migrations.RunSQL(STATISTICS_SQL, DROP_STATISTICS_SQL),
+        migrations.CreateModel(
+            name='AirlineRouteCount',
+            fields=[
+                ('airline', models.OneToOneField(on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='route_count', serialize=False, to='core.Airline', verbose_name='Airline')),
+                ('routes', models.IntegerField(verbose_name='Number of Routes')),
+                ('airports', models.IntegerField(verbose_name='Number of Airports served')),
+                ('countries', models.IntegerField(verbose_name='Number of countries served')),
+            ],
+            options={
+                'db_table': 'core_airline_route_count',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='AirportDegree',
+            fields=[
+                ('airport', models.OneToOneField(on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='degree', serialize=False, to='core.Airport', verbose_name='Airport')),
+                ('outgoing_routes', models.IntegerField(verbose_name='Number of Routes from Airport')),
+                ('incoming_routes', models.IntegerField(verbose_name='Number of Routes to Airport')),
+                ('routes', models.IntegerField(verbose_name='Number of Routes from and to Airport')),
+                ('destinations', models.IntegerField(verbose_name='Number of Airports reachable directly')),
+                ('origins', models.IntegerField(verbose_name='Number of Airports with Routes to Airport')),
+                ('airlines', models.IntegerField(verbose_name='Number of Airlines operating from Airport')),
+            ],
+            options={
+                'db_table': 'core_airport_degree',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='CountryConnectivity',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origin_country', django_countries.fields.CountryField(max_length=2, verbose_name='Country of origin Airports')),
+                ('destination_country', django_countries.fields.CountryField(max_length=2, verbose_name='Country of destination Airports')),
+                ('routes', models.IntegerField(verbose_name='Number of Routes')),
+                ('airlines', models.IntegerField(verbose_name='Number of Airlines operating Routes')),
+                ('airport_pairs', models.IntegerField(verbose_name='Number of connected pairs of Airports')),
+            ],
+            options={
+                'db_table': 'core_country_connectivity',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='EquipmentUsage',
+            fields=[
+                ('equipment', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='3-letter code for plane type')),
+                ('routes', models.IntegerField(verbose_name='Number of Routes')),
+                ('airlines', models.IntegerField(verbose_name='Number of Airlines')),
+            ],
+            options={
+                'db_table': 'core_equipment_usage',
+                'managed': False,
+            },
+        ),
+    ]
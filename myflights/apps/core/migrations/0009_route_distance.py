@@ -0,0 +1,51 @@
+# Generated by Django 2.2.8 on 2026-10-18 03:55
+
+import numpy as np
+from django.db import migrations, models
+
+from myflights.apps.core.geo import haversine_km
+
+
+def fill_distances(apps, schema_editor):
+    """Calculates distances of all existing Routes at once.
+    """
+
+    Route = apps.get_model('core', 'Route')
+    rows = Route.objects.values_list(
+        'pk',
+        'origin_airport__latitude',
+        'origin_airport__longitude',
+        'destination_airport__latitude',
+        'destination_airport__longitude',
+    )
+    rows = np.array(list(rows), dtype=np.float64).reshape(-1, 5)
+    if not len(rows):
+        return
+
+    distances = haversine_km(rows[:, 1], rows[:, 2], rows[:, 3], rows[:, 4])
+    schema_editor.execute(
+        'UPDATE core_route SET distance_km = d.distance_km '
+        'FROM unnest(%s::integer[], %s::double precision[]) AS d(id, distance_km) '
+        'WHERE core_route.id = d.id',
+        [rows[:, 0].astype(np.int64).tolist(), distances.tolist()],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [('core', '0008_route_statistics')]
+
+    operations = [
+        migrations.AddField(
+            model_name='route',
+            name='distance_km',
+            field=models.FloatField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                null=True,
+                verbose_name='Great-circle distance between Airports in kilometers',
+            ),
+        ),
+        migrations.RunPython(fill_distances, migrations.RunPython.noop),
+    ]
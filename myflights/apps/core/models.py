@@ -1,7 +1,12 @@
-from django.db import models
+from datetime import timedelta
+
+import numpy as np
+from django.db import connections, models
 from django.utils.translation import ugettext_lazy as _
 from django_countries.fields import CountryField
 
+from myflights.apps.core.geo import haversine_km
+
 
 class BaseModel(models.Model):
     """Base abstract model.
@@ -14,7 +19,34 @@ class BaseModel(models.Model):
         abstract = True
 
 
-class Airport(BaseModel):
+class ImportedQuerySet(models.QuerySet):
+    """QuerySet of objects imported from OpenFlights dataset.
+    """
+
+    def alive(self):
+        """Excludes objects soft-deleted by incremental import.
+        """
+        return self.filter(deleted_at__isnull=True)
+
+
+class ImportedModel(BaseModel):
+    """Base abstract model for objects imported from OpenFlights dataset.
+    """
+
+    content_hash = models.CharField(
+        _('Hash of imported content'), max_length=40, null=True, blank=True
+    )
+    deleted_at = models.DateTimeField(
+        _('Date time when object vanished from dataset'), null=True, blank=True
+    )
+
+    objects = ImportedQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+
+class Airport(ImportedModel):
     """Represents real Airport.
     """
 
@@ -37,14 +69,28 @@ class Airport(BaseModel):
         _('Time zone name in tz (Olsom) format'), max_length=100, null=True, blank=True
     )
     openflights_id = models.IntegerField(
-        _('ID from OpenFlights database'), null=True, blank=True
+        _('ID from OpenFlights database'), null=True, blank=True, unique=True
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['iata'],
+                name='core_airport_iata_idx',
+                condition=models.Q(iata__isnull=False),
+            ),
+            models.Index(
+                fields=['icao'],
+                name='core_airport_icao_idx',
+                condition=models.Q(icao__isnull=False),
+            ),
+        ]
+
     def __str__(self):
         return f'{self.name} ({self.country.name}/{self.city_name})'
 
 
-class Airline(BaseModel):
+class Airline(ImportedModel):
     """Represents operational and defunct Airline company.
     """
 
@@ -66,14 +112,84 @@ class Airline(BaseModel):
         _('Is Airline operational or defunct'), default=True
     )
     openflights_id = models.IntegerField(
-        _('ID from OpenFlights database'), null=True, blank=True
+        _('ID from OpenFlights database'), null=True, blank=True, unique=True
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['iata'],
+                name='core_airline_iata_idx',
+                condition=models.Q(iata__isnull=False),
+            ),
+            models.Index(
+                fields=['icao'],
+                name='core_airline_icao_idx',
+                condition=models.Q(icao__isnull=False),
+            ),
+        ]
+
     def __str__(self):
         return f'{self.name} {self.callsign}'
 
 
-class Route(BaseModel):
+class RouteQuerySet(ImportedQuerySet):
+    """QuerySet of Routes with great-circle distance queries.
+    """
+
+    def distance_between(self, minimum=None, maximum=None):
+        """Routes with distance in range, served by index of distance.
+
+        :param minimum: min distance in kilometers, inclusive. Default is unbounded
+        :type minimum: Optional[float]
+        :param maximum: max distance in kilometers, inclusive. Default is unbounded
+        :type maximum: Optional[float]
+        :rtype: RouteQuerySet
+        """
+
+        queryset = self
+        if minimum is not None:
+            queryset = queryset.filter(distance_km__gte=minimum)
+        if maximum is not None:
+            queryset = queryset.filter(distance_km__lte=maximum)
+        return queryset
+
+    def update_distances(self):
+        """Recalculates distances of all Routes of queryset at once
+        from current coordinates of their Airports.
+        Only Routes which distances have changed are written.
+
+        :returns: number of updated Routes
+        :rtype: int
+        """
+
+        rows = self.order_by().values_list(
+            'pk',
+            'origin_airport__latitude',
+            'origin_airport__longitude',
+            'destination_airport__latitude',
+            'destination_airport__longitude',
+        )
+        rows = np.array(list(rows), dtype=np.float64).reshape(-1, 5)
+        if not len(rows):
+            return 0
+
+        pks = rows[:, 0].astype(np.int64).tolist()
+        distances = haversine_km(rows[:, 1], rows[:, 2], rows[:, 3], rows[:, 4])
+        table = connections[self.db].ops.quote_name(self.model._meta.db_table)
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {table} AS route SET distance_km = d.distance_km '
+                f'FROM unnest(%s::integer[], %s::double precision[]) '
+                f'AS d(id, distance_km) '
+                f'WHERE route.id = d.id '
+                f'AND route.distance_km IS DISTINCT FROM d.distance_km',
+                [pks, distances.tolist()],
+            )
+            return cursor.rowcount
+
+
+class Route(ImportedModel):
     """Represents routes between airports.
     """
 
@@ -90,6 +206,8 @@ class Route(BaseModel):
         related_name='outgoing_routes',
         on_delete=models.CASCADE,
         verbose_name=_('Origin Airport'),
+        # Covered by composite index of origin and destination
+        db_index=False,
     )
     destination_airport = models.ForeignKey(
         Airport,
@@ -101,13 +219,146 @@ class Route(BaseModel):
     equipment = models.CharField(
         _('3-letter codes for plane type'), max_length=100, null=True, blank=True
     )
+    # Calculated from coordinates of Airports by `save`, importers
+    # and `RouteQuerySet.update_distances` when Airports move
+    distance_km = models.FloatField(
+        _('Great-circle distance between Airports in kilometers'),
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+    )
+
+    objects = RouteQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['origin_airport', 'destination_airport'],
+                name='core_route_origin_dest_idx',
+            )
+        ]
+
+    # Names of fields, including attribute names, which `distance_km` depends on
+    AIRPORT_FIELDS = (
+        'origin_airport',
+        'origin_airport_id',
+        'destination_airport',
+        'destination_airport_id',
+    )
+    # Airports which `distance_km` was loaded or calculated for
+    _distance_airports = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        route = super().from_db(db, field_names, values)
+        route._distance_airports = route._airports()
+        return route
+
+    def _airports(self):
+        """Returns primary keys of origin and destination Airports, None if not set.
+
+        :rtype: Tuple[Optional[int], Optional[int]]
+        """
+        return (
+            self.__dict__.get('origin_airport_id'),
+            self.__dict__.get('destination_airport_id'),
+        )
+
+    def _distance(self, origin, destination):
+        """Calculates distance between Airports with single query.
+
+        :param origin: origin Airport primary key
+        :type origin: int
+        :param destination: destination Airport primary key
+        :type destination: int
+        :rtype: float
+        """
+
+        rows = Airport.objects.filter(pk__in=[origin, destination]).values_list(
+            'pk', 'latitude', 'longitude'
+        )
+        coordinates = {pk: (latitude, longitude) for pk, latitude, longitude in rows}
+        return float(haversine_km(*coordinates[origin], *coordinates[destination]))
+
+    def save(self, *args, **kwargs):
+        """Saves Route, calculating distance when Airports are set or changed.
+        Fields saved with `update_fields` are extended with `distance_km`
+        only if they include Airports.
+        """
+
+        airports = self._airports()
+        update_fields = kwargs.get('update_fields')
+        saves_airports = update_fields is None or bool(
+            set(update_fields) & set(self.AIRPORT_FIELDS)
+        )
+
+        if (
+            saves_airports
+            and None not in airports
+            and (self.distance_km is None or airports != self._distance_airports)
+        ):
+            self.distance_km = self._distance(*airports)
+            self._distance_airports = airports
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'distance_km'}
+
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f'{self.origin_airport} - {self.destination_airport}'
 
 
+class FlightQuerySet(models.QuerySet):
+    """QuerySet of Flights with departure and arrival board queries.
+    Flight table is partitioned by departure date, so queries are bounded by it
+    to let database skip partitions.
+    """
+
+    # Arrivals are searched among flights departed at most this long before
+    MAX_FLIGHT_DURATION = timedelta(days=1)
+
+    def departures(self, airport, start, end):
+        """Flights departing from Airport in time range, earliest first.
+
+        :param airport: Airport primary key
+        :type airport: int
+        :param start: range start, inclusive
+        :type start: datetime.datetime
+        :param end: range end, exclusive
+        :type end: datetime.datetime
+        :rtype: FlightQuerySet
+        """
+
+        return self.filter(
+            origin_airport_id=airport, departure_date__gte=start, departure_date__lt=end
+        ).order_by('departure_date', 'id')
+
+    def arrivals(self, airport, start, end):
+        """Flights arriving to Airport in time range, earliest first.
+
+        :param airport: Airport primary key
+        :type airport: int
+        :param start: range start, inclusive
+        :type start: datetime.datetime
+        :param end: range end, exclusive
+        :type end: datetime.datetime
+        :rtype: FlightQuerySet
+        """
+
+        return self.filter(
+            destination_airport_id=airport,
+            arrival_date__gte=start,
+            arrival_date__lt=end,
+            departure_date__gte=start - self.MAX_FLIGHT_DURATION,
+            departure_date__lt=end,
+        ).order_by('arrival_date', 'id')
+
+
 class Flight(BaseModel):
     """Represents single flight along it's route.
+    Stored in table partitioned by month of departure date,
+    see `myflights.apps.core.partitions`.
     """
 
     route = models.ForeignKey(
@@ -115,10 +366,43 @@ class Flight(BaseModel):
         related_name='flights',
         on_delete=models.CASCADE,
         verbose_name=_('Route of the flight'),
+        # Covered by composite index of route and departure date
+        db_index=False,
+    )
+    # Copied from route for departure and arrival boards, covered by their indexes
+    origin_airport = models.ForeignKey(
+        Airport,
+        related_name='departures',
+        on_delete=models.CASCADE,
+        editable=False,
+        db_index=False,
+        verbose_name=_('Origin Airport'),
+    )
+    destination_airport = models.ForeignKey(
+        Airport,
+        related_name='arrivals',
+        on_delete=models.CASCADE,
+        editable=False,
+        db_index=False,
+        verbose_name=_('Destination Airport'),
     )
     departure_date = models.DateTimeField(_('Departure date time in UTC'))
     arrival_date = models.DateTimeField(_('Arrival date time in UTC'))
 
+    objects = FlightQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['route', 'departure_date'], name='core_flight_route_dep_idx'
+            )
+        ]
+
+    def save(self, *args, **kwargs):
+        self.origin_airport_id = self.route.origin_airport_id
+        self.destination_airport_id = self.route.destination_airport_id
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return '{} [{}] - {} [{}]'.format(
             self.route.origin_airport,
@@ -126,3 +410,91 @@ class Flight(BaseModel):
             self.route.destination_airport,
             self.arrival_date,
         )
+
+
+class DatasetVersion(BaseModel):
+    """Single row counter bumped whenever Airports, Airlines or Routes change,
+    so caches built from them in every process know when to rebuild.
+    """
+
+    version = models.PositiveIntegerField(_('Dataset version'), default=0)
+
+    def __str__(self):
+        return f'v{self.version} ({self.updated_at})'
+
+
+class AirportDegree(models.Model):
+    """Number of Routes from and to Airport.
+    Read-only, materialized view refreshed by `statistics.refresh_statistics`.
+    """
+
+    airport = models.OneToOneField(
+        Airport,
+        primary_key=True,
+        related_name='degree',
+        on_delete=models.DO_NOTHING,
+        verbose_name=_('Airport'),
+    )
+    outgoing_routes = models.IntegerField(_('Number of Routes from Airport'))
+    incoming_routes = models.IntegerField(_('Number of Routes to Airport'))
+    routes = models.IntegerField(_('Number of Routes from and to Airport'))
+    destinations = models.IntegerField(_('Number of Airports reachable directly'))
+    origins = models.IntegerField(_('Number of Airports with Routes to Airport'))
+    airlines = models.IntegerField(_('Number of Airlines operating from Airport'))
+
+    class Meta:
+        managed = False
+        db_table = 'core_airport_degree'
+
+
+class AirlineRouteCount(models.Model):
+    """Number of Routes of Airline and Airports and countries it serves.
+    Read-only, materialized view refreshed by `statistics.refresh_statistics`.
+    """
+
+    airline = models.OneToOneField(
+        Airline,
+        primary_key=True,
+        related_name='route_count',
+        on_delete=models.DO_NOTHING,
+        verbose_name=_('Airline'),
+    )
+    routes = models.IntegerField(_('Number of Routes'))
+    airports = models.IntegerField(_('Number of Airports served'))
+    countries = models.IntegerField(_('Number of countries served'))
+
+    class Meta:
+        managed = False
+        db_table = 'core_airline_route_count'
+
+
+class CountryConnectivity(models.Model):
+    """Routes between Airports of two countries.
+    Read-only, materialized view refreshed by `statistics.refresh_statistics`.
+    """
+
+    origin_country = CountryField(_('Country of origin Airports'))
+    destination_country = CountryField(_('Country of destination Airports'))
+    routes = models.IntegerField(_('Number of Routes'))
+    airlines = models.IntegerField(_('Number of Airlines operating Routes'))
+    airport_pairs = models.IntegerField(_('Number of connected pairs of Airports'))
+
+    class Meta:
+        managed = False
+        db_table = 'core_country_connectivity'
+
+
+class EquipmentUsage(models.Model):
+    """Number of Routes and Airlines using plane type.
+    Read-only, materialized view refreshed by `statistics.refresh_statistics`.
+    """
+
+    equipment = models.CharField(
+        _('3-letter code for plane type'), max_length=100, primary_key=True
+    )
+    routes = models.IntegerField(_('Number of Routes'))
+    airlines = models.IntegerField(_('Number of Airlines'))
+
+    class Meta:
+        managed = False
+        db_table = 'core_equipment_usage'
@@ -0,0 +1,176 @@
+import re
+import logging
+from datetime import date, datetime, timezone
+
+from django.db import connection, transaction
+
+from myflights.apps.core.models import Flight
+
+TABLE = Flight._meta.db_table
+DEFAULT_PARTITION = f'{TABLE}_default'
+PARTITION_NAME = re.compile(rf'^{TABLE}_y(\d{{4}})m(\d{{2}})$')
+
+
+def month_start(value):
+    """Returns first day of month of given date.
+
+    :param value: date or date time
+    :type value: datetime.date
+    :rtype: datetime.date
+    """
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    """Shifts first day of month by number of months.
+
+    :param month: first day of month
+    :type month: datetime.date
+    :param count: number of months, may be negative
+    :type count: int
+    :rtype: datetime.date
+    """
+
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    """Returns name of partition keeping flights departing in given month.
+
+    :param month: first day of month
+    :type month: datetime.date
+    :rtype: str
+    """
+    return f'{TABLE}_y{month.year}m{month.month:02}'
+
+
+def _bound(month):
+    """Formats first moment of month in UTC as partition bound.
+
+    :param month: first day of month
+    :type month: datetime.date
+    :rtype: str
+    """
+    return datetime(month.year, month.month, 1, tzinfo=timezone.utc).isoformat()
+
+
+def is_partitioned():
+    """Checks if Flight table is partitioned, which requires PostgreSQL 11 or newer.
+
+    :rtype: bool
+    """
+
+    if connection.vendor != 'postgresql':
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_class WHERE relname = %s AND relkind = 'p'", [TABLE]
+        )
+        return cursor.fetchone() is not None
+
+
+def partition_months():
+    """Lists months which have their own partitions.
+
+    :rtype: List[datetime.date]
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname FROM pg_inherits i '
+            'JOIN pg_class c ON c.oid = i.inhrelid '
+            'WHERE i.inhparent = %s::regclass',
+            [TABLE],
+        )
+        names = [name for name, in cursor.fetchall()]
+
+    matches = (PARTITION_NAME.match(name) for name in names)
+    return sorted(date(int(m[1]), int(m[2]), 1) for m in matches if m)
+
+
+def create_partition(month):
+    """Creates partition for flights departing in given month.
+    Flights of the month kept in default partition are moved to the new one.
+
+    :param month: first day of month
+    :type month: datetime.date
+    :returns: number of flights moved from default partition.
+    :rtype: int
+    """
+
+    name = connection.ops.quote_name(partition_name(month))
+    lower, upper = _bound(month), _bound(add_months(month, 1))
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+        )
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} '
+            f'WHERE departure_date >= %s AND departure_date < %s RETURNING *) '
+            f'INSERT INTO {name} SELECT * FROM moved',
+            [lower, upper],
+        )
+        moved = cursor.rowcount
+        cursor.execute(
+            f'ALTER TABLE {TABLE} ATTACH PARTITION {name} '
+            f'FOR VALUES FROM (%s) TO (%s)',
+            [lower, upper],
+        )
+
+    return moved
+
+
+def ensure_partitions(months_ahead=3, today=None):
+    """Creates missing partitions from current month to `months_ahead` months ahead
+    and for months of flights which got into default partition.
+
+    :param months_ahead: number of upcoming months
+    :type months_ahead: int
+    :param today: current date. Default is today in UTC
+    :type today: datetime.date
+    :returns: months of created partitions.
+    :rtype: List[datetime.date]
+    """
+
+    current = month_start(today or datetime.now(timezone.utc))
+    months = {add_months(current, i) for i in range(months_ahead + 1)}
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT DISTINCT date_trunc('month', departure_date AT TIME ZONE 'UTC') "
+            f'FROM {DEFAULT_PARTITION}'
+        )
+        months.update(month_start(value) for value, in cursor.fetchall())
+
+    created = sorted(months - set(partition_months()))
+    for month in created:
+        moved = create_partition(month)
+        logging.warning(
+            f'[{Flight}] Created partition {partition_name(month)}, '
+            f'{moved} flights moved from default partition'
+        )
+    return created
+
+
+def drop_partitions(before):
+    """Detaches and drops partitions of months before given date,
+    which removes their flights instantly, without deleting rows one by one.
+
+    :param before: date, partitions of earlier months are dropped.
+    :type before: datetime.date
+    :returns: months of dropped partitions.
+    :rtype: List[datetime.date]
+    """
+
+    dropped = [month for month in partition_months() if month < month_start(before)]
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        for month in dropped:
+            name = connection.ops.quote_name(partition_name(month))
+            cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {name}')
+            cursor.execute(f'DROP TABLE {name}')
+
+    return dropped
@@ -0,0 +1,194 @@
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+from myflights.apps.core.models import Airline, Airport
+from myflights.apps.core.versioning import VersionedCache, current_version
+
+AirportRef = namedtuple(
+    'AirportRef',
+    [
+        'pk',
+        'iata',
+        'icao',
+        'name',
+        'city_name',
+        'country',
+        'latitude',
+        'longitude',
+        'openflights_id',
+    ],
+)
+AirlineRef = namedtuple(
+    'AirlineRef',
+    ['pk', 'iata', 'icao', 'name', 'country', 'is_active', 'openflights_id'],
+)
+
+
+class Snapshot:
+    """Maps of essential fields of all objects by primary key,
+    by upper case IATA and ICAO codes and by OpenFlights id.
+    """
+
+    def __init__(self, refs):
+        """Initializes `Snapshot` instance.
+
+        :param refs: essential fields of objects, ordered by primary key.
+        :type refs: List[Union[AirportRef, AirlineRef]]
+        """
+
+        self.by_pk = {}
+        self.by_code = {}
+        self.by_openflights_id = {}
+
+        for ref in refs:
+            self.by_pk[ref.pk] = ref
+            if ref.openflights_id is not None:
+                self.by_openflights_id[ref.openflights_id] = ref
+            for code in (ref.iata, ref.icao):
+                if code:
+                    self._add_code(code.upper(), ref)
+
+    def _add_code(self, code, ref):
+        """Maps code to object, the first object wins if code is not unique.
+
+        :param code: upper case code
+        :type code: str
+        :param ref: essential fields of object
+        :type ref: Union[AirportRef, AirlineRef]
+        """
+        self.by_code.setdefault(code, ref)
+
+
+class AirlineSnapshot(Snapshot):
+    """Airline codes are reused by defunct companies, so active Airlines win.
+    """
+
+    def _add_code(self, code, ref):
+        current = self.by_code.get(code)
+        if current is None or (ref.is_active and not current.is_active):
+            self.by_code[code] = ref
+
+
+class Resolver:
+    """Resolves codes, OpenFlights ids and primary keys to essential fields of objects
+    without hitting database.
+    Snapshot of all objects is kept in process memory until dataset version changes.
+    If `RESOLVER_CACHE` names one of `CACHES`, like shared Redis cache,
+    rows of every dataset version are kept there too, so other processes
+    build their snapshots without querying tables.
+    """
+
+    # Model of resolved objects
+    Model = None
+    # Named tuple of fields kept for every object
+    Ref = None
+    Snapshot = Snapshot
+
+    def __init__(self):
+        self.snapshots = VersionedCache(self._build)
+
+    @property
+    def cache_key(self):
+        """Key of rows of current dataset version in shared cache.
+
+        :rtype: str
+        """
+        return f'resolvers:{self.Model._meta.label_lower}:{current_version()}'
+
+    def _query(self):
+        """Queries rows of essential fields of all objects not deleted from dataset.
+
+        :rtype: List[Tuple[Any, ...]]
+        """
+
+        rows = self.Model.objects.alive().order_by('pk')
+        return list(rows.values_list(*self.Ref._fields))
+
+    def _snapshot(self, rows):
+        """Makes snapshot of rows of essential fields.
+
+        :param rows: rows in order of `Ref` fields
+        :type rows: List[Tuple[Any, ...]]
+        :rtype: Snapshot
+        """
+        return self.Snapshot([self.Ref(*row) for row in rows])
+
+    def _build(self):
+        """Builds snapshot from rows kept in shared cache or queried from database.
+
+        :rtype: Snapshot
+        """
+
+        if settings.RESOLVER_CACHE is None:
+            return self._snapshot(self._query())
+
+        cache = caches[settings.RESOLVER_CACHE]
+        key = self.cache_key
+        rows = cache.get(key)
+        if rows is None:
+            rows = self._query()
+            cache.set(key, rows, settings.RESOLVER_CACHE_TIMEOUT)
+        return self._snapshot(rows)
+
+    def snapshot(self, fresh=False):
+        """Returns snapshot of all objects.
+
+        :param fresh: build snapshot from database bypassing both cache tiers,
+        for bulk operations which must see just committed changes.
+        :type fresh: bool
+        :rtype: Snapshot
+        """
+
+        if fresh:
+            return self._snapshot(self._query())
+        return self.snapshots.get()
+
+    def by_code(self, code):
+        """Resolves IATA or ICAO code. Returns None if object not found.
+
+        :param code: IATA or ICAO code, case insensitive.
+        :type code: str
+        :rtype: Optional[namedtuple]
+        """
+        return self.snapshot().by_code.get(code.strip().upper())
+
+    def by_openflights_id(self, openflights_id):
+        """Resolves OpenFlights id. Returns None if object not found.
+
+        :param openflights_id: id from OpenFlights dataset.
+        :type openflights_id: int
+        :rtype: Optional[namedtuple]
+        """
+        return self.snapshot().by_openflights_id.get(openflights_id)
+
+    def by_pk(self, pk):
+        """Resolves primary key. Returns None if object not found.
+
+        :param pk: primary key
+        :type pk: int
+        :rtype: Optional[namedtuple]
+        """
+        return self.snapshot().by_pk.get(pk)
+
+    def invalidate(self):
+        """Drops in-process snapshot, it is rebuilt on next access.
+        """
+        self.snapshots.invalidate()
+
+
+class AirportResolver(Resolver):
+    Model = Airport
+    Ref = AirportRef
+
+
+class AirlineResolver(Resolver):
+    Model = Airline
+    Ref = AirlineRef
+    Snapshot = AirlineSnapshot
+
+
+# Resolvers shared by all requests of the process
+airports = AirportResolver()
+airlines = AirlineResolver()
@@ -1,9 +1,175 @@
+import time
+import logging
+
+from django.apps import apps
+from django.db import connection, models, transaction
+
 from myflights.apps.core.models import Airline, Airport, Route, Flight
+from myflights.apps.core.signals import data_imported
+from myflights.apps.core.utils import estimated_count, parse_script_args
+
+MODELS = [Airline, Airport, Route, Flight]
+
+
+def _purge_plan(selected):
+    """Finds models to be purged together with selected ones
+    and foreign keys to be nullified to keep consistency, following `on_delete` rules.
+
+    :param selected: models to be purged.
+    :type selected: List[Type[django.db.models.Model]]
+    :returns: purged models, dependants first, and foreign keys to be nullified.
+    :rtype: Tuple[List[Type[django.db.models.Model]], List[django.db.models.Field]]
+    """
+
+    purged = []
+    nullified = []
+    pending = list(selected)
+
+    while pending:
+        model = pending.pop(0)
+        if model in purged:
+            continue
+        purged.append(model)
+
+        for relation in model._meta.related_objects:
+            on_delete = relation.on_delete
+            if on_delete is models.CASCADE:
+                pending.append(relation.related_model)
+            elif on_delete is models.SET_NULL:
+                nullified.append(relation.field)
+            elif on_delete is not models.DO_NOTHING:
+                raise ValueError(
+                    f'{model.__name__} could not be purged due to {relation.field}'
+                )
+
+    nullified = [field for field in nullified if field.model not in purged]
+    return list(reversed(purged)), nullified
+
+
+def _exact_count(model):
+    """Counts rows in model's table.
+
+    :param model: model class
+    :type model: Type[django.db.models.Model]
+    :rtype: int
+    """
+    return model._base_manager.count()
+
+
+def fast_purge(selected=MODELS, exact=False):
+    """Purges selected models in single transaction with raw SQL bypassing
+    Django's delete collector.
+    Tables are truncated with `TRUNCATE ... RESTART IDENTITY CASCADE` when all
+    dependent tables are purged as well, otherwise dependent foreign keys are
+    nullified and rows are removed with raw `DELETE`.
+
+    :param selected: models to be purged, dependants are purged too.
+    :type selected: List[Type[django.db.models.Model]]
+    :param exact: count rows exactly instead of estimating them.
+    :type exact: bool
+    :returns: number of purged rows by model.
+    :rtype: Dict[Type[django.db.models.Model], int]
+    """
+
+    purged, nullified = _purge_plan(selected)
+    quote = connection.ops.quote_name
+    counts = {}
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Deferred foreign key checks pending in outer transaction block TRUNCATE.
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
 
+        for field in nullified:
+            table = quote(field.model._meta.db_table)
+            column = quote(field.column)
+            cursor.execute(
+                f'UPDATE {table} SET {column} = NULL WHERE {column} IS NOT NULL'
+            )
 
-def run():
-    models = [Airline, Airport, Route, Flight]
+        if nullified:
+            for model in purged:
+                cursor.execute(f'DELETE FROM {quote(model._meta.db_table)}')
+                counts[model] = cursor.rowcount
+        else:
+            count = _exact_count if exact else estimated_count
+            counts = {model: count(model) for model in purged}
+            tables = ', '.join(quote(model._meta.db_table) for model in purged)
+            cursor.execute(f'TRUNCATE {tables} RESTART IDENTITY CASCADE')
 
-    for model in models:
+        # Sent in the same transaction, so statistics are refreshed
+        # and dataset version is bumped once on commit
+        for model in counts:
+            data_imported.send(sender=model)
+
+    return counts
+
+
+def purge(selected=MODELS):
+    """Purges selected models one by one using Django ORM.
+
+    :param selected: models to be purged.
+    :type selected: List[Type[django.db.models.Model]]
+    :returns: number of deleted rows by model, including cascaded ones.
+    :rtype: Dict[Type[django.db.models.Model], int]
+    """
+
+    counts = {}
+
+    for model in selected:
         all_objects = model.objects.all()
-        all_objects.delete()
+        _, by_label = all_objects.delete()
+        for label, count in by_label.items():
+            deleted_model = apps.get_model(label)
+            counts[deleted_model] = counts.get(deleted_model, 0) + count
+
+    return counts
+
+
+def _select_models(names):
+    """Finds models by comma separated case insensitive names.
+
+    :param names: comma separated model names, like 'route,flight'.
+    :type names: str
+    :rtype: List[Type[django.db.models.Model]]
+    """
+
+    by_name = {model.__name__.lower(): model for model in MODELS}
+    try:
+        return [by_name[name.strip().lower()] for name in names.split(',')]
+    except KeyError as e:
+        raise ValueError(f'Unknown model {e}, choose from {", ".join(by_name)}')
+
+
+def run(*args):
+    """Purges data. Supported `--script-args`:
+    `fast` to purge with `TRUNCATE` or raw `DELETE` in single transaction,
+    `models=route,flight` to purge only selected models (and their dependants),
+    `exact` to count rows purged in fast mode exactly instead of estimating them.
+    """
+
+    options = parse_script_args(args)
+    selected = MODELS
+    if 'models' in options:
+        selected = _select_models(options['models'])
+
+    # Truncated rows are estimated from planner statistics unless `exact`,
+    # deleted rows are always counted exactly
+    estimated = (
+        options.get('fast')
+        and not options.get('exact')
+        and not _purge_plan(selected)[1]
+    )
+
+    started = time.perf_counter()
+    if options.get('fast'):
+        counts = fast_purge(selected, exact=options.get('exact', False))
+    else:
+        counts = purge(selected)
+    elapsed = time.perf_counter() - started
+
+    for model, count in counts.items():
+        if estimated:
+            logging.warning(f'[{model}] Purged ~{count} rows (estimated)')
+        else:
+            logging.warning(f'[{model}] Purged {count} rows')
+    logging.warning(f'Purged in {elapsed:.3f}s')
@@ -0,0 +1,94 @@
+import logging
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from myflights.apps.core.models import Airline, Airport, Flight, Route
+from myflights.apps.core.utils import parse_script_args
+
+# Planner settings disabling all kinds of index access
+WITHOUT_INDEXES = ('enable_indexscan', 'enable_bitmapscan', 'enable_indexonlyscan')
+
+
+def sample_queries():
+    """Makes querysets for typical lookups, parameterized with existing data.
+
+    :returns: querysets by their descriptions
+    :rtype: Dict[str, django.db.models.QuerySet]
+    """
+
+    airport = Airport.objects.exclude(iata=None).exclude(icao=None).last()
+    airline = Airline.objects.exclude(icao=None).last()
+    route = Route.objects.last()
+    since = timezone.now()
+
+    queries = {}
+    if airport is not None:
+        queries.update(
+            {
+                'Airport by IATA code': Airport.objects.filter(iata=airport.iata),
+                'Airport by ICAO code': Airport.objects.filter(icao=airport.icao),
+                'Airport by OpenFlights id': Airport.objects.filter(
+                    openflights_id=airport.openflights_id
+                ),
+                'Airports by name substring': Airport.objects.filter(
+                    name__icontains=(airport.name or '')[:5]
+                ),
+            }
+        )
+    if airline is not None:
+        queries['Airline by ICAO code'] = Airline.objects.filter(icao=airline.icao)
+    if route is not None:
+        queries.update(
+            {
+                'Routes between Airports': Route.objects.filter(
+                    origin_airport_id=route.origin_airport_id,
+                    destination_airport_id=route.destination_airport_id,
+                ),
+                'Flights of Route in next week': Flight.objects.filter(
+                    route_id=route.pk,
+                    departure_date__range=(since, since + timedelta(days=7)),
+                ),
+            }
+        )
+    return queries
+
+
+def explain(queryset, use_indexes=True):
+    """Executes query with `EXPLAIN ANALYZE`, optionally with indexes disabled
+    in planner settings local to transaction.
+
+    :param queryset: query to be explained
+    :type queryset: django.db.models.QuerySet
+    :param use_indexes: let planner use indexes
+    :type use_indexes: bool
+    :returns: execution plan
+    :rtype: str
+    """
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        if not use_indexes:
+            for setting in WITHOUT_INDEXES:
+                cursor.execute(f'SET LOCAL {setting} = off')
+        return queryset.explain(analyze=True)
+
+
+def run(*args):
+    """Shows execution plans of typical lookups without and with indexes.
+    Supported `--script-args`: `verbose` to print queries and full plans
+    instead of first lines of plans and execution times.
+    """
+
+    options = parse_script_args(args)
+
+    for description, queryset in sample_queries().items():
+        logging.warning(description)
+        if options.get('verbose'):
+            logging.warning(f'  {queryset.query}')
+        for use_indexes in (False, True):
+            plan = explain(queryset, use_indexes).splitlines()
+            if not options.get('verbose'):
+                plan = [plan[0], plan[-1]]
+            label = 'with indexes' if use_indexes else 'without indexes'
+            logging.warning(f'  {label}:\n    ' + '\n    '.join(plan))
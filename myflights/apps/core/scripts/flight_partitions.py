@@ -0,0 +1,32 @@
+import logging
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+from myflights.apps.core import partitions
+from myflights.apps.core.utils import parse_script_args
+
+
+def run(*args):
+    """Maintains monthly partitions of Flights table, meant to be run daily.
+    Supported `--script-args`:
+    `ahead=N` to create partitions N months ahead, default is
+    `FLIGHT_PARTITIONS_AHEAD` setting,
+    `retain=N` to drop partitions older than N months before current one.
+    """
+
+    options = parse_script_args(args)
+
+    if not partitions.is_partitioned():
+        logging.warning('Flights table is not partitioned')
+        return
+
+    ahead = int(options.get('ahead', settings.FLIGHT_PARTITIONS_AHEAD))
+    created = partitions.ensure_partitions(ahead)
+    logging.warning(f'Created {len(created)} partitions')
+
+    if 'retain' in options:
+        current = partitions.month_start(datetime.now(timezone.utc))
+        before = partitions.add_months(current, -int(options['retain']))
+        for month in partitions.drop_partitions(before):
+            logging.warning(f'Dropped partition {partitions.partition_name(month)}')
@@ -0,0 +1,322 @@
+import io
+import time
+import logging
+import multiprocessing
+from datetime import date, datetime, timedelta, timezone
+from itertools import repeat
+
+import django
+import numpy as np
+from django.db import connections
+
+from myflights.apps.core import partitions
+from myflights.apps.core.loaders import CopyLoader
+from myflights.apps.core.models import Flight, Route
+from myflights.apps.core.utils import parse_script_args
+
+# Schedule granularity, departure and arrival times are multiples of it
+SLOT_SECONDS = 5 * 60
+DAY_SECONDS = 24 * 60 * 60
+# Local time window of departures
+FIRST_DEPARTURE_HOUR = 6
+LAST_DEPARTURE_HOUR = 22
+# Block time model: taxiing, climb and descent, cruise and intermediate stops
+TAXI_MINUTES = 30
+CRUISE_SPEED_KMH = 800
+STOP_MINUTES = 45
+
+
+class RouteTable:
+    """Columns of Route fields needed to schedule flights, as NumPy arrays.
+    """
+
+    def __init__(self, rows):
+        """Initializes `RouteTable` instance.
+
+        :param rows: tuples of route id, origin and destination Airport ids,
+        number of stops, origin UTC offset in hours and distance in kilometers.
+        :type rows: List[Tuple[Any, ...]]
+        """
+
+        columns = list(zip(*rows)) or [()] * 6
+        self.ids, self.origin_ids, self.destination_ids = (
+            np.array(column, dtype=np.int64) for column in columns[:3]
+        )
+        stops, offset, distances = (
+            np.array(column, dtype=np.float64) for column in columns[3:]
+        )
+        self.stops = np.nan_to_num(stops)
+        self.utc_offsets = np.nan_to_num(offset)
+        self.distances = np.nan_to_num(distances)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_database(cls, limit=None):
+        """Queries Routes which are not deleted from dataset.
+
+        :param limit: max number of Routes
+        :type limit: Optional[int]
+        :rtype: RouteTable
+        """
+
+        routes = Route.objects.alive().order_by('pk')[:limit]
+        return cls(
+            routes.values_list(
+                'id',
+                'origin_airport_id',
+                'destination_airport_id',
+                'stops',
+                'origin_airport__timezone_offset',
+                'distance_km',
+            )
+        )
+
+    def block_seconds(self):
+        """Estimates gate to gate time of every Route from great-circle distance
+        between Airports, rounded up to schedule slots.
+
+        :rtype: numpy.ndarray
+        """
+
+        minutes = (
+            TAXI_MINUTES
+            + self.distances / CRUISE_SPEED_KMH * 60
+            + self.stops * STOP_MINUTES
+        )
+        return np.ceil(minutes * 60 / SLOT_SECONDS).astype(np.int64) * SLOT_SECONDS
+
+    def departure_seconds(self, per_day, rng):
+        """Picks fixed daily departure times of every Route, spread over
+        local departure window of origin Airport, as seconds after UTC midnight.
+
+        :param per_day: number of flights per Route a day
+        :type per_day: int
+        :param rng: random generator
+        :type rng: numpy.random.RandomState
+        :returns: array of shape (number of Routes, `per_day`)
+        :rtype: numpy.ndarray
+        """
+
+        window = (LAST_DEPARTURE_HOUR - FIRST_DEPARTURE_HOUR) * 3600 / per_day
+        local = (
+            FIRST_DEPARTURE_HOUR * 3600
+            + np.arange(per_day) * window
+            + rng.uniform(0, window, (len(self), per_day))
+        )
+        utc = local - self.utc_offsets[:, None] * 3600
+        return (utc // SLOT_SECONDS).astype(np.int64) * SLOT_SECONDS
+
+
+def operating_days(start, days, weekdays):
+    """Lists days of schedule as seconds since epoch of their UTC midnights.
+
+    :param start: first day
+    :type start: datetime.date
+    :param days: number of days
+    :type days: int
+    :param weekdays: ISO week days of operation, as in "135" for Monday,
+    Wednesday and Friday.
+    :type weekdays: str
+    :rtype: numpy.ndarray
+    """
+
+    dates = np.arange(
+        np.datetime64(start, 'D'), np.datetime64(start + timedelta(days=days), 'D')
+    )
+    # 1970-01-01 was Thursday, ISO week day 4
+    isoweekdays = (dates.astype(np.int64) + 3) % 7 + 1
+    operated = np.isin(isoweekdays, [int(day) for day in weekdays])
+    return dates[operated].astype(np.int64) * DAY_SECONDS
+
+
+def format_timestamps(seconds):
+    """Formats seconds since epoch, which are multiples of `SLOT_SECONDS`,
+    as ISO 8601 UTC date times. Every distinct slot is formatted only once.
+
+    :param seconds: seconds since epoch
+    :type seconds: numpy.ndarray
+    :rtype: List[str]
+    """
+
+    first = seconds.min()
+    slots = np.arange(first, seconds.max() + 1, SLOT_SECONDS)
+    formatted = np.datetime_as_string(slots.astype('datetime64[s]'), timezone='UTC')
+    return formatted.astype(object)[(seconds - first) // SLOT_SECONDS].tolist()
+
+
+def format_ids(indices, ids):
+    """Formats ids of Routes or Airports, every distinct id is formatted only once.
+
+    :param indices: indices of Routes in `ids`
+    :type indices: numpy.ndarray
+    :param ids: ids by Route
+    :type ids: numpy.ndarray
+    :rtype: List[str]
+    """
+    return ids.astype(str).astype(object)[indices].tolist()
+
+
+def schedule(routes, days, timetable):
+    """Expands Routes to Flights of given days, vectorized over all Routes and days.
+
+    :param routes: scheduled Routes
+    :type routes: RouteTable
+    :param days: seconds since epoch of UTC midnights of operating days
+    :type days: numpy.ndarray
+    :param timetable: daily departure seconds after UTC midnight by Route,
+    see `RouteTable.departure_seconds`.
+    :type timetable: numpy.ndarray
+    :returns: Route indices, departure and arrival seconds since epoch of Flights
+    :rtype: Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]
+    """
+
+    indices = np.broadcast_to(np.arange(len(routes))[:, None], timetable.shape)
+    indices = np.broadcast_to(indices, (len(days),) + indices.shape).ravel()
+    departures = (days[:, None, None] + timetable).ravel()
+    return indices, departures, departures + routes.block_seconds()[indices]
+
+
+def write_flights(loader, routes, indices, departures, arrivals):
+    """Formats Flights in bulk and copies them with loader.
+
+    :param loader: loader of Flights
+    :type loader: CopyLoader
+    :param routes: scheduled Routes
+    :type routes: RouteTable
+    :param indices: Route indices of Flights
+    :type indices: numpy.ndarray
+    :param departures: departure seconds since epoch
+    :type departures: numpy.ndarray
+    :param arrivals: arrival seconds since epoch
+    :type arrivals: numpy.ndarray
+    """
+
+    now = datetime.now(timezone.utc).isoformat()
+    columns = {
+        'created_at': repeat(now),
+        'updated_at': repeat(now),
+        'route': format_ids(indices, routes.ids),
+        'origin_airport': format_ids(indices, routes.origin_ids),
+        'destination_airport': format_ids(indices, routes.destination_ids),
+        'departure_date': format_timestamps(departures),
+        'arrival_date': format_timestamps(arrivals),
+    }
+
+    rows = zip(*(columns[field.name] for field in loader.fields))
+    buffer = io.StringIO('\n'.join(map('\t'.join, rows)) + '\n')
+    loader.write_text(buffer, len(indices))
+
+
+def _load_chunk(task):
+    """Generates and loads Flights of chunk of days in its own transaction,
+    in worker process or in main one.
+
+    :param task: scheduled Routes, their timetable and operating days of chunk.
+    :type task: Tuple[RouteTable, numpy.ndarray, numpy.ndarray]
+    :returns: number of saved Flights
+    :rtype: int
+    """
+
+    routes, timetable, days = task
+
+    started = time.perf_counter()
+    with CopyLoader(Flight) as loader:
+        write_flights(loader, routes, *schedule(routes, days, timetable))
+    elapsed = time.perf_counter() - started
+
+    first = datetime.fromtimestamp(days[0], timezone.utc).date()
+    logging.warning(
+        f'[{Flight}] {loader.saved} flights of {len(days)} days from {first} '
+        f'saved in {elapsed:.1f}s'
+    )
+    return loader.saved
+
+
+def generate(
+    start,
+    days,
+    per_day=1,
+    weekdays='1234567',
+    limit=None,
+    seed=0,
+    chunk=7,
+    workers=None,
+):
+    """Generates Flights of every Route from `start` date for number of `days`.
+    Every Route departs at the same times on every operating day.
+    Each `chunk` of days is loaded with `COPY` in its own transaction,
+    chunks are loaded simultaneously if there are several `workers`.
+
+    :param start: first day
+    :type start: datetime.date
+    :param days: number of days
+    :type days: int
+    :param per_day: number of flights per Route a day
+    :type per_day: int
+    :param weekdays: ISO week days of operation, as in "135"
+    :type weekdays: str
+    :param limit: max number of Routes
+    :type limit: Optional[int]
+    :param seed: seed of random departure times
+    :type seed: int
+    :param chunk: number of days loaded at once
+    :type chunk: int
+    :param workers: number of worker processes
+    :type workers: Optional[int]
+    :returns: number of generated Flights
+    :rtype: int
+    """
+
+    routes = RouteTable.from_database(limit)
+    operated = operating_days(start, days, weekdays)
+    if not len(routes) or not len(operated):
+        return 0
+
+    if partitions.is_partitioned():
+        end = start + timedelta(days=days - 1)
+        months = (end.year - start.year) * 12 + end.month - start.month
+        partitions.ensure_partitions(months, today=start)
+
+    timetable = routes.departure_seconds(per_day, np.random.RandomState(seed))
+    chunks = np.split(operated, range(chunk, len(operated), chunk))
+    tasks = [(routes, timetable, part) for part in chunks]
+
+    if not workers or workers < 2:
+        return sum(map(_load_chunk, tasks))
+
+    # Forked workers must not share parent's connections, each opens its own.
+    connections.close_all()
+    with multiprocessing.Pool(workers, initializer=django.setup) as pool:
+        return sum(pool.imap_unordered(_load_chunk, tasks))
+
+
+def run(*args):
+    """Generates Flights schedule of all Routes. Supported `--script-args`:
+    `start=YYYY-MM-DD` first day, default is today,
+    `days=N` number of days, default is 30,
+    `per_day=N` flights per Route a day, default is 1,
+    `weekdays=135` ISO week days of operation, default is every day,
+    `routes=N` to schedule only first N Routes,
+    `seed=N` seed of random departure times,
+    `chunk=N` number of days loaded in one transaction, default is 7,
+    `workers=N` to load chunks in N processes.
+    """
+
+    options = parse_script_args(args)
+    start = options.get('start')
+    routes = options.get('routes')
+    workers = options.get('workers')
+
+    generated = generate(
+        start=date.fromisoformat(start) if start else date.today(),
+        days=int(options.get('days', 30)),
+        per_day=int(options.get('per_day', 1)),
+        weekdays=options.get('weekdays', '1234567'),
+        limit=int(routes) if routes else None,
+        seed=int(options.get('seed', 0)),
+        chunk=int(options.get('chunk', 7)),
+        workers=int(workers) if workers else None,
+    )
+    logging.warning(f'Generated {generated} flights')
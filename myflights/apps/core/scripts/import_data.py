@@ -1,26 +1,406 @@
+import io
+import os
+import re
+import mmap
 import sys
-import json 
+import json
+import hashlib
+import time
 import logging
+import multiprocessing
+from collections import Counter
+from itertools import islice
+
+import django
+import numpy as np
+from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.db import connections, transaction
+from django.utils import timezone
 from abc import ABC, abstractproperty
 from pathlib import Path
 
+from myflights.apps.core import resolvers
+from myflights.apps.core.geo import haversine_km
+from myflights.apps.core.loaders import get_loader_class
 from myflights.apps.core.models import Airline, Airport, Route
+from myflights.apps.core.signals import data_imported
+from myflights.apps.core.utils import parse_script_args
+
+
+class UnresolvedReference(ValueError):
+    """Raised by `_materialize` when item refers to objects which are not in database.
+    """
+
+    def __init__(self, references):
+        """Initializes `UnresolvedReference` instance.
+
+        :param references: pairs of referenced model name and OpenFlights id.
+        :type references: list[tuple[str, Any]]
+        """
+        self.references = references
+        super().__init__(
+            ', '.join(
+                f'{name} with openflights_id = {openflights_id} does not exist'
+                for name, openflights_id in references
+            )
+        )
+
+
+def iter_json_array(f, chunk_size=2 ** 16, has_start=True, has_end=True):
+    """Yields items of top level JSON array from file one by one.
+    File is read in chunks, so only current item is kept in memory.
+
+    :param f: text file object containing JSON array.
+    :type f: TextIO
+    :param chunk_size: number of characters to read from file at once.
+    :type chunk_size: int
+    :param has_start: whether file starts with opening bracket of array,
+    otherwise it starts right after separator of items. Default is True
+    :type has_start: bool
+    :param has_end: whether file ends with closing bracket of array,
+    otherwise it ends right after separator of items. Default is True
+    :type has_end: bool
+    """
+
+    decoder = json.JSONDecoder()
+    separators = re.compile(r'[\s,]*')
+
+    buffer = f.read(chunk_size).lstrip()
+    if has_start and not buffer.startswith('['):
+        raise ValueError('File does not contain JSON array')
+
+    position = 1 if has_start else 0
+    eof = False
+
+    while True:
+        position = separators.match(buffer, position).end()
+
+        if position < len(buffer) and buffer[position] == ']':
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            end = None
+
+        # Item might be cut off by the end of current chunk, read more and retry.
+        if end is None or (end == len(buffer) and not eof):
+            if eof:
+                if not has_end and position == len(buffer):
+                    return
+                raise ValueError('File contains malformed JSON array')
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+
+        yield item
+        position = end
+
+
+def iter_json_lines(lines):
+    """Yields items of JSON Lines file one by one.
+
+    :param lines: lines of file containing one JSON document per line.
+    :type lines: Iterable[Union[str, bytes]]
+    """
+
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_lines(f, start, end):
+    """Yields lines of binary file starting within byte range.
+
+    :param f: binary file object.
+    :type f: BinaryIO
+    :param start: offset of the first line.
+    :type start: int
+    :param end: offset after which no line starts.
+    :type end: int
+    """
+
+    f.seek(start)
+    position = start
+    for line in f:
+        if position >= end:
+            return
+        position += len(line)
+        yield line
+
+
+def iter_record_batches(file, batch_size, start=0, end=None):
+    """Yields items of Parquet or Arrow IPC file one by one.
+    File is memory-mapped and converted to Python objects batch by batch,
+    only row groups of Parquet file holding requested rows are read.
+    Requires `pyarrow`.
+
+    :param file: path to '.parquet' or '.arrow' file.
+    :type file: pathlib.Path
+    :param batch_size: max number of rows converted at once.
+    :type batch_size: int
+    :param start: index of the first row. Default is 0
+    :type start: int
+    :param end: index of row after the last one. Default is all rows
+    :type end: int
+    """
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    offset = 0
+    if end is None:
+        end = count_rows(file)
+
+    if file.suffix == '.parquet':
+        parquet_file = pq.ParquetFile(file, memory_map=True)
+        row_groups, position = [], 0
+        for row_group in range(parquet_file.num_row_groups):
+            rows = parquet_file.metadata.row_group(row_group).num_rows
+            if position + rows <= start:
+                offset += rows
+            elif position < end:
+                row_groups.append(row_group)
+            position += rows
+        record_batches = parquet_file.iter_batches(batch_size, row_groups=row_groups)
+    else:
+        reader = pa.ipc.open_file(pa.memory_map(str(file)))
+        record_batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+
+    for record_batch in record_batches:
+        first = max(start - offset, 0)
+        last = min(end - offset, record_batch.num_rows)
+        offset += record_batch.num_rows
+        for position in range(first, last, batch_size):
+            length = min(batch_size, last - position)
+            yield from record_batch.slice(position, length).to_pylist()
+        if offset >= end:
+            return
+
+
+def count_rows(file):
+    """Counts rows of Parquet or Arrow IPC file from its metadata.
+    Requires `pyarrow`.
+
+    :param file: path to '.parquet' or '.arrow' file.
+    :type file: pathlib.Path
+    :rtype: int
+    """
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if file.suffix == '.parquet':
+        return pq.ParquetFile(file, memory_map=True).metadata.num_rows
+
+    reader = pa.ipc.open_file(pa.memory_map(str(file)))
+    return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+
+def split_range(total, count):
+    """Splits range of `total` units into `count` contiguous ranges of similar size.
+
+    :param total: number of units
+    :type total: int
+    :param count: number of ranges
+    :type count: int
+    :rtype: List[Tuple[int, int]]
+    """
+
+    bounds = [total * i // count for i in range(count + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+
+def split_json_lines(file, count):
+    """Splits JSON Lines file into `count` byte ranges of similar size,
+    every range starts at the beginning of a line.
+
+    :param file: path to '.jsonl' file.
+    :type file: pathlib.Path
+    :param count: number of ranges
+    :type count: int
+    :rtype: List[Tuple[int, int]]
+    """
+
+    size = file.stat().st_size
+    bounds = [0]
+    with open(file, 'rb') as f:
+        for start, end in split_range(size, count)[1:]:
+            offset = max(start, bounds[-1])
+            if offset:
+                # Skips rest of the line which starts before offset
+                f.seek(offset - 1)
+                f.readline()
+                offset = f.tell()
+            bounds.append(offset)
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+# JSON string
+JSON_STRING = rb'"[^"\\]*(?:\\.[^"\\]*)*"'
+# Structural character of JSON or whole object or array without nested ones,
+# strings and other values preceding it are skipped
+JSON_STRUCTURE = re.compile(
+    rb'[^"\[\]{},]*(?:%s[^"\[\]{},]*)*'
+    rb'([\[{][^"\[\]{}]*(?:%s[^"\[\]{}]*)*[\]}]|[\[\]{},])'
+    % (JSON_STRING, JSON_STRING),
+    re.S,
+)
+
+
+def split_json_array(file, count):
+    """Splits JSON array file into `count` byte ranges of similar size,
+    every range but the first starts right after separator of top level items.
+    Only structure of file is scanned, items are not decoded.
+
+    :param file: path to '.json' file.
+    :type file: pathlib.Path
+    :param count: number of ranges
+    :type count: int
+    :rtype: List[Tuple[int, int]]
+    """
+
+    size = file.stat().st_size
+    targets = [start for start, end in split_range(size, count)[1:]]
+    bounds = [0]
+    depth = 0
+
+    if size:
+        with open(file, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with data:
+            for match in JSON_STRUCTURE.finditer(data):
+                if len(bounds) == count:
+                    break
+                token = match.group(1)
+                if token in (b'[', b'{'):
+                    depth += 1
+                elif token in (b']', b'}'):
+                    depth -= 1
+                elif token != b',':
+                    continue
+                elif depth == 1 and match.end() >= targets[len(bounds) - 1]:
+                    bounds.append(match.end())
+
+    bounds.extend([size] * (count + 1 - len(bounds)))
+    return list(zip(bounds, bounds[1:]))
+
+
+class FileRange(io.RawIOBase):
+    """Read-only raw stream of byte range of binary file.
+    """
+
+    def __init__(self, f, start, end):
+        """Initializes `FileRange` instance.
+
+        :param f: binary file object
+        :type f: BinaryIO
+        :param start: offset of the first byte
+        :type start: int
+        :param end: offset after the last byte
+        :type end: int
+        """
+
+        super().__init__()
+        self.file = f
+        self.position = start
+        self.end = end
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self.end - self.position)
+        if size <= 0:
+            return 0
+        self.file.seek(self.position)
+        data = self.file.read(size)
+        buffer[: len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+
+def batches(iterable, size):
+    """Splits iterable into lists of at most `size` items.
+
+    :param iterable: items to be split
+    :type iterable: Iterable[Any]
+    :param size: max size of single batch
+    :type size: int
+    """
+
+    iterator = iter(iterable)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
 
 
 class BaseImporter(ABC):
     """Abstract class that provides interface and base functionality
-    to import data from JSON to database.
+    to import data from JSON, JSON Lines, Parquet or Arrow IPC files to database.
     """
+
     Model = None
     batch_size = 100
-
-    def __init__(self):
+    # Relationship fields already resolved by `_materialize`, skipped by `clean_fields`.
+    resolved_fields = ()
+    # Importers which data has to be imported first.
+    dependencies = ()
+    # Whether data could be split between parallel workers.
+    partitioned = False
+    # Fields identifying object between imports, used by incremental `sync`.
+    key_fields = ('openflights_id',)
+    # Fields not included in content hash.
+    unhashed_fields = ('id', 'created_at', 'updated_at', 'content_hash', 'deleted_at')
+
+    def __init__(
+        self,
+        data_dir=Path('data'),
+        data_format='json',
+        loader=None,
+        batch_size=None,
+        partition=None,
+        notify=True,
+    ):
         """Initializes `BaseImporter` instance.
+
+        :param data_dir: path to directory with JSON data files. Default is './data'
+        :type data_dir: pathlib.Path
+        :param data_format: format of data files: 'json', 'jsonl', 'parquet' or
+        'arrow'. Default is 'json'
+        :type data_format: str
+        :param loader: name of loader backend used to save objects, 'orm' or 'copy'.
+        Default is `IMPORT_LOADER` setting
+        :type loader: str
+        :param batch_size: number of objects saved at once. Default is `batch_size`
+        :type batch_size: int
+        :param partition: range of file to be imported, as made by `partitions`.
+        Default is the whole file
+        :type partition: Tuple[int, int]
+        :param notify: send `data_imported` once objects are saved. Default is True
+        :type notify: bool
         """
 
-        self.file = Path('data') / self.filename
+        self.file = (data_dir / self.filename).with_suffix(f'.{data_format}')
+        self.loader = loader or settings.IMPORT_LOADER
+        if batch_size:
+            self.batch_size = int(batch_size)
+        self.partition = partition
+        self.notify = notify
         self.new_objects = []
+        self.unresolved = Counter()
+        self.unresolved_items = 0
+        self.saved = 0
+        self.hashed_fields = [
+            field
+            for field in self.Model._meta.concrete_fields
+            if field.name not in self.unhashed_fields
+        ]
 
     def _log(self, msg):
         """Logs tagged warning messages.
@@ -37,45 +417,273 @@ class BaseImporter(ABC):
         """
         pass
 
+    def partitions(self, count):
+        """Splits corresponding file into contiguous parts of similar size,
+        so that every parallel worker reads and decodes only its own part.
+
+        :param count: number of parts
+        :type count: int
+        :returns: ranges of bytes of JSON files or ranges of rows of columnar files.
+        :rtype: List[Tuple[int, int]]
+        """
+
+        if self.file.suffix in ('.parquet', '.arrow'):
+            return split_range(count_rows(self.file), count)
+        if self.file.suffix == '.jsonl':
+            return split_json_lines(self.file, count)
+        return split_json_array(self.file, count)
+
+    def _read(self):
+        """Reads items of current partition from corresponding file one by one.
+        """
+
+        start, end = self.partition or (0, None)
+
+        if self.file.suffix in ('.parquet', '.arrow'):
+            yield from iter_record_batches(self.file, self.batch_size, start, end)
+            return
+
+        with open(self.file, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if end is None:
+                end = size
+            if start == end:
+                return
+            if self.file.suffix == '.jsonl':
+                yield from iter_json_lines(iter_lines(f, start, end))
+            else:
+                text = io.TextIOWrapper(
+                    io.BufferedReader(FileRange(f, start, end)), encoding='utf-8'
+                )
+                yield from iter_json_array(
+                    text, has_start=start == 0, has_end=end == size
+                )
+
+    def _log_unresolved(self):
+        """Logs single summary of all unresolved references collected during `load`.
+        """
+
+        if not self.unresolved_items:
+            return
+
+        by_model = {}
+        for (name, openflights_id), count in self.unresolved.most_common():
+            by_model.setdefault(name, []).append(openflights_id)
+
+        details = '; '.join(
+            f'{name} x {len(ids)} ids {ids[:10]}' for name, ids in by_model.items()
+        )
+        self._log(
+            f'{self.unresolved_items} items won\'t be imported due to '
+            f'unresolved references: {details}'
+        )
+
+    def _prepare(self):
+        """Override to query everything needed by `_materialize` before loading.
+        """
+        pass
+
     def _materialize(self, item):
         """Override to substitute identifiers in `item` with model objects
         to satisfy relationship requirements if any.
+        Raise `UnresolvedReference` when referenced objects do not exist.
         """
         return item
 
-    def load(self):
-        """Deserializes data from corresponding JSON file and creates model objects.
-        This also calls `_materialize` where model object's relationships could be satisfied.
+    def _content_hash(self, obj):
+        """Calculates hash of object's imported field values
+        to detect changed objects between imports.
+
+        :param obj: model object
+        :type obj: django.db.models.Model
+        :rtype: str
         """
 
-        self._log(f'Loading data from file {self.file}')
+        values = [
+            field.get_prep_value(getattr(obj, field.attname))
+            for field in self.hashed_fields
+        ]
+        content = json.dumps(values, default=str)
+        return hashlib.sha1(content.encode()).hexdigest()
+
+    def _key(self, obj):
+        """Makes key identifying object between imports from `key_fields`.
+
+        :param obj: model object
+        :type obj: django.db.models.Model
+        :rtype: Tuple[Any]
+        """
+        return tuple(getattr(obj, field) for field in self.key_fields)
+
+    def _build_objects(self):
+        """Creates and validates model objects from items read from file one by one.
+        This also calls `_materialize` where model object's relationships could be satisfied.
+        """
 
-        with open(self.file) as f:
-            data = json.load(f)
+        self._prepare()
 
-        for item in data:
+        for item in self._read():
             try:
                 new_object = self.Model(**self._materialize(item))
-                new_object.clean_fields()
-                self.new_objects.append(new_object)
+                new_object.clean_fields(exclude=self.resolved_fields)
+                new_object.content_hash = self._content_hash(new_object)
+                yield new_object
+            except UnresolvedReference as e:
+                self.unresolved.update(e.references)
+                self.unresolved_items += 1
             except ValidationError:
                 self._log(f'{item} won\'t be imported due to Validation failure')
             except ValueError as e:
                 self._log(f'{item} won\'t be imported due to {e}')
 
+        self._log_unresolved()
+
+    def load(self):
+        """Deserializes data from corresponding JSON file and creates model objects.
+        """
+
+        self._log(f'Loading data from file {self.file}')
+
+        self.new_objects.extend(self._build_objects())
+
         self._log(f'Created {len(self.new_objects)} objects')
 
+    def _loader(self):
+        """Creates loader backend selected by `loader` option.
+
+        :rtype: myflights.apps.core.loaders.BaseLoader
+        """
+        Loader = get_loader_class(self.loader)
+        return Loader(self.Model, self.batch_size)
+
     def save(self):
-        """Saves all created models using `bulk_create`.
+        """Saves all created models using selected loader backend.
+        """
+
+        self._log(f'Saving with {self.loader} loader in batches=[{self.batch_size}]')
+
+        with self._loader() as loader:
+            loader.write(self.new_objects)
+
+        self.saved = loader.saved
+        self._log(f'Saved {self.saved} objects')
+        if self.notify:
+            data_imported.send(sender=self.Model)
+
+    def stream(self):
+        """Loads and saves objects batch by batch as they are read from file,
+        so memory usage is bounded by `batch_size` rather than by file size.
+        """
+
+        self._log(
+            f'Streaming data from file {self.file} with {self.loader} loader '
+            f'in batches=[{self.batch_size}]'
+        )
+
+        with self._loader() as loader:
+            for batch in batches(self._build_objects(), self.batch_size):
+                loader.write(batch)
+
+        self.saved = loader.saved
+        self._log(f'Saved {self.saved} objects')
+        if self.notify:
+            data_imported.send(sender=self.Model)
+
+    def sync(self, vanished='keep'):
+        """Incrementally synchronizes table with corresponding file in single transaction.
+        Objects are matched by `key_fields`, new objects are inserted,
+        objects with changed content hash are updated and others are left untouched.
+
+        :param vanished: what to do with objects missing from file:
+        'keep' them, 'soft' delete them by setting `deleted_at` or 'hard' delete them.
+        Default is 'keep'
+        :type vanished: str
         """
 
-        self._log(f'Saving in batches=[{self.batch_size}]')
+        if vanished not in ('keep', 'soft', 'hard'):
+            raise ValueError(f'Unknown vanished objects policy {vanished!r}')
+        if self.partition is not None:
+            raise ValueError('Partial data could not be synchronized')
 
-        self.Model.objects.bulk_create(self.new_objects, self.batch_size)
+        self._log(f'Synchronizing data from file {self.file}')
+
+        existing = {}
+        rows = self.Model.objects.values_list(
+            *self.key_fields, 'pk', 'content_hash', 'deleted_at'
+        )
+        for *key, pk, content_hash, deleted_at in rows.iterator():
+            existing.setdefault(tuple(key), (pk, content_hash, deleted_at))
+
+        update_fields = [field.name for field in self.hashed_fields] + [
+            'content_hash',
+            'deleted_at',
+            'updated_at',
+        ]
+        seen = set()
+        new_objects = []
+        changed_objects = []
+        stats = Counter()
+
+        with transaction.atomic(), self._loader() as loader:
+            for new_object in self._build_objects():
+                key = self._key(new_object)
+                if key in seen:
+                    stats['duplicated'] += 1
+                    continue
+                seen.add(key)
+
+                if key not in existing:
+                    new_objects.append(new_object)
+                else:
+                    pk, content_hash, deleted_at = existing[key]
+                    if content_hash == new_object.content_hash and deleted_at is None:
+                        stats['unchanged'] += 1
+                        continue
+                    new_object.pk = pk
+                    new_object.deleted_at = None
+                    new_object.updated_at = timezone.now()
+                    changed_objects.append(new_object)
+
+                if len(new_objects) == self.batch_size:
+                    loader.write(new_objects)
+                    new_objects = []
+                if len(changed_objects) == self.batch_size:
+                    self.Model.objects.bulk_update(changed_objects, update_fields)
+                    stats['updated'] += len(changed_objects)
+                    changed_objects = []
+
+            loader.write(new_objects)
+            self.Model.objects.bulk_update(changed_objects, update_fields)
+            stats['updated'] += len(changed_objects)
+
+            vanished_pks = [
+                pk
+                for key, (pk, content_hash, deleted_at) in existing.items()
+                if key not in seen and (deleted_at is None or vanished == 'hard')
+            ]
+            vanished_objects = self.Model.objects.filter(pk__in=vanished_pks)
+            if vanished == 'soft':
+                stats['deleted'] = vanished_objects.update(
+                    deleted_at=timezone.now(), updated_at=timezone.now()
+                )
+            elif vanished == 'hard':
+                stats['deleted'] = vanished_objects.delete()[0]
+
+        stats['created'] = loader.saved
+        self.saved = stats['created'] + stats['updated']
+        self.sync_stats = stats
+        self._log(
+            'Synchronized: {created} created, {updated} updated, '
+            '{unchanged} unchanged, {deleted} deleted, '
+            '{duplicated} duplicated keys skipped'.format_map(stats)
+        )
+        if self.notify:
+            data_imported.send(sender=self.Model)
 
 
 class AirlineImporter(BaseImporter):
     Model = Airline
+    partitioned = True
 
     @property
     def filename(self):
@@ -86,6 +694,7 @@ class AirlineImporter(BaseImporter):
 
 class AirportImporter(BaseImporter):
     Model = Airport
+    partitioned = True
 
     @property
     def filename(self):
@@ -96,6 +705,12 @@ class AirportImporter(BaseImporter):
 
 class RouteImporter(BaseImporter):
     Model = Route
+    resolved_fields = ('origin_airport', 'destination_airport', 'airline')
+    dependencies = (AirlineImporter, AirportImporter)
+    partitioned = True
+    key_fields = ('airline_id', 'origin_airport_id', 'destination_airport_id')
+    # Distance is derived from Airports, which are part of key
+    unhashed_fields = BaseImporter.unhashed_fields + ('distance_km',)
 
     @property
     def filename(self):
@@ -103,63 +718,290 @@ class RouteImporter(BaseImporter):
         """
         return 'routes.json'
 
-    def _lookup_airport(self, openflights_id):
-        """Queries Airport object by given openflights_id.
-        Raises ValueError if object not found.
+    def _build_objects(self):
+        """Creates and validates Routes, filling distances batch by batch.
+        """
 
-        :param openflights_id: id from OpenFlights dataset.
-        :type openflights_id: int
+        for batch in batches(super()._build_objects(), self.batch_size):
+            self._fill_distances(batch)
+            yield from batch
+
+    def _fill_distances(self, routes):
+        """Calculates distances of all Routes at once from coordinates of Airports.
+
+        :param routes: Routes with resolved Airports
+        :type routes: List[Route]
         """
-        try:
-            return Airport.objects.get(openflights_id=openflights_id)
-        except Airport.DoesNotExist:
-            raise ValueError(
-                f'Airport with openflights_id = {openflights_id} does not exist'
-            )
 
-    def _lookup_airline(self, openflights_id):
-        """Queries Airline object by given openflights_id.
-        Raises ValueError if object not found.
+        coordinates = np.array(
+            [
+                self.coordinates[route.origin_airport_id]
+                + self.coordinates[route.destination_airport_id]
+                for route in routes
+            ],
+            dtype=np.float64,
+        ).reshape(-1, 4)
+        distances = haversine_km(*coordinates.T)
+        for route, distance in zip(routes, distances.tolist()):
+            route.distance_km = distance
+
+    def _prepare(self):
+        """Takes OpenFlights id to primary key maps of all Airports and Airlines
+        and coordinates of Airports from fresh resolver snapshots,
+        so neither `_materialize` nor `_fill_distances` hit database for every route.
+        """
 
+        airports = resolvers.airports.snapshot(fresh=True)
+        self.airport_ids = self._lookup_map(airports)
+        self.airline_ids = self._lookup_map(resolvers.airlines.snapshot(fresh=True))
+        self.coordinates = {
+            ref.pk: (ref.latitude, ref.longitude) for ref in airports.by_pk.values()
+        }
+
+    def _lookup_map(self, snapshot):
+        """Maps OpenFlights ids to primary keys of all objects of resolver snapshot.
+
+        :param snapshot: Airport or Airline resolver snapshot
+        :type snapshot: myflights.apps.core.resolvers.Snapshot
+        :returns: primary keys keyed by OpenFlights ids
+        :rtype: Dict[int, int]
+        """
+        return {
+            openflights_id: ref.pk
+            for openflights_id, ref in snapshot.by_openflights_id.items()
+        }
+
+    def _lookup(self, ids, openflights_id):
+        """Looks up primary key by given openflights_id in preloaded `ids` map.
+        Returns None if object not found.
+
+        :param ids: primary keys keyed by OpenFlights ids.
+        :type ids: Dict[int, int]
         :param openflights_id: id from OpenFlights dataset.
-        :type openflights_id: int
+        :type openflights_id: Union[int, str]
         """
         try:
-            return Airline.objects.get(openflights_id=openflights_id)
-        except Airline.DoesNotExist:
-            raise ValueError(
-                f'Airline with openflights_id = {openflights_id} does not exist'
-            )
+            return ids.get(int(openflights_id))
+        except (TypeError, ValueError):
+            return None
 
     def _materialize(self, item):
-        """Substitutes airports and airline IDs with actual objects
+        """Substitutes airports and airline OpenFlights IDs with primary keys
         to satisfy relationships in Route.
         """
-        origin_airport_id = item['origin_airport']
-        destination_airport_id = item['destination_airport']
-        airline_id = item['airline']
+        references = [
+            ('origin_airport', Airport, self.airport_ids),
+            ('destination_airport', Airport, self.airport_ids),
+            ('airline', Airline, self.airline_ids),
+        ]
+
+        missing = []
+        for field, Model, ids in references:
+            openflights_id = item.pop(field)
+            pk = self._lookup(ids, openflights_id)
+            if pk is None:
+                missing.append((Model.__name__, openflights_id))
+            item[f'{field}_id'] = pk
+
+        if missing:
+            raise UnresolvedReference(missing)
 
-        origin_airport = self._lookup_airport(openflights_id=origin_airport_id)
-        destination_airport = self._lookup_airport(
-            openflights_id=destination_airport_id
-        )
+        return item
 
-        airline = self._lookup_airline(openflights_id=airline_id)
 
-        item['origin_airport'] = origin_airport
-        item['destination_airport'] = destination_airport
-        item['airline'] = airline
+def notify_imported(importers):
+    """Sends `data_imported` for every importer in single transaction,
+    so that statistics are refreshed and dataset version is bumped once
+    for the whole import, when transaction is committed.
 
-        return item
+    :param importers: importer classes which data was imported.
+    :type importers: Iterable[Type[BaseImporter]]
+    """
 
+    with transaction.atomic():
+        for Importer in importers:
+            data_imported.send(sender=Importer.Model)
 
-def main():
-    importers = [AirlineImporter(), AirportImporter(), RouteImporter()]
 
-    for importer in importers:
+def _run_task(task):
+    """Runs single importer in worker process. It doesn't send `data_imported`,
+    scheduler sends it once all partitions are imported.
+
+    :param task: importer class, its partition and options.
+    :type task: Tuple[Type[BaseImporter], Tuple[int, int], Dict[str, Any]]
+    :returns: importer name, partition, number of saved objects and elapsed seconds.
+    :rtype: Tuple[str, Tuple[int, int], int, float]
+    """
+
+    Importer, partition, options = task
+    streaming = options.pop('streaming', False)
+    importer = Importer(partition=partition, notify=False, **options)
+
+    started = time.perf_counter()
+    if streaming:
+        importer.stream()
+    else:
         importer.load()
         importer.save()
+    elapsed = time.perf_counter() - started
+
+    return Importer.__name__, partition, importer.saved, elapsed
 
 
-def run():
-    main()
+class ImportScheduler:
+    """Runs importers in stages ordered by their dependencies.
+    Importers of the same stage run simultaneously in a pool of worker processes,
+    files of partitioned importers are split between all workers.
+    Every worker uses its own database connection.
+    """
+
+    def __init__(self, importers, workers=None, **options):
+        """Initializes `ImportScheduler` instance.
+
+        :param importers: importer classes to be run.
+        :type importers: List[Type[BaseImporter]]
+        :param workers: number of worker processes. Default is number of CPUs
+        :type workers: int
+        :param options: keyword arguments passed to every importer.
+        :type options: Dict[str, Any]
+        """
+
+        self.importers = importers
+        self.workers = int(workers or os.cpu_count())
+        self.options = options
+        self.report = []
+
+    def stages(self):
+        """Groups importers into stages, every importer runs after
+        all its dependencies are imported in previous stages.
+
+        :returns: list of importer classes for every stage.
+        :rtype: List[List[Type[BaseImporter]]]
+        """
+
+        stages = []
+        done = set()
+        pending = list(self.importers)
+
+        while pending:
+            stage = [
+                Importer
+                for Importer in pending
+                if all(
+                    dependency in done or dependency not in self.importers
+                    for dependency in Importer.dependencies
+                )
+            ]
+            if not stage:
+                raise ValueError(f'Circular dependencies between {pending}')
+
+            stages.append(stage)
+            done.update(stage)
+            pending = [Importer for Importer in pending if Importer not in done]
+
+        return stages
+
+    def _tasks(self, stage):
+        """Makes worker tasks for importers of the stage.
+
+        :param stage: importer classes
+        :type stage: List[Type[BaseImporter]]
+        :rtype: List[Tuple[Type[BaseImporter], Tuple[int, int], Dict[str, Any]]]
+        """
+
+        options = {
+            name: value for name, value in self.options.items() if name != 'streaming'
+        }
+        tasks = []
+        for Importer in stage:
+            if Importer.partitioned and self.workers > 1:
+                partitions = Importer(**options).partitions(self.workers)
+            else:
+                partitions = [None]
+            tasks.extend(
+                (Importer, partition, dict(self.options)) for partition in partitions
+            )
+        return tasks
+
+    def run(self):
+        """Runs all stages one by one and logs timing report.
+        `data_imported` is sent once for every importer after all stages.
+
+        :returns: stage names, elapsed seconds and results of stage tasks.
+        :rtype: List[Dict[str, Any]]
+        """
+
+        # Forked workers must not share parent's connections, each opens its own.
+        connections.close_all()
+
+        with multiprocessing.Pool(self.workers, initializer=django.setup) as pool:
+            for stage in self.stages():
+                name = ', '.join(Importer.__name__ for Importer in stage)
+                started = time.perf_counter()
+                results = pool.map(_run_task, self._tasks(stage))
+                elapsed = time.perf_counter() - started
+                self.report.append(
+                    {'stage': name, 'elapsed': elapsed, 'tasks': results}
+                )
+
+        notify_imported(self.importers)
+        self._log_report()
+        return self.report
+
+    def _log_report(self):
+        """Logs elapsed time of every stage and its tasks.
+        """
+
+        for number, stage in enumerate(self.report, 1):
+            logging.warning(
+                f'Stage {number} [{stage["stage"]}] finished in {stage["elapsed"]:.2f}s'
+            )
+            for name, partition, saved, elapsed in stage['tasks']:
+                part = f' [{partition[0]}:{partition[1]}]' if partition else ''
+                logging.warning(f'  {name}{part}: {saved} objects in {elapsed:.2f}s')
+
+
+def main(streaming=False, workers=None, sync=False, vanished='keep', **options):
+    importers = [AirlineImporter, AirportImporter, RouteImporter]
+
+    if workers and not sync:
+        scheduler = ImportScheduler(
+            importers, workers=workers, streaming=streaming, **options
+        )
+        scheduler.run()
+        return
+
+    for Importer in importers:
+        importer = Importer(notify=False, **options)
+        if sync:
+            importer.sync(vanished=vanished)
+        elif streaming:
+            importer.stream()
+        else:
+            importer.load()
+            importer.save()
+
+    notify_imported(importers)
+
+
+def run(*args):
+    """Runs import. Supported `--script-args`:
+    `stream` to save data batch by batch while reading it,
+    `format=jsonl`, `format=parquet` or `format=arrow` to import files
+    written by `prepare_data` in that format,
+    `loader=copy` to save data with PostgreSQL COPY,
+    `batch_size=N` to override number of objects saved at once,
+    `workers=N` to run independent importers and partitions in N processes,
+    `sync` to update existing data incrementally instead of importing it anew,
+    `vanished=soft` or `vanished=hard` to delete objects missing from data on sync.
+    """
+    options = parse_script_args(args)
+    main(
+        streaming=options.get('stream', False),
+        workers=options.get('workers'),
+        sync=options.get('sync', False),
+        vanished=options.get('vanished', 'keep'),
+        data_format=options.get('format', 'json'),
+        loader=options.get('loader'),
+        batch_size=options.get('batch_size'),
+    )
@@ -0,0 +1,329 @@
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from itertools import chain
+
+import numpy as np
+from django.db.models import Count
+
+from myflights.apps.core.models import Airline, Airport, Route
+from myflights.apps.core.versioning import VersionedCache
+
+# Relevance of query term matching token of document exactly, by prefix
+# and by prefix with typos; relevances of all terms are summed up
+EXACT_MATCH = 2.0
+PREFIX_MATCH = 1.0
+FUZZY_MATCH = 0.5
+# Relevance added when the whole query is IATA or ICAO code of document
+CODE_MATCH = 4.0
+# Number of tokens sharing most trigrams with misspelled term compared by edit distance
+FUZZY_CANDIDATES = 10
+
+TOKEN = re.compile(r'[0-9a-z]+')
+
+
+def tokenize(text):
+    """Splits text to lower case alphanumeric tokens with accents removed.
+
+    :param text: text, may be None
+    :type text: Optional[str]
+    :rtype: List[str]
+    """
+
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return TOKEN.findall(text.casefold())
+
+
+def trigrams(token):
+    """Splits token to trigrams, padded at start only,
+    so that prefix of token shares all its trigrams with the token.
+
+    :param token: token
+    :type token: str
+    :rtype: Set[str]
+    """
+
+    padded = f'  {token}'
+    return {''.join(chars) for chars in zip(padded, padded[1:], padded[2:])}
+
+
+def max_typos(term):
+    """Number of typos tolerated in query term, none in short terms and codes.
+
+    :param term: query term
+    :type term: str
+    :rtype: int
+    """
+    return 0 if len(term) < 4 else 1 if len(term) < 8 else 2
+
+
+def prefix_distance(term, token, limit):
+    """Calculates edit distance between term and the closest prefix of token.
+
+    :param term: query term
+    :type term: str
+    :param token: indexed token
+    :type token: str
+    :param limit: max distance of interest, prefixes longer than term
+    by more than `limit` characters are not compared.
+    :type limit: int
+    :rtype: int
+    """
+
+    longest = len(term) + limit
+    token = token[:longest]
+    previous = list(range(len(token) + 1))
+    for i, char in enumerate(term, 1):
+        current = [i]
+        for j, other in enumerate(token, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char != other),
+                )
+            )
+        if min(current) > limit:
+            return min(current)
+        previous = current
+    shortest = min(max(0, len(term) - limit), len(token))
+    return min(previous[shortest:])
+
+
+class SearchIndex:
+    """In-memory autocomplete index of Airports and Airlines.
+
+    Tokens of all searchable fields are kept sorted, so tokens starting with
+    query term form contiguous range found by binary search. Documents containing
+    tokens are stored flat in the same order, so documents matching prefix
+    are a single slice regardless of prefix length. Misspelled terms are looked up
+    in trigram index of tokens and confirmed by edit distance.
+    Matches are ranked by relevance and then by number of Routes of document.
+    """
+
+    def __init__(self, documents):
+        """Initializes `SearchIndex` instance.
+
+        :param documents: search results, their searchable texts
+        and weights, i.e. number of Routes.
+        :type documents: Iterable[Tuple[Dict[str, Any], List[str], int]]
+        """
+
+        self.results, self.codes = [], defaultdict(list)
+        weights, document_tokens = [], defaultdict(set)
+
+        for document, (result, texts, weight) in enumerate(documents):
+            self.results.append(result)
+            weights.append(weight)
+            for code in (result['iata'], result['icao']):
+                if code:
+                    self.codes[code.casefold()].append(document)
+            for token in chain.from_iterable(tokenize(text) for text in texts):
+                document_tokens[token].add(document)
+
+        self.kinds = np.array([result['type'] for result in self.results])
+        # Popularity in range [0, 1) breaks ties between equally relevant matches
+        weights = np.log1p(np.array(weights, dtype=np.float64))
+        self.popularity = weights / (weights.max() + 1) if len(weights) else weights
+
+        self.tokens = sorted(document_tokens)
+        postings = [sorted(document_tokens[token]) for token in self.tokens]
+        self.offsets = np.cumsum([0] + [len(posting) for posting in postings])
+        self.postings = np.fromiter(
+            chain.from_iterable(postings), dtype=np.int32, count=self.offsets[-1]
+        )
+
+        token_trigrams = defaultdict(list)
+        for position, token in enumerate(self.tokens):
+            for trigram in trigrams(token):
+                token_trigrams[trigram].append(position)
+        self.trigrams = {
+            trigram: np.array(positions, dtype=np.int32)
+            for trigram, positions in token_trigrams.items()
+        }
+
+    @classmethod
+    def from_database(cls):
+        """Builds index of all Airports and Airlines not deleted from dataset,
+        weighted by number of their Routes.
+
+        :rtype: SearchIndex
+        """
+
+        routes = Route.objects.alive().order_by()
+        airport_routes = defaultdict(int)
+        for field in ('origin_airport_id', 'destination_airport_id'):
+            for pk, count in routes.values_list(field).annotate(Count('id')):
+                airport_routes[pk] += count
+        airline_routes = dict(
+            routes.filter(airline__isnull=False)
+            .values_list('airline_id')
+            .annotate(Count('id'))
+        )
+
+        airports = Airport.objects.alive().values_list(
+            'pk', 'iata', 'icao', 'name', 'city_name', 'country'
+        )
+        airlines = Airline.objects.alive().values_list(
+            'pk', 'iata', 'icao', 'name', 'alias', 'callsign', 'country'
+        )
+
+        return cls(
+            chain(
+                (
+                    (
+                        {
+                            'type': 'airport',
+                            'id': pk,
+                            'iata': iata,
+                            'icao': icao,
+                            'name': name,
+                            'city_name': city_name,
+                            'country': str(country),
+                        },
+                        [name, city_name, iata, icao],
+                        airport_routes.get(pk, 0),
+                    )
+                    for pk, iata, icao, name, city_name, country in airports
+                ),
+                (
+                    (
+                        {
+                            'type': 'airline',
+                            'id': pk,
+                            'iata': iata,
+                            'icao': icao,
+                            'name': name,
+                            'alias': alias,
+                            'callsign': callsign,
+                            'country': str(country),
+                        },
+                        [name, alias, callsign, iata, icao],
+                        airline_routes.get(pk, 0),
+                    )
+                    for pk, iata, icao, name, alias, callsign, country in airlines
+                ),
+            )
+        )
+
+    def _token_range(self, prefix):
+        """Finds range of sorted tokens starting with prefix.
+
+        :param prefix: prefix
+        :type prefix: str
+        :rtype: Tuple[int, int]
+        """
+
+        start = bisect_left(self.tokens, prefix)
+        return start, bisect_left(self.tokens, prefix + '\x7f', start)
+
+    def _documents(self, start, end):
+        """Returns documents containing tokens in range, with repeats.
+
+        :param start: first token of range
+        :type start: int
+        :param end: token after the last one of range
+        :type end: int
+        :rtype: numpy.ndarray
+        """
+
+        first, last = self.offsets[start], self.offsets[end]
+        return self.postings[first:last]
+
+    def _fuzzy_tokens(self, term):
+        """Finds tokens with prefix within `max_typos` edits from term.
+
+        :param term: query term
+        :type term: str
+        :returns: positions of tokens in sorted tokens
+        :rtype: List[int]
+        """
+
+        limit = max_typos(term)
+        postings = [
+            self.trigrams[trigram]
+            for trigram in trigrams(term)
+            if trigram in self.trigrams
+        ]
+        if not limit or not postings:
+            return []
+
+        # Every typo spoils at most 3 trigrams
+        shared = np.bincount(np.concatenate(postings), minlength=len(self.tokens))
+        candidates = np.flatnonzero(shared >= len(term) - 3 * limit)
+        if len(candidates) > FUZZY_CANDIDATES:
+            best = np.argpartition(-shared[candidates], FUZZY_CANDIDATES)
+            candidates = candidates[best[:FUZZY_CANDIDATES]]
+
+        return [
+            position
+            for position in candidates.tolist()
+            if prefix_distance(term, self.tokens[position], limit) <= limit
+        ]
+
+    def _term_relevance(self, term, exact=True):
+        """Calculates relevance of every document for query term.
+
+        :param term: query term
+        :type term: str
+        :param exact: prefer exact matches to prefix ones
+        :type exact: bool
+        :returns: relevance of documents, zero if term does not match.
+        :rtype: numpy.ndarray
+        """
+
+        relevance = np.zeros(len(self.results))
+        start, end = self._token_range(term)
+        if start < end:
+            relevance[self._documents(start, end)] = PREFIX_MATCH
+            if exact and self.tokens[start] == term:
+                relevance[self._documents(start, start + 1)] = EXACT_MATCH
+            return relevance
+
+        for position in self._fuzzy_tokens(term):
+            relevance[self._documents(position, position + 1)] = FUZZY_MATCH
+        return relevance
+
+    def search(self, query, kind=None, limit=10):
+        """Finds documents matching all terms of query by prefix, tolerating typos
+        in terms which are not prefix of any token.
+
+        :param query: query, e.g. beginning of name or city, or code.
+        :type query: str
+        :param kind: find only 'airport' or 'airline' documents. Default is both.
+        :type kind: Optional[str]
+        :param limit: max number of documents
+        :type limit: int
+        :returns: search results, most relevant first.
+        :rtype: List[Dict[str, Any]]
+        """
+
+        terms = tokenize(query)
+        if not terms or not self.results:
+            return []
+
+        # The last term is being typed, so it is not preferred to match whole token
+        relevances = [self._term_relevance(term) for term in terms[:-1]]
+        relevances.append(self._term_relevance(terms[-1], exact=False))
+        matched = np.logical_and.reduce([relevance > 0 for relevance in relevances])
+        if kind is not None:
+            matched &= self.kinds == kind
+        documents = np.flatnonzero(matched)
+        if not len(documents):
+            return []
+
+        score = np.sum(relevances, axis=0) + self.popularity
+        if len(terms) == 1:
+            score[self.codes.get(terms[0], [])] += CODE_MATCH
+
+        order = np.argsort(-score[documents], kind='stable')[:limit]
+        return [self.results[document] for document in documents[order].tolist()]
+
+
+# Index shared by all requests of the process, rebuilt when dataset changes,
+# i.e. when Airports or Airlines are saved or imported
+search_index = VersionedCache(SearchIndex.from_database)
@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import Signal, receiver
+
+from myflights.apps.core import partitions
+from myflights.apps.core.models import Airline, Airport, Route
+from myflights.apps.core.statistics import schedule_refresh
+from myflights.apps.core.versioning import schedule_bump
+
+# Sent by importers and purge scripts after bulk changes of model's table,
+# which bypass `post_save` and `post_delete`. Sender is the model class.
+data_imported = Signal()
+
+
+@receiver(data_imported, sender=Airport)
+def update_route_distances(sender, **kwargs):
+    """Recalculates distances of all Routes at once after Airports are imported,
+    only Routes of moved Airports are written.
+    Connected before other receivers, so distances are updated before
+    statistics are refreshed and dataset version is bumped, even in autocommit
+    mode, and cached responses of new version never hold previous distances.
+    """
+    Route.objects.update_distances()
+
+
+@receiver(data_imported)
+def refresh_route_statistics(sender, **kwargs):
+    """Refreshes Route statistics after imports and purges.
+    Importers and purges send `data_imported` for all models in one transaction,
+    so statistics are refreshed once per import or purge.
+    Connected before `bump_dataset_version`, so statistics are refreshed
+    before dataset version is bumped and cached responses of new version
+    never hold previous statistics.
+    Changes of single objects are picked up by the next import
+    or by `refresh_statistics` command.
+    """
+    schedule_refresh()
+
+
+@receiver(data_imported)
+@receiver(post_save, sender=Airline)
+@receiver(post_delete, sender=Airline)
+@receiver(post_save, sender=Airport)
+@receiver(post_delete, sender=Airport)
+@receiver(post_save, sender=Route)
+@receiver(post_delete, sender=Route)
+def bump_dataset_version(sender, **kwargs):
+    """Bumps dataset version when Airports, Airlines or Routes change.
+    """
+    schedule_bump()
+
+
+@receiver(post_save, sender=Airport)
+def update_airport_route_distances(sender, instance, created, **kwargs):
+    """Recalculates distances of Routes from and to saved Airport,
+    its coordinates could have changed.
+    """
+
+    if not created:
+        Route.objects.filter(
+            Q(origin_airport=instance) | Q(destination_airport=instance)
+        ).update_distances()
+
+
+@receiver(post_migrate)
+def create_flight_partitions(sender, **kwargs):
+    """Creates upcoming monthly partitions of Flights table after migrations.
+    """
+
+    if sender.label == 'core' and partitions.is_partitioned():
+        partitions.ensure_partitions(settings.FLIGHT_PARTITIONS_AHEAD)
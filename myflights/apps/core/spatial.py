@@ -0,0 +1,242 @@
+import heapq
+
+import numpy as np
+
+from myflights.apps.core.geo import EARTH_RADIUS_KM, haversine_km
+from myflights.apps.core.models import Airport
+from myflights.apps.core.versioning import VersionedCache
+
+
+def unit_vectors(latitudes, longitudes):
+    """Converts coordinates given in degrees to points on unit sphere.
+
+    :param latitudes: latitudes
+    :type latitudes: numpy.ndarray
+    :param longitudes: longitudes
+    :type longitudes: numpy.ndarray
+    :returns: array of x, y, z rows
+    :rtype: numpy.ndarray
+    """
+
+    lat, lon = np.radians(latitudes), np.radians(longitudes)
+    return np.column_stack(
+        (np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat))
+    )
+
+
+def chord_length(distance_km):
+    """Converts great-circle distance to length of chord on unit sphere,
+    which is what KD-tree measures and is monotonic with great-circle distance.
+
+    :param distance_km: great-circle distance
+    :type distance_km: float
+    :rtype: float
+    """
+    return 2 * np.sin(min(distance_km / EARTH_RADIUS_KM, np.pi) / 2)
+
+
+class AirportIndex:
+    """KD-tree of Airports over unit sphere coordinates.
+    Every tree node covers contiguous range of points reordered by tree build,
+    leaf points are scanned vectorized.
+    """
+
+    def __init__(self, airports, leaf_size=16):
+        """Initializes `AirportIndex` instance.
+
+        :param airports: rows of Airport pk, iata, icao, name, latitude and longitude.
+        :type airports: Iterable[Tuple[int, str, str, str, float, float]]
+        :param leaf_size: max number of points in leaf node.
+        :type leaf_size: int
+        """
+
+        airports = list(airports)
+        self.airports = {
+            pk: (iata, icao, name) for pk, iata, icao, name, *_ in airports
+        }
+        self.pks = np.array([row[0] for row in airports], dtype=np.int64)
+        self.latitudes = np.array([row[4] for row in airports], dtype=np.float64)
+        self.longitudes = np.array([row[5] for row in airports], dtype=np.float64)
+        self.points = unit_vectors(self.latitudes, self.longitudes)
+        self.leaf_size = leaf_size
+
+        # Node arrays: range of points, children (-1 for leaves) and bounding box
+        self.starts, self.ends, self.lefts, self.rights = [], [], [], []
+        self.lows, self.highs = [], []
+
+        self.order = np.arange(len(self.pks))
+        if len(self.pks):
+            self._build(0, len(self.pks))
+
+        self.pks = self.pks[self.order]
+        self.latitudes = self.latitudes[self.order]
+        self.longitudes = self.longitudes[self.order]
+        self.points = self.points[self.order]
+
+    def _build(self, start, end):
+        """Builds subtree of points in range, splitting it at median
+        along axis of the widest spread.
+
+        :param start: first point of range
+        :type start: int
+        :param end: point after the last one of range
+        :type end: int
+        :returns: subtree root node
+        :rtype: int
+        """
+
+        points = self.points[self.order[start:end]]
+        low, high = points.min(axis=0), points.max(axis=0)
+
+        node = len(self.starts)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lefts.append(-1)
+        self.rights.append(-1)
+        self.lows.append(low)
+        self.highs.append(high)
+
+        if end - start > self.leaf_size:
+            axis = int(np.argmax(high - low))
+            middle = (end - start) // 2
+            split = np.argpartition(points[:, axis], middle)
+            self.order[start:end] = self.order[start:end][split]
+            self.lefts[node] = self._build(start, start + middle)
+            self.rights[node] = self._build(start + middle, end)
+
+        return node
+
+    @classmethod
+    def from_database(cls):
+        """Builds index of all Airports not deleted from dataset.
+
+        :rtype: AirportIndex
+        """
+
+        return cls(
+            Airport.objects.alive().values_list(
+                'pk', 'iata', 'icao', 'name', 'latitude', 'longitude'
+            )
+        )
+
+    def _box_distance(self, node, point):
+        """Calculates squared distance from point to bounding box of node.
+
+        :param node: tree node
+        :type node: int
+        :param point: point on unit sphere
+        :type point: numpy.ndarray
+        :rtype: float
+        """
+
+        gap = np.maximum(self.lows[node] - point, 0) + np.maximum(
+            point - self.highs[node], 0
+        )
+        return float(gap @ gap)
+
+    def _distances(self, indices, lat, lon):
+        """Calculates great-circle distances from point to indexed Airports.
+
+        :param indices: positions of Airports in index
+        :type indices: numpy.ndarray
+        :param lat: latitude
+        :type lat: float
+        :param lon: longitude
+        :type lon: float
+        :rtype: numpy.ndarray
+        """
+        return haversine_km(self.latitudes[indices], self.longitudes[indices], lat, lon)
+
+    def nearest(self, lat, lon, k=1):
+        """Finds `k` Airports nearest to the point.
+
+        :param lat: latitude
+        :type lat: float
+        :param lon: longitude
+        :type lon: float
+        :param k: number of Airports
+        :type k: int
+        :returns: Airport pks and distances in kilometers, nearest first.
+        :rtype: List[Tuple[int, float]]
+        """
+
+        if not len(self.pks) or k < 1:
+            return []
+
+        point = unit_vectors([lat], [lon])[0]
+        nodes = [(0.0, 0)]
+        # Max-heap of k nearest points found so far: (-squared chord, position)
+        found = []
+
+        while nodes:
+            distance, node = heapq.heappop(nodes)
+            if len(found) == k and distance > -found[0][0]:
+                break
+
+            left = self.lefts[node]
+            if left >= 0:
+                right = self.rights[node]
+                heapq.heappush(nodes, (self._box_distance(left, point), left))
+                heapq.heappush(nodes, (self._box_distance(right, point), right))
+                continue
+
+            start, end = self.starts[node], self.ends[node]
+            offsets = self.points[start:end] - point
+            distances = np.einsum('ij,ij->i', offsets, offsets)
+            for position, distance in enumerate(distances.tolist(), start):
+                if len(found) < k:
+                    heapq.heappush(found, (-distance, position))
+                elif distance < -found[0][0]:
+                    heapq.heapreplace(found, (-distance, position))
+
+        indices = np.array([position for _, position in found])
+        distances = self._distances(indices, lat, lon)
+        order = np.argsort(distances, kind='stable')
+        return list(zip(self.pks[indices[order]].tolist(), distances[order].tolist()))
+
+    def within(self, lat, lon, radius_km):
+        """Finds Airports within given great-circle distance from the point.
+
+        :param lat: latitude
+        :type lat: float
+        :param lon: longitude
+        :type lon: float
+        :param radius_km: max distance in kilometers
+        :type radius_km: float
+        :returns: Airport pks and distances in kilometers, nearest first.
+        :rtype: List[Tuple[int, float]]
+        """
+
+        if not len(self.pks):
+            return []
+
+        point = unit_vectors([lat], [lon])[0]
+        # Tree pruning is done with slightly wider radius,
+        # exact filtering is done with haversine distance
+        radius = (chord_length(radius_km) * (1 + 1e-9)) ** 2
+        nodes = [0]
+        ranges = []
+
+        while nodes:
+            node = nodes.pop()
+            if self._box_distance(node, point) > radius:
+                continue
+            left = self.lefts[node]
+            if left >= 0:
+                nodes.extend((left, self.rights[node]))
+            else:
+                ranges.append(np.arange(self.starts[node], self.ends[node]))
+
+        if not ranges:
+            return []
+
+        indices = np.concatenate(ranges)
+        distances = self._distances(indices, lat, lon)
+        matched = distances <= radius_km
+        indices, distances = indices[matched], distances[matched]
+        order = np.argsort(distances, kind='stable')
+        return list(zip(self.pks[indices[order]].tolist(), distances[order].tolist()))
+
+
+# Index shared by all requests of the process, rebuilt when dataset changes
+airport_index = VersionedCache(AirportIndex.from_database)
@@ -0,0 +1,58 @@
+import time
+import logging
+
+from django.db import connections, transaction
+
+from myflights.apps.core.models import (
+    AirlineRouteCount,
+    AirportDegree,
+    CountryConnectivity,
+    EquipmentUsage,
+)
+
+# Models of materialized views of Route statistics
+STATISTICS_MODELS = (
+    AirportDegree,
+    AirlineRouteCount,
+    CountryConnectivity,
+    EquipmentUsage,
+)
+
+
+def refresh_statistics(concurrently=True, using='default'):
+    """Refreshes materialized views of Route statistics.
+
+    :param concurrently: refresh without blocking reads of views.
+    It is slower and requires views to be populated.
+    :type concurrently: bool
+    :param using: database alias. Default is 'default'
+    :type using: str
+    :returns: seconds spent on every view, by view name.
+    :rtype: Dict[str, float]
+    """
+
+    mode = 'CONCURRENTLY ' if concurrently else ''
+    durations = {}
+    with connections[using].cursor() as cursor:
+        for Model in STATISTICS_MODELS:
+            view = Model._meta.db_table
+            started = time.perf_counter()
+            cursor.execute(f'REFRESH MATERIALIZED VIEW {mode}{view}')
+            durations[view] = time.perf_counter() - started
+            logging.warning(f'[{view}] Refreshed in {durations[view]:.3f}s')
+    return durations
+
+
+def schedule_refresh(using=None):
+    """Refreshes statistics once current transaction is committed,
+    or immediately in autocommit mode, i.e. once per call.
+    Any number of calls made in one transaction refresh statistics once,
+    so `import_data` and `clear_db` notify about all models in one transaction.
+
+    :param using: database alias. Default is 'default'
+    :type using: str
+    """
+
+    connection = transaction.get_connection(using)
+    if all(func is not refresh_statistics for _, func in connection.run_on_commit):
+        transaction.on_commit(refresh_statistics, using)
@@ -1,10 +1,78 @@
-from django.test import TestCase
+import io
+import os
+import csv
+import datetime
+import json
+import tempfile
+from pathlib import Path
+from itertools import count
+from unittest import skipUnless
 
+import numpy as np
+
+from django.db import IntegrityError, connection, transaction
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.timezone import utc
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+try:
+    import pandas as pd
+    from scripts.prepare_data import CountryResolver, country_resolver
+except ImportError:
+    pd = None
+
+from scripts.convert import csv_file_to_json, main as convert
+
+from .admin import EstimatedCountPaginator
+from .caching import LRUCache, responses
+from .geo import haversine_km
+from .graph import RouteGraph, route_graph
+from . import resolvers
+from .resolvers import AirlineResolver, AirportResolver
+from .loaders import CopyLoader
+from . import metrics
+from .middleware import QueryInstrumentationMiddleware, fingerprint
+from .management.commands.benchmark import compare, scale_dataset
+from . import partitions
 from .models import Airline, Airport, Route, Flight
+from .scripts.clear_db import fast_purge
+from .scripts.explain_queries import explain
+from .scripts.generate_flights import RouteTable, generate
+from .search import SearchIndex, prefix_distance, search_index, tokenize
+from .signals import data_imported
+from .spatial import AirportIndex, airport_index
+from .statistics import refresh_statistics
+from .versioning import VersionedCache, bump_version, current_version
+from .scripts.import_data import (
+    AirlineImporter,
+    AirportImporter,
+    ImportScheduler,
+    RouteImporter,
+    _run_task,
+    iter_json_array,
+    main as import_data,
+)
 
 
+# Dataset versions repeat between tests as their transactions are rolled back,
+# so responses cached by one test could be served to another
+@override_settings(RESPONSE_CACHE_SIZE=0)
 class BaseTestCase(TestCase):
-    def _create_airline(self, name='Abc Ltd.', country='AU'):
+    # OpenFlights ids are unique, helpers assign them from this sequence by default
+    openflights_ids = count(1000)
+
+    def _create_airline(self, name='Abc Ltd.', country='AU', openflights_id=None):
+        if openflights_id is None:
+            openflights_id = next(self.openflights_ids)
         airline = Airline.objects.create(
             name=name,
             alias='A',
@@ -13,13 +81,20 @@ class BaseTestCase(TestCase):
             callsign='ABC',
             country=country,
             is_active=True,
-            openflights_id=1,
+            openflights_id=openflights_id,
         )
         return airline
 
     def _create_airport(
-        self, name='Abc Airport', country='AU', latitude=-28.001744, longitude=153.42844
+        self,
+        name='Abc Airport',
+        country='AU',
+        latitude=-28.001744,
+        longitude=153.42844,
+        openflights_id=None,
     ):
+        if openflights_id is None:
+            openflights_id = next(self.openflights_ids)
         airport = Airport.objects.create(
             name=name,
             city_name='Abc',
@@ -31,7 +106,7 @@ class BaseTestCase(TestCase):
             altitude=100,
             timezone_offset=10,
             timezone='Xyz/Abc',
-            openflights_id=1,
+            openflights_id=openflights_id,
         )
         return airport
 
@@ -108,6 +183,54 @@ class RouteTests(BaseTestCase):
 
         self.assertIn(route, airline.routes.all())
 
+    def test_distance(self):
+        route = self._create_route()
+        self.assertAlmostEqual(route.distance_km, haversine_km(100, 100, 50, 50))
+
+        origin = route.origin_airport
+        origin.latitude, origin.longitude = 50, 51
+        origin.save()
+        route.refresh_from_db()
+        self.assertAlmostEqual(route.distance_km, 71.5, places=1)
+
+        self.assertEqual(list(Route.objects.distance_between(70, 72)), [route])
+        self.assertFalse(Route.objects.distance_between(maximum=70).exists())
+        self.assertEqual(Route.objects.update_distances(), 0)
+
+        response = self.client.get('/api/routes/?min_distance_km=100')
+        self.assertEqual(response.json()['results'], [])
+        response = self.client.get('/api/routes/?max_distance_km=100')
+        [result] = response.json()['results']
+        self.assertAlmostEqual(result['distance_km'], 71.5, places=1)
+
+    def test_distance_is_calculated_when_airports_change(self):
+        route = self._create_route()
+        other = self._create_airport(latitude=100, longitude=101)
+        route = Route.objects.get(pk=route.pk)
+
+        with self.assertNumQueries(1):
+            route.stops = 0
+            route.save()
+        self.assertAlmostEqual(route.distance_km, haversine_km(100, 100, 50, 50))
+
+        # Airports are looked up with single query
+        route.destination_airport_id = other.pk
+        with CaptureQueriesContext(connection) as queries:
+            route.save(update_fields=['stops'])
+        self.assertEqual(len(queries), 1)
+        route.save(update_fields=['destination_airport'])
+        route.refresh_from_db()
+        self.assertAlmostEqual(route.distance_km, haversine_km(100, 100, 100, 101))
+
+    def test_distances_are_updated_before_version_is_bumped(self):
+        receivers = [
+            receiver.__name__ for receiver in data_imported._live_receivers(Airport)
+        ]
+        self.assertLess(
+            receivers.index('update_route_distances'),
+            receivers.index('bump_dataset_version'),
+        )
+
 
 class FlightTests(BaseTestCase):
     def test_create_flight(self):
@@ -122,6 +245,1255 @@ class FlightTests(BaseTestCase):
     def test_back_references(self):
         flight = self._create_flight()
 
-        route = Route.objects.get(id=1)
+        route = Route.objects.get(id=flight.route_id)
 
         self.assertIn(flight, route.flights.all())
+
+
+class ImporterTestCase(BaseTestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_dir = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write_data(self, filename, items):
+        with open(self.data_dir / filename, 'w') as f:
+            if filename.endswith('.jsonl'):
+                f.writelines(json.dumps(item) + '\n' for item in items)
+            else:
+                json.dump(items, f)
+
+    def _airline_items(self, count):
+        return [
+            {
+                'openflights_id': i,
+                'name': f'Airline {i}',
+                'alias': None,
+                'iata': None,
+                'icao': 'ABC',
+                'callsign': None,
+                'country': 'AU',
+                'is_active': True,
+            }
+            for i in range(count)
+        ]
+
+
+class StreamingImportTests(ImporterTestCase):
+    def test_iter_json_array_reads_items_across_chunks(self):
+        items = [
+            {'id': i, 'name': 'x' * i, 'nested': [i, {'a': None}]} for i in range(20)
+        ]
+        f = io.StringIO(json.dumps(items, indent=2))
+
+        self.assertEqual(list(iter_json_array(f, chunk_size=7)), items)
+        self.assertEqual(list(iter_json_array(io.StringIO('[]'))), [])
+
+        with self.assertRaises(ValueError):
+            list(iter_json_array(io.StringIO('[{"id": 1}, {"id"'), chunk_size=4))
+
+    def test_stream_saves_objects_batch_by_batch(self):
+        self._write_data('airlines.jsonl', self._airline_items(250))
+
+        importer = AirlineImporter(data_dir=self.data_dir, data_format='jsonl')
+        importer.stream()
+
+        self.assertEqual(Airline.objects.count(), 250)
+        self.assertEqual(importer.new_objects, [])
+
+
+class RouteImporterTests(ImporterTestCase):
+    def test_load_resolves_references_from_preloaded_maps(self):
+        origin = self._create_airport(name='A1', openflights_id=10)
+        destination = self._create_airport(name='A2', openflights_id=20)
+        airline = self._create_airline(openflights_id=30)
+
+        route = {'stops': 0, 'equipment': '320'}
+        self._write_data(
+            'routes.json',
+            [
+                dict(
+                    route, origin_airport='10', destination_airport='20', airline='30'
+                ),
+                dict(
+                    route, origin_airport='20', destination_airport='10', airline='30'
+                ),
+                dict(
+                    route, origin_airport='10', destination_airport='99', airline='30'
+                ),
+                dict(
+                    route, origin_airport='99', destination_airport='20', airline='77'
+                ),
+            ],
+        )
+
+        importer = RouteImporter(data_dir=self.data_dir)
+        with self.assertNumQueries(2):
+            importer.load()
+        importer.save()
+
+        self.assertEqual(Route.objects.count(), 2)
+        route = Route.objects.get(destination_airport=destination)
+        self.assertEqual(route.origin_airport, origin)
+        self.assertEqual(route.airline, airline)
+
+        self.assertEqual(importer.unresolved_items, 2)
+        self.assertEqual(importer.unresolved[('Airport', '99')], 2)
+        self.assertEqual(importer.unresolved[('Airline', '77')], 1)
+
+    def test_distances_follow_airports(self):
+        self._create_airport(name='A1', latitude=0, longitude=0, openflights_id=10)
+        moved = self._create_airport(
+            name='A2', latitude=0, longitude=1, openflights_id=20
+        )
+        self._create_airline(openflights_id=30)
+        self._write_data(
+            'routes.json',
+            [{'origin_airport': '10', 'destination_airport': '20', 'airline': '30'}],
+        )
+
+        importer = RouteImporter(data_dir=self.data_dir)
+        importer.load()
+        importer.save()
+        route = Route.objects.get()
+        self.assertAlmostEqual(route.distance_km, 111.2, places=1)
+
+        Airport.objects.filter(pk=moved.pk).update(longitude=2)
+        data_imported.send(sender=Airport)
+        route.refresh_from_db()
+        self.assertAlmostEqual(route.distance_km, 222.4, places=1)
+
+
+@skipUnless(pyarrow, 'pyarrow is not installed')
+class ColumnarImportTests(ImporterTestCase):
+    def test_import_from_parquet_and_arrow(self):
+        table = pyarrow.Table.from_pylist(
+            self._airline_items(25),
+            schema=pyarrow.schema(
+                [
+                    ('openflights_id', pyarrow.int32()),
+                    ('name', pyarrow.string()),
+                    ('alias', pyarrow.string()),
+                    ('iata', pyarrow.string()),
+                    ('icao', pyarrow.string()),
+                    ('callsign', pyarrow.string()),
+                    ('country', pyarrow.dictionary(pyarrow.int8(), pyarrow.string())),
+                    ('is_active', pyarrow.bool_()),
+                ]
+            ),
+        )
+        pyarrow.parquet.write_table(table, self.data_dir / 'airlines.parquet')
+        with pyarrow.OSFile(str(self.data_dir / 'airlines.arrow'), 'wb') as f:
+            with pyarrow.ipc.new_file(f, table.schema) as writer:
+                writer.write_table(table, max_chunksize=10)
+
+        importer = AirlineImporter(
+            data_dir=self.data_dir, data_format='parquet', batch_size=10
+        )
+        importer.stream()
+
+        self.assertEqual(importer.saved, 25)
+        self.assertEqual(Airline.objects.get(openflights_id=3).country, 'AU')
+
+        importer = AirlineImporter(data_dir=self.data_dir, data_format='arrow')
+        importer.sync()
+
+        self.assertEqual(importer.sync_stats['unchanged'], 25)
+
+        for data_format in ('parquet', 'arrow'):
+            importer = AirlineImporter(data_dir=self.data_dir, data_format=data_format)
+            partitions = importer.partitions(4)
+            self.assertEqual(partitions, [(0, 6), (6, 12), (12, 18), (18, 25)])
+            ids = [
+                item['openflights_id']
+                for partition in partitions
+                for item in AirlineImporter(
+                    data_dir=self.data_dir,
+                    data_format=data_format,
+                    batch_size=4,
+                    partition=partition,
+                )._read()
+            ]
+            self.assertEqual(ids, list(range(25)))
+
+
+class CopyLoaderTests(ImporterTestCase):
+    def test_import_with_copy_loader(self):
+        items = self._airline_items(150)
+        items[0]['name'] = 'Tab\tNew\nline \\ backslash'
+        items[1]['is_active'] = False
+        self._write_data('airlines.json', items)
+
+        importer = AirlineImporter(data_dir=self.data_dir, loader='copy')
+        importer.load()
+        importer.save()
+
+        self.assertEqual(Airline.objects.count(), 150)
+        airline = Airline.objects.get(openflights_id=0)
+        self.assertEqual(airline.name, items[0]['name'])
+        self.assertIsNone(airline.alias)
+        self.assertIsNotNone(airline.created_at)
+        self.assertFalse(Airline.objects.get(openflights_id=1).is_active)
+
+    def test_rows_with_missing_references_are_skipped(self):
+        origin = self._create_airport(name='A1', openflights_id=10)
+        destination = self._create_airport(name='A2', openflights_id=20)
+
+        routes = [
+            Route(
+                origin_airport=origin, destination_airport=destination, equipment='320'
+            ),
+            Route(
+                origin_airport_id=origin.pk, destination_airport_id=0, equipment='320'
+            ),
+        ]
+        with CopyLoader(Route) as loader:
+            loader.write(routes)
+
+        self.assertEqual(loader.saved, 1)
+        self.assertEqual(Route.objects.get().destination_airport, destination)
+
+
+class ImportSchedulerTests(ImporterTestCase):
+    def test_stages_follow_dependencies(self):
+        self._write_data('airlines.json', self._airline_items(10))
+        self._write_data('routes.json', [])
+        scheduler = ImportScheduler(
+            [RouteImporter, AirlineImporter, AirportImporter],
+            workers=4,
+            data_dir=self.data_dir,
+        )
+
+        self.assertEqual(
+            scheduler.stages(), [[AirlineImporter, AirportImporter], [RouteImporter]]
+        )
+
+        tasks = scheduler._tasks([AirlineImporter, RouteImporter])
+        self.assertEqual(
+            [(Importer, partition) for Importer, partition, options in tasks],
+            [
+                (Importer, partition)
+                for Importer in (AirlineImporter, RouteImporter)
+                for partition in Importer(data_dir=self.data_dir).partitions(4)
+            ],
+        )
+
+        scheduler.workers = 1
+        tasks = scheduler._tasks([RouteImporter])
+        self.assertEqual([(RouteImporter, None, {'data_dir': self.data_dir})], tasks)
+
+    def test_split_json_array_between_items(self):
+        items = [
+            {'openflights_id': 0, 'name': 'Brace }, {"name": 1}, [ and \\"quote'},
+            {'openflights_id': 1, 'nested': {'list': [[1, 2], {'a': ']'}]}},
+            {'openflights_id': 2, 'name': 'Café'},
+        ] + [{'openflights_id': i} for i in range(3, 20)]
+        with open(self.data_dir / 'airlines.json', 'w') as f:
+            json.dump(items, f, indent=1, ensure_ascii=False)
+
+        importer = AirlineImporter(data_dir=self.data_dir)
+        partitions = importer.partitions(5)
+
+        self.assertEqual(len(partitions), 5)
+        self.assertEqual(
+            partitions[-1][1], (self.data_dir / 'airlines.json').stat().st_size
+        )
+        parts = [
+            list(AirlineImporter(data_dir=self.data_dir, partition=partition)._read())
+            for partition in partitions
+        ]
+        self.assertTrue(all(parts))
+        self.assertEqual([item for part in parts for item in part], items)
+
+    def test_partitions_split_items(self):
+        received = []
+
+        def receiver(sender, **kwargs):
+            received.append(sender)
+
+        data_imported.connect(receiver, sender=Airline)
+        self.addCleanup(data_imported.disconnect, receiver, sender=Airline)
+
+        for data_format in ('json', 'jsonl'):
+            Airline.objects.all().delete()
+            self._write_data(f'airlines.{data_format}', self._airline_items(10))
+            options = {
+                'data_dir': self.data_dir,
+                'data_format': data_format,
+                'streaming': True,
+            }
+            partitions = AirlineImporter(
+                data_dir=self.data_dir, data_format=data_format
+            ).partitions(3)
+
+            results = [
+                _run_task((AirlineImporter, partition, dict(options)))
+                for partition in partitions
+            ]
+
+            saved = [saved for name, partition, saved, elapsed in results]
+            self.assertEqual(sum(saved), 10)
+            self.assertTrue(all(saved))
+            self.assertEqual(
+                sorted(Airline.objects.values_list('openflights_id', flat=True)),
+                list(range(10)),
+            )
+
+        # Scheduler sends `data_imported` once all partitions are imported
+        self.assertEqual(received, [])
+
+
+class ImportNotificationTests(ImporterTestCase):
+    def test_models_are_notified_once_in_one_transaction(self):
+        self._write_data('airlines.json', self._airline_items(3))
+        self._write_data('airports.json', [])
+        self._write_data('routes.json', [])
+        depth = len(connection.savepoint_ids)
+        received = []
+
+        def receiver(sender, **kwargs):
+            received.append((sender, len(connection.savepoint_ids)))
+
+        data_imported.connect(receiver)
+        self.addCleanup(data_imported.disconnect, receiver)
+
+        for sync in (False, True):
+            received.clear()
+            import_data(sync=sync, data_dir=self.data_dir)
+
+            # So that statistics are refreshed and version is bumped once on commit
+            self.assertEqual(
+                received, [(Model, depth + 1) for Model in (Airline, Airport, Route)]
+            )
+
+
+class SyncImportTests(ImporterTestCase):
+    def test_sync_applies_only_changes(self):
+        items = self._airline_items(5)
+        self._write_data('airlines.json', items)
+        importer = AirlineImporter(data_dir=self.data_dir)
+        importer.load()
+        importer.save()
+        unchanged = Airline.objects.get(openflights_id=1)
+
+        items[0]['name'] = 'Renamed'
+        del items[4]
+        items.extend(self._airline_items(7)[5:])
+        self._write_data('airlines.json', items)
+
+        importer = AirlineImporter(data_dir=self.data_dir)
+        importer.sync(vanished='soft')
+
+        stats = importer.sync_stats
+        self.assertEqual(
+            (stats['created'], stats['updated'], stats['unchanged'], stats['deleted']),
+            (2, 1, 3, 1),
+        )
+        self.assertEqual(Airline.objects.count(), 7)
+        self.assertEqual(Airline.objects.alive().count(), 6)
+        self.assertEqual(Airline.objects.get(openflights_id=0).name, 'Renamed')
+        self.assertIsNotNone(Airline.objects.get(openflights_id=4).deleted_at)
+        self.assertEqual(
+            Airline.objects.get(openflights_id=1).updated_at, unchanged.updated_at
+        )
+
+        importer = AirlineImporter(data_dir=self.data_dir)
+        importer.sync(vanished='hard')
+
+        self.assertEqual(importer.sync_stats['unchanged'], 6)
+        self.assertEqual(Airline.objects.count(), 6)
+
+
+class ClearDbTests(BaseTestCase):
+    def test_fast_purge_nullifies_kept_dependants(self):
+        flight = self._create_flight()
+
+        counts = fast_purge([Airline])
+
+        self.assertEqual(counts, {Airline: 1})
+        self.assertFalse(Airline.objects.exists())
+        route = Route.objects.get(pk=flight.route_id)
+        self.assertIsNone(route.airline)
+        self.assertTrue(Flight.objects.exists())
+
+    def test_fast_purge_truncates_cascaded_dependants(self):
+        self._create_flight()
+
+        counts = fast_purge([Airport, Airline], exact=True)
+
+        self.assertEqual(counts, {Flight: 1, Route: 1, Airline: 1, Airport: 2})
+        for model in (Airline, Airport, Route, Flight):
+            self.assertFalse(model.objects.exists())
+
+    def test_fast_purge_notifies_in_its_transaction(self):
+        self._create_flight()
+        depth = len(connection.savepoint_ids)
+        depths = []
+
+        def receiver(sender, **kwargs):
+            depths.append(len(connection.savepoint_ids))
+
+        data_imported.connect(receiver)
+        self.addCleanup(data_imported.disconnect, receiver)
+
+        fast_purge()
+
+        # So that statistics are refreshed and version is bumped once on commit
+        self.assertEqual(depths, [depth + 1] * 4)
+
+
+class RouteGraphTests(TestCase):
+    def setUp(self):
+        # A, B and C lie on the equator, D is off it
+        airports = [
+            (1, 'AAA', None, 'A', 0, 0),
+            (2, 'BBB', None, 'B', 0, 10),
+            (3, 'CCC', None, 'C', 0, 20),
+            (4, 'DDD', None, 'D', 10, 10),
+        ]
+        airlines = [(10, 'X1', None, 'X'), (20, 'Y2', None, 'Y')]
+        routes = [
+            (1, 2, 10),
+            (2, 3, 10),
+            (1, 3, 20),
+            (1, 3, 20),
+            (1, 4, 20),
+            (4, 3, 10),
+            (3, 1, None),
+        ]
+        self.graph = RouteGraph(airports, airlines, routes)
+
+    def test_edges_join_routes_between_the_same_airports(self):
+        self.assertEqual(self.graph.edge_count, 6)
+        self.assertEqual(self.graph.indptr.tolist(), [0, 3, 4, 5, 6])
+        self.assertAlmostEqual(self.graph.weights.max(), 2223.9, places=0)
+
+    def test_shortest_path(self):
+        itinerary = self.graph.shortest_path(1, 3)
+
+        self.assertEqual(
+            [(leg.origin, leg.destination) for leg in itinerary.legs], [(1, 3)]
+        )
+        self.assertEqual(itinerary.legs[0].airlines, [20])
+
+    def test_airline_filter(self):
+        itinerary = self.graph.shortest_path(1, 3, airlines=[10])
+
+        self.assertEqual([leg.destination for leg in itinerary.legs], [2, 3])
+        self.assertIsNone(self.graph.shortest_path(1, 3, max_stops=0, airlines=[10]))
+
+    def test_k_shortest_itineraries(self):
+        itineraries = self.graph.itineraries(1, 3, k=5)
+
+        self.assertEqual(
+            [[leg.destination for leg in it.legs] for it in itineraries],
+            [[3], [2, 3], [4, 3]],
+        )
+        distances = [it.distance_km for it in itineraries]
+        self.assertEqual(distances, sorted(distances))
+        self.assertEqual(len(self.graph.itineraries(1, 3, k=5, max_stops=0)), 1)
+
+
+@override_settings(DATASET_VERSION_TTL=0)
+class ItinerariesViewTests(BaseTestCase):
+    def setUp(self):
+        route_graph.invalidate()
+
+    def test_itineraries(self):
+        route = self._create_route()
+        Airport.objects.filter(pk=route.origin_airport_id).update(iata='AAA')
+        Airport.objects.filter(pk=route.destination_airport_id).update(iata='BBB')
+        bump_version()
+
+        response = self.client.get('/api/itineraries/?origin=aaa&destination=BBB')
+
+        self.assertEqual(response.status_code, 200)
+        itineraries = response.json()['itineraries']
+        self.assertEqual(len(itineraries), 1)
+        self.assertEqual(itineraries[0]['stops'], 0)
+        self.assertEqual(
+            itineraries[0]['legs'][0]['airlines'][0]['id'], route.airline_id
+        )
+
+    def test_invalid_parameters(self):
+        self._create_airport()
+
+        response = self.client.get('/api/itineraries/?origin=xyz&destination=ZZZ')
+        self.assertEqual(response.status_code, 404)
+
+        response = self.client.get('/api/itineraries/?origin=xyz&destination=xyz&k=x')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(DATASET_VERSION_TTL=0)
+class VersioningTests(BaseTestCase):
+    def test_cache_is_rebuilt_when_version_changes(self):
+        builds = []
+        cache = VersionedCache(lambda: builds.append(1) or len(builds))
+
+        self.assertEqual(cache.get(), 1)
+        self.assertEqual(cache.get(), 1)
+        bump_version()
+        self.assertEqual(cache.get(), 2)
+
+    def test_changes_in_transaction_bump_version_once(self):
+        version = current_version()
+        self._create_route()
+
+        scheduled = [func for _, func in connection.run_on_commit]
+        self.assertEqual(scheduled, [bump_version])
+        self.assertEqual(current_version(), version)
+
+
+class AirportIndexTests(TestCase):
+    def setUp(self):
+        # Grid of airports every 5 degrees, including poles and antimeridian
+        self.airports = [
+            (pk, None, None, f'A{pk}', lat, lon)
+            for pk, (lat, lon) in enumerate(
+                (
+                    (lat, lon)
+                    for lat in range(-90, 91, 5)
+                    for lon in range(-180, 180, 5)
+                ),
+                start=1,
+            )
+        ]
+        self.index = AirportIndex(self.airports, leaf_size=4)
+        self.latitudes = np.array([row[4] for row in self.airports])
+        self.longitudes = np.array([row[5] for row in self.airports])
+
+    def _expected(self, lat, lon):
+        distances = haversine_km(self.latitudes, self.longitudes, lat, lon)
+        return distances, np.array([row[0] for row in self.airports])
+
+    def test_nearest_matches_full_scan(self):
+        for lat, lon in ((0, 0), (51.5, -0.1), (-89, 179.9), (12.3, -179.9)):
+            distances, pks = self._expected(lat, lon)
+            found = self.index.nearest(lat, lon, k=7)
+
+            self.assertEqual(len(found), 7)
+            np.testing.assert_allclose(
+                [distance for _, distance in found], np.sort(distances)[:7]
+            )
+
+    def test_within_matches_full_scan(self):
+        for lat, lon, radius_km in ((0, 0, 600), (60, 179, 1000), (90, 0, 1200)):
+            distances, pks = self._expected(lat, lon)
+            found = self.index.within(lat, lon, radius_km)
+
+            self.assertEqual(
+                sorted(pk for pk, _ in found), sorted(pks[distances <= radius_km])
+            )
+            self.assertEqual(found, sorted(found, key=lambda item: item[1]))
+
+    def test_empty_index(self):
+        index = AirportIndex([])
+
+        self.assertEqual(index.nearest(0, 0, 3), [])
+        self.assertEqual(index.within(0, 0, 100), [])
+
+
+@override_settings(DATASET_VERSION_TTL=0)
+class SpatialViewsTests(BaseTestCase):
+    def setUp(self):
+        airport_index.invalidate()
+
+    def test_nearest_and_within(self):
+        near = self._create_airport(name='Near', latitude=0, longitude=0.5)
+        self._create_airport(name='Far', latitude=10, longitude=10, openflights_id=2)
+
+        response = self.client.get('/api/airports/nearest/?lat=0&lon=0&k=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([a['id'] for a in response.json()['airports']], [near.pk])
+
+        response = self.client.get('/api/airports/within/?lat=0&lon=0&radius_km=100')
+        self.assertEqual(response.status_code, 200)
+        airports = response.json()['airports']
+        self.assertEqual([a['id'] for a in airports], [near.pk])
+        self.assertAlmostEqual(airports[0]['distance_km'], 55.6, places=0)
+
+        response = self.client.get('/api/airports/within/?lat=100&lon=0&radius_km=1')
+        self.assertEqual(response.status_code, 400)
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        def airport(pk, name, city_name, iata, icao, routes):
+            result = {'type': 'airport', 'id': pk, 'iata': iata, 'icao': icao}
+            return result, [name, city_name, iata, icao], routes
+
+        self.index = SearchIndex(
+            [
+                airport(1, 'Heathrow', 'London', 'LHR', 'EGLL', 100),
+                airport(2, 'Gatwick', 'London', 'LGW', 'EGKK', 50),
+                airport(3, 'Long Beach', 'Long Beach', 'LGB', 'KLGB', 5),
+                airport(4, 'São Paulo–Guarulhos', 'São Paulo', 'GRU', 'SBGR', 80),
+                (
+                    {'type': 'airline', 'id': 1, 'iata': 'BA', 'icao': 'BAW'},
+                    ['British Airways', None, 'SPEEDBIRD', 'BA', 'BAW'],
+                    200,
+                ),
+            ]
+        )
+
+    def _ids(self, query, **kwargs):
+        return [
+            (result['type'], result['id'])
+            for result in self.index.search(query, **kwargs)
+        ]
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize('São Paulo–Guarulhos'), ['sao', 'paulo', 'guarulhos'])
+        self.assertEqual(tokenize(None), [])
+
+    def test_prefix_distance(self):
+        self.assertEqual(prefix_distance('heatr', 'heathrow', 1), 1)
+        self.assertEqual(prefix_distance('londn', 'london', 1), 1)
+        self.assertGreater(prefix_distance('gatw', 'heathrow', 1), 1)
+
+    def test_prefix_ranked_by_relevance_and_popularity(self):
+        self.assertEqual(
+            self._ids('lon'), [('airport', 1), ('airport', 2), ('airport', 3)]
+        )
+        self.assertEqual(self._ids('long'), [('airport', 3)])
+        self.assertEqual(self._ids('london g'), [('airport', 2)])
+        self.assertEqual(self._ids('sao paulo'), [('airport', 4)])
+
+    def test_code_match_comes_first(self):
+        self.assertEqual(self._ids('lgb')[0], ('airport', 3))
+        self.assertEqual(self._ids('baw'), [('airline', 1)])
+
+    def test_typos(self):
+        self.assertEqual(self._ids('heatrow'), [('airport', 1)])
+        self.assertEqual(self._ids('speedbrid'), [('airline', 1)])
+        self.assertEqual(self._ids('lhx'), [])
+
+    def test_kind_and_limit(self):
+        self.assertEqual(self._ids('b', kind='airline'), [('airline', 1)])
+        self.assertEqual(len(self._ids('lon', limit=2)), 2)
+        self.assertEqual(self._ids('', limit=2), [])
+
+
+@override_settings(DATASET_VERSION_TTL=0)
+class SearchViewTests(BaseTestCase):
+    def setUp(self):
+        search_index.invalidate()
+
+    def test_search(self):
+        airport = self._create_airport(name='Heathrow')
+        airline = self._create_airline(name='British Airways')
+
+        response = self.client.get('/api/search/?q=heatrow')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(r['type'], r['id']) for r in response.json()['results']],
+            [('airport', airport.pk)],
+        )
+
+        # Index is rebuilt once saved changes bump dataset version
+        airline.callsign = 'SPEEDBIRD'
+        airline.save()
+        bump_version()
+        response = self.client.get('/api/search/?q=speedb&type=airline')
+        self.assertEqual([r['id'] for r in response.json()['results']], [airline.pk])
+
+        response = self.client.get('/api/search/?q=x&type=city')
+        self.assertEqual(response.status_code, 400)
+
+
+class ResourceApiTests(BaseTestCase):
+    def test_routes_are_paginated_with_keyset(self):
+        routes = [self._create_route() for _ in range(3)]
+        Route.objects.filter(pk=routes[1].pk).update(airline=None)
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/routes/?limit=2')
+        page = response.json()
+        self.assertEqual([r['id'] for r in page['results']], [r.pk for r in routes[:2]])
+        self.assertEqual(page['results'][0]['origin_airport']['name'], 'A1')
+        self.assertIsNone(page['results'][1]['airline'])
+        self.assertIn(f'after={routes[1].pk}', page['next'])
+
+        page = self.client.get(page['next']).json()
+        self.assertEqual([r['id'] for r in page['results']], [routes[2].pk])
+        self.assertIsNone(page['next'])
+
+    def test_fields_selection_and_detail(self):
+        flight = self._create_flight()
+
+        response = self.client.get(
+            f'/api/flights/{flight.pk}/?fields=departure_date,route'
+        )
+        data = response.json()
+        self.assertEqual(set(data), {'departure_date', 'route'})
+        self.assertEqual(data['route']['destination_airport']['name'], 'A2')
+
+        response = self.client.get('/api/airports/?fields=name,secret')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(f'/api/airlines/{flight.route.airline_id + 1}/')
+        self.assertEqual(response.status_code, 404)
+
+
+class LRUCacheTests(TestCase):
+    def test_least_recently_used_are_evicted(self):
+        cache = LRUCache()
+        cache.set('a', 1, size=2)
+        cache.set('b', 2, size=2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3, size=2)
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((cache.get('a'), cache.get('c')), (1, 3))
+
+
+@override_settings(DATASET_VERSION_TTL=0, RESPONSE_CACHE_SIZE=10)
+class ResponseCacheTests(BaseTestCase):
+    def setUp(self):
+        responses.clear()
+
+    def test_responses_are_cached_until_version_changes(self):
+        airport = self._create_airport(name='Old')
+        bump_version()
+
+        response = self.client.get('/api/airports/?fields=name&limit=5')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(etag, f'W/"{current_version()}"')
+        self.assertIn('Last-Modified', response)
+        self.assertIn('max-age=60', response['Cache-Control'])
+
+        # Changes are not seen until version is bumped, only version is queried
+        Airport.objects.filter(pk=airport.pk).update(name='New')
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/airports/?limit=5&fields=name')
+        self.assertEqual(response.json()['results'], [{'name': 'Old'}])
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/airports/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        bump_version()
+        response = self.client.get(
+            '/api/airports/?fields=name', HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [{'name': 'New'}])
+
+    def test_errors_are_not_cached(self):
+        response = self.client.get('/api/search/?q=')
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('ETag', response)
+        self.assertEqual(len(responses.local.entries), 0)
+
+
+class StatisticsTests(BaseTestCase):
+    def test_statistics_views(self):
+        route = self._create_route()
+        Route.objects.create(
+            airline=route.airline,
+            origin_airport=route.destination_airport,
+            destination_airport=route.origin_airport,
+            equipment='abcd 320',
+        )
+        refresh_statistics()
+
+        response = self.client.get('/api/statistics/airports/?limit=1&country=au')
+        self.assertEqual(response.status_code, 200)
+        [row] = response.json()['results']
+        self.assertEqual(row['routes'], 2)
+        self.assertEqual((row['outgoing_routes'], row['incoming_routes']), (1, 1))
+
+        response = self.client.get('/api/statistics/airlines/')
+        [row] = response.json()['results']
+        self.assertEqual(row['airline']['id'], route.airline_id)
+        self.assertEqual((row['routes'], row['airports'], row['countries']), (2, 2, 1))
+
+        response = self.client.get('/api/statistics/countries/?order=airport_pairs')
+        self.assertEqual(
+            response.json()['results'],
+            [
+                {
+                    'origin_country': 'AU',
+                    'destination_country': 'AU',
+                    'routes': 2,
+                    'airlines': 1,
+                    'airport_pairs': 2,
+                }
+            ],
+        )
+
+        response = self.client.get('/api/statistics/equipment/')
+        self.assertEqual(
+            [(row['equipment'], row['routes']) for row in response.json()['results']],
+            [('abcd', 2), ('320', 1)],
+        )
+
+        response = self.client.get('/api/statistics/equipment/?order=stops')
+        self.assertEqual(response.status_code, 400)
+
+    def test_imports_refresh_statistics_once(self):
+        data_imported.send(sender=Airport)
+        data_imported.send(sender=Route)
+
+        scheduled = [func for _, func in connection.run_on_commit]
+        self.assertEqual(scheduled.count(refresh_statistics), 1)
+
+
+class IndexTests(BaseTestCase):
+    def test_openflights_id_is_unique(self):
+        self._create_airport(openflights_id=5)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self._create_airport(openflights_id=5)
+
+    def test_explain_without_indexes(self):
+        airport = self._create_airport()
+
+        plan = explain(Airport.objects.filter(iata=airport.iata), use_indexes=False)
+        self.assertIn('Seq Scan', plan)
+
+
+@override_settings(DATASET_VERSION_TTL=0)
+class ResolverTests(BaseTestCase):
+    def test_resolves_codes_and_ids(self):
+        airport = self._create_airport()
+        defunct = self._create_airline(name='Defunct')
+        Airline.objects.filter(pk=defunct.pk).update(is_active=False)
+        active = self._create_airline(name='Active')
+        resolver = AirlineResolver()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(resolver.by_code(' XYZ ').pk, active.pk)
+            self.assertEqual(
+                resolver.by_openflights_id(defunct.openflights_id).name, 'Defunct'
+            )
+        # Only dataset version is checked on second lookup
+        self.assertEqual(
+            len([query for query in queries if 'core_airline' in query['sql']]), 1
+        )
+        self.assertEqual(AirportResolver().by_code('abcd').pk, airport.pk)
+
+        Airline.objects.filter(pk=active.pk).update(deleted_at=timezone.now())
+        self.assertEqual(resolver.by_code('xyz').pk, active.pk)
+        bump_version()
+        self.assertEqual(resolver.by_code('xyz').pk, defunct.pk)
+
+    @override_settings(RESOLVER_CACHE='default')
+    def test_shared_cache_tier(self):
+        airport = self._create_airport()
+        AirportResolver().by_pk(airport.pk)
+
+        # Another process finds rows of current version in shared cache
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(AirportResolver().by_pk(airport.pk).name, airport.name)
+        self.assertFalse([query for query in queries if 'core_airport' in query['sql']])
+
+
+class ConvertTests(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_dir = Path(self.temp_dir.name)
+        self.labels = ['openflights_id', 'name', 'country']
+        self.rows = [
+            ['1', 'Quoted, "name"', 'Australia'],
+            ['2', 'Multi\nline', '\\N'],
+            ['3', 'Café', 'France'],
+        ]
+        with open(self.data_dir / 'airlines.csv', 'w', newline='') as f:
+            csv.writer(f).writerows(self.rows)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _expected(self):
+        return [dict(zip(self.labels, row)) for row in self.rows]
+
+    def test_json_array(self):
+        output_file = csv_file_to_json(
+            self.data_dir / 'airlines.csv', self.data_dir / 'json', self.labels
+        )
+
+        self.assertEqual(output_file, self.data_dir / 'json' / 'airlines.json')
+        with open(output_file) as f:
+            self.assertEqual(json.load(f), self._expected())
+
+    def test_json_lines(self):
+        output_file = csv_file_to_json(
+            self.data_dir / 'airlines.csv', None, self.labels, lines=True
+        )
+
+        self.assertEqual(output_file, self.data_dir / 'airlines.jsonl')
+        with open(output_file) as f:
+            lines = f.read().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], self._expected())
+
+    def test_converts_every_file_of_metadata(self):
+        with open(self.data_dir / 'metadata.json', 'w') as f:
+            json.dump(
+                {'airline': {'filename': 'airlines.csv', 'labels': self.labels}}, f
+            )
+
+        with self.assertLogs(level='WARNING'):
+            output_files = convert(lines=True, workers=1, data_dir=self.data_dir)
+
+        self.assertEqual(output_files, [self.data_dir / 'json' / 'airlines.jsonl'])
+        with open(output_files[0]) as f:
+            self.assertEqual(len(f.read().splitlines()), len(self.rows))
+
+
+@skipUnless(pd, 'pandas is not installed')
+class CountryResolverTests(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_dir = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _read_cache(self):
+        with open(self.data_dir / CountryResolver.cache_filename) as f:
+            return json.load(f)
+
+    def _write_cache(self, cache):
+        with open(self.data_dir / CountryResolver.cache_filename, 'w') as f:
+            json.dump(cache, f)
+
+    def test_codes_are_cached_until_key_changes(self):
+        resolver = CountryResolver(self.data_dir)
+        cache = self._read_cache()
+        self.assertEqual(cache['key'], resolver._cache_key())
+        self.assertEqual(cache['codes']['france'], 'FR')
+
+        # Cached map is used as is while key matches
+        cache['codes']['atlantis'] = 'AT'
+        self._write_cache(cache)
+        self.assertEqual(CountryResolver(self.data_dir).code('Atlantis'), 'AT')
+
+        # Outdated map is rebuilt and cached again
+        cache['key'] = 'outdated'
+        self._write_cache(cache)
+        self.assertIsNone(CountryResolver(self.data_dir).code('Atlantis'))
+        self.assertEqual(self._read_cache()['key'], resolver._cache_key())
+
+        with override_settings(COUNTRIES_ONLY=['FR']):
+            self.assertNotEqual(resolver._cache_key(), cache['key'])
+
+    def test_aliases_take_precedence_and_names_are_normalized(self):
+        with open(self.data_dir / CountryResolver.aliases_filename, 'w') as f:
+            json.dump({'FRANCE': 'MC', 'Holland': 'NL'}, f)
+
+        resolver = CountryResolver(self.data_dir)
+
+        self.assertEqual(resolver.code(' france '), 'MC')
+        self.assertEqual(resolver.code('holland'), 'NL')
+        self.assertEqual(resolver.code('ÅLAND   islands'), 'AX')
+        self.assertIsNone(resolver.code(None))
+
+    def test_resolve_counts_unmapped_names(self):
+        resolver = CountryResolver(self.data_dir)
+        names = pd.Series(
+            ['France', None, 'Atlantis', 'Atlantis', 'france'], dtype='category'
+        )
+
+        codes = resolver.resolve(names)
+
+        self.assertEqual(codes[[0, 4]].tolist(), ['FR', 'FR'])
+        self.assertTrue(codes[[1, 2, 3]].isna().all())
+        self.assertEqual(resolver.unmapped, {'Atlantis': 2})
+
+        with self.assertLogs(level='WARNING') as logs:
+            resolver.log_unmapped()
+        self.assertEqual(
+            logs.output,
+            ["WARNING:root:Country 'Atlantis' is not mapped to code (2 rows)"],
+        )
+
+    def test_resolver_is_shared_per_data_dir(self):
+        self.assertIs(country_resolver(self.data_dir), country_resolver(self.data_dir))
+
+
+class FlightPartitionTests(BaseTestCase):
+    def _partition_of(self, flight):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT tableoid::regclass::text FROM core_flight WHERE id = %s',
+                [flight.pk],
+            )
+            return cursor.fetchone()[0]
+
+    def test_flights_are_stored_in_monthly_partitions(self):
+        flight = self._create_flight()
+        self.assertEqual(flight.origin_airport_id, flight.route.origin_airport_id)
+
+        month = partitions.month_start(flight.departure_date)
+        self.assertEqual(self._partition_of(flight), partitions.partition_name(month))
+
+    def test_ensure_partitions_moves_flights_from_default_partition(self):
+        flight = self._create_flight()
+        far = partitions.add_months(partitions.month_start(flight.departure_date), 60)
+        Flight.objects.filter(pk=flight.pk).update(
+            departure_date=datetime.datetime(far.year, far.month, 2, tzinfo=utc)
+        )
+        self.assertEqual(self._partition_of(flight), partitions.DEFAULT_PARTITION)
+
+        created = partitions.ensure_partitions(months_ahead=0)
+
+        self.assertEqual(created, [far])
+        self.assertEqual(self._partition_of(flight), partitions.partition_name(far))
+
+    def test_drop_partitions(self):
+        current = partitions.month_start(timezone.now())
+        old = partitions.add_months(current, -24)
+        partitions.create_partition(old)
+
+        self.assertEqual(partitions.drop_partitions(before=current), [old])
+        self.assertNotIn(old, partitions.partition_months())
+
+
+class BoardTests(BaseTestCase):
+    def setUp(self):
+        resolvers.airports.invalidate()
+        resolvers.airlines.invalidate()
+
+    def test_departures_and_arrivals(self):
+        route = self._create_route()
+        Airport.objects.filter(pk=route.origin_airport_id).update(iata='AAA')
+        bump_version()
+        start = datetime.datetime(2030, 1, 31, 22, tzinfo=utc)
+        for hours in (3, 1, 30):
+            departure_date = start + datetime.timedelta(hours=hours)
+            Flight.objects.create(
+                route=route,
+                departure_date=departure_date,
+                arrival_date=departure_date + datetime.timedelta(hours=2),
+            )
+
+        response = self.client.get(
+            '/api/airports/aaa/departures/?since=2030-01-31T22:00:00Z&hours=12'
+        )
+        self.assertEqual(response.status_code, 200)
+        flights = response.json()['flights']
+        self.assertEqual(
+            [flight['departure_date'] for flight in flights],
+            ['2030-01-31T23:00:00Z', '2030-02-01T01:00:00Z'],
+        )
+        self.assertEqual(flights[0]['destination']['id'], route.destination_airport_id)
+        self.assertEqual(flights[0]['airline']['id'], route.airline_id)
+
+        arrivals = Flight.objects.arrivals(
+            route.destination_airport_id, start, start + datetime.timedelta(hours=4)
+        )
+        self.assertEqual(arrivals.count(), 1)
+        self.assertIn('departure_date', str(arrivals.query))
+
+        response = self.client.get('/api/airports/ZZZ/arrivals/')
+        self.assertEqual(response.status_code, 404)
+
+
+class GenerateFlightsTests(BaseTestCase):
+    def test_generate(self):
+        route = self._create_route()
+
+        # Monday 2031-03-03 to Sunday 2031-03-09, flights on Monday, Wednesday, Friday
+        generated = generate(datetime.date(2031, 3, 3), 7, per_day=2, weekdays='135')
+
+        self.assertEqual(generated, 6)
+        flights = Flight.objects.filter(route=route).order_by('departure_date')
+        self.assertEqual(
+            {flight.departure_date.date().isoweekday() for flight in flights}, {1, 3, 5}
+        )
+        # Same timetable every operating day
+        self.assertEqual(len({flight.departure_date.time() for flight in flights}), 2)
+
+        block = RouteTable.from_database().block_seconds()[0]
+        distance = haversine_km(100, 100, 50, 50)
+        self.assertEqual(block % 300, 0)
+        self.assertGreaterEqual(block, (30 + distance / 800 * 60 + 2 * 45) * 60)
+        for flight in flights:
+            self.assertEqual(flight.origin_airport_id, route.origin_airport_id)
+            self.assertEqual(
+                flight.destination_airport_id, route.destination_airport_id
+            )
+            self.assertEqual(
+                (flight.arrival_date - flight.departure_date).total_seconds(), block
+            )
+
+
+class BenchmarkTests(TestCase):
+    def test_scale_dataset(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source, target = Path(tmp) / 'source', Path(tmp) / 'target'
+            source.mkdir()
+            (source / 'airlines.csv').write_text('-1,"Unknown"\n7,"Abc Ltd."\n')
+            (source / 'airports.csv').write_text('1,"A1"\n2,"A2"\n')
+            (source / 'routes.csv').write_text(
+                'AB,7,AAA,1,BBB,2,,0,CR2\nAB,\\N,AAA,1,CCC,\\N,,0,\n'
+            )
+
+            scale_dataset(source, target, 3)
+
+            airports = (target / 'airports.csv').read_text().splitlines()
+            self.assertEqual([line[0] for line in airports], list('124578'))
+            routes = [
+                line.split(',')
+                for line in (target / 'routes.csv').read_text().splitlines()
+            ]
+            self.assertEqual(len(routes), 6)
+            self.assertEqual(routes[4][:6], ['AB', '23', 'AAA', '7', 'BBB', '8'])
+            self.assertEqual(routes[5][1], '\\N')
+
+    def test_compare(self):
+        results = {
+            '1x': {'a': {'median': 2.0}, 'b': {'median': 1.0}, 'new': {'median': 1.0}}
+        }
+        baseline = {'1x': {'a': {'median': 1.0}, 'b': {'median': 1.0}}}
+
+        comparison = compare(results, baseline, max_ratio=1.5)
+
+        self.assertEqual(
+            comparison,
+            [('1x', 'a', 1.0, 2.0, 2.0, True), ('1x', 'b', 1.0, 1.0, 1.0, False)],
+        )
+
+
+class InstrumentationTests(BaseTestCase):
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s) AND x = 5 LIMIT 21'),
+            fingerprint('SELECT * FROM t WHERE id IN (%s) AND x = 7 LIMIT 21'),
+        )
+        self.assertEqual(
+            fingerprint("SELECT 'a' FROM t\n  WHERE id = %s"),
+            'SELECT ? FROM t WHERE id = ?',
+        )
+
+    def test_server_timing_and_metrics(self):
+        response = self.client.get('/api/airports/')
+
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^db;dur=[\d.]+;desc="\d+ queries", app;dur=[\d.]+, total;dur=[\d.]+$',
+        )
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        content = response.content.decode()
+        self.assertIn(
+            'myflights_requests_total{view="airports-list",method="GET",status="200"}',
+            content,
+        )
+        self.assertIn(
+            'myflights_request_queries_bucket{view="airports-list",method="GET",le="+Inf"}',
+            content,
+        )
+
+    def test_metrics_of_all_processes_are_summed_up(self):
+        registry = metrics.Registry()
+        counter = registry.register(metrics.Counter('requests', 'Requests.', ('view',)))
+        histogram = registry.register(
+            metrics.Histogram('duration', 'Duration.', buckets=(1,))
+        )
+        counter.inc('a')
+        histogram.observe(0.5)
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            METRICS_DIR=directory
+        ):
+            # Another worker, which exits and is archived by master
+            other = {'requests': {('a',): 2, ('b',): 1}, 'duration': {(): ([0, 1], 3)}}
+            metrics._write_values(Path(directory) / '1.json', other)
+            rendered = registry.render()
+            registry.archive(1)
+
+            self.assertEqual(registry.render(), rendered)
+            self.assertEqual(
+                sorted(path.name for path in Path(directory).glob('*.json')),
+                sorted([metrics.ARCHIVE_FILENAME, f'{os.getpid()}.json']),
+            )
+
+        self.assertIn('requests{view="a"} 3\n', rendered)
+        self.assertIn('requests{view="b"} 1\n', rendered)
+        self.assertIn('duration_bucket{le="1"} 1\n', rendered)
+        self.assertIn('duration_bucket{le="+Inf"} 2\n', rendered)
+        self.assertIn('duration_sum 3.5\n', rendered)
+
+    @override_settings(SLOW_REQUEST_QUERIES=3)
+    def test_slow_request_logs_duplicated_queries(self):
+        self._create_route()
+
+        def view(request):
+            # Related objects of every Route are fetched by __str__ one by one
+            for route in Route.objects.all():
+                str(route)
+            return HttpResponse()
+
+        middleware = QueryInstrumentationMiddleware(view)
+        with self.assertLogs(level='WARNING') as logs:
+            middleware(RequestFactory().get('/routes/'))
+
+        message = logs.output[0]
+        self.assertIn('[GET /routes/] Slow request', message)
+        self.assertIn('Duplicated queries:', message)
+        self.assertIn('2x SELECT "core_airport"', message)
+
+
+class AdminTests(BaseTestCase):
+    def setUp(self):
+        resolvers.airports.invalidate()
+        resolvers.airlines.invalidate()
+        user = get_user_model().objects.create_superuser('admin@example.com', 'pass')
+        self.client.force_login(user)
+
+    def _changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self._create_flight()
+        flight_queries = self._changelist_queries('/admin/core/flight/')
+        route_queries = self._changelist_queries('/admin/core/route/')
+
+        for _ in range(3):
+            self._create_flight()
+
+        self.assertEqual(
+            self._changelist_queries('/admin/core/flight/'), flight_queries
+        )
+        self.assertEqual(self._changelist_queries('/admin/core/route/'), route_queries)
+
+    @override_settings(DATASET_VERSION_TTL=0)
+    def test_search_by_code(self):
+        flight = self._create_flight()
+        other = self._create_flight()
+        Airport.objects.filter(pk=flight.origin_airport_id).update(iata='AAA')
+        bump_version()
+
+        response = self.client.get('/admin/core/flight/?q=aaa')
+        self.assertEqual(list(response.context['cl'].result_list), [flight])
+
+        response = self.client.get(f'/admin/core/route/?q={other.route_id}')
+        self.assertEqual(list(response.context['cl'].result_list), [other.route])
+
+        response = self.client.get('/admin/core/flight/?q=unknown')
+        self.assertEqual(list(response.context['cl'].result_list), [])
+
+    def test_estimated_count_paginator(self):
+        for _ in range(3):
+            self._create_flight()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_flight')
+
+        paginator = EstimatedCountPaginator(Flight.objects.order_by('pk'), 2)
+        paginator.exact_count_limit = 0
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator.count, 3)
+
+        paginator = EstimatedCountPaginator(Flight.objects.filter(pk__gt=0), 2)
+        paginator.max_count = 2
+        self.assertEqual(paginator.count, 2)
@@ -0,0 +1,37 @@
+from django.urls import path
+
+from . import api, views
+
+resources = [
+    ('airports', api.AirportResource),
+    ('airlines', api.AirlineResource),
+    ('routes', api.RouteResource),
+    ('flights', api.FlightResource),
+]
+
+statistics = [
+    ('airports', api.AirportStatistics),
+    ('airlines', api.AirlineStatistics),
+    ('countries', api.CountryStatistics),
+    ('equipment', api.EquipmentStatistics),
+]
+
+urlpatterns = [
+    path('search/', views.search, name='search'),
+    path('itineraries/', views.itineraries, name='itineraries'),
+    path('airports/nearest/', views.nearest_airports, name='nearest-airports'),
+    path('airports/within/', views.airports_within, name='airports-within'),
+    path('airports/<str:code>/departures/', views.departures, name='departures'),
+    path('airports/<str:code>/arrivals/', views.arrivals, name='arrivals'),
+]
+
+for name, Resource in resources:
+    urlpatterns += [
+        path(f'{name}/', Resource.as_view(), name=f'{name}-list'),
+        path(f'{name}/<int:pk>/', Resource.as_view(), name=f'{name}-detail'),
+    ]
+
+for name, View in statistics:
+    urlpatterns.append(
+        path(f'statistics/{name}/', View.as_view(), name=f'{name}-statistics')
+    )
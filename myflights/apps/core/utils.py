@@ -1,7 +1,76 @@
+import json
 from pathlib import Path
 
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 def get_base_dir():
     """Returns base (root) directory of project
     """
     return Path(__file__).parent.parent.parent.parent
+
+
+def parse_script_args(args):
+    """Parses arguments given to `runscript` with `--script-args`
+    as `key=value` pairs or bare flags.
+
+    :param args: arguments passed to script's `run` function
+    :type args: Tuple[str]
+    :returns: options by their names, flags are set to True
+    :rtype: Dict[str, Union[str, bool]]
+    """
+    options = {}
+    for arg in args:
+        key, _, value = arg.partition('=')
+        options[key] = value or True
+    return options
+
+
+class BadRequest(ValueError):
+    """Raised on invalid query parameters, reported with 400 status.
+    """
+
+    pass
+
+
+def json_dumps(data):
+    """Serializes data to compact JSON with `orjson` if it is installed,
+    falling back to standard `json` module with Django's encoder.
+
+    :param data: data to be serialized, may contain dates, decimals and UUIDs.
+    :type data: Any
+    :rtype: bytes
+    """
+
+    if orjson is not None:
+        return orjson.dumps(
+            data, default=DjangoJSONEncoder().default, option=orjson.OPT_UTC_Z
+        )
+
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+
+
+def estimated_count(model):
+    """Estimates number of rows in model's table (or its partitions)
+    from planner statistics without scanning table.
+    Statistics of partitioned table itself are skipped, they duplicate partitions.
+
+    :param model: model class
+    :type model: Type[django.db.models.Model]
+    :rtype: int
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT coalesce(sum(greatest(reltuples, 0)), 0) FROM pg_class '
+            "WHERE relkind <> 'p' AND (oid = %s::regclass OR oid IN "
+            '(SELECT inhrelid FROM pg_inherits WHERE inhparent = %s::regclass))',
+            [model._meta.db_table] * 2,
+        )
+        return int(cursor.fetchone()[0])
@@ -0,0 +1,121 @@
+import time
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from myflights.apps.core.models import DatasetVersion
+
+# Last version and its update time read from database, and monotonic time of the read
+_checked = (None, None, 0.0)
+
+
+def current_state():
+    """Returns current dataset version and time it was bumped.
+    Database is queried at most once per `DATASET_VERSION_TTL` seconds per process.
+
+    :rtype: Tuple[int, Optional[datetime.datetime]]
+    """
+
+    global _checked
+
+    version, updated_at, checked_at = _checked
+    now = time.monotonic()
+    if version is None or now - checked_at >= settings.DATASET_VERSION_TTL:
+        row = (
+            DatasetVersion.objects.filter(pk=1)
+            .values_list('version', 'updated_at')
+            .first()
+        )
+        version, updated_at = row or (0, None)
+        _checked = (version, updated_at, now)
+
+    return version, updated_at
+
+
+def current_version():
+    """Returns current dataset version.
+    Database is queried at most once per `DATASET_VERSION_TTL` seconds per process.
+
+    :rtype: int
+    """
+    return current_state()[0]
+
+
+def version_updated_at():
+    """Returns time when dataset version was bumped last, None if it never was.
+
+    :rtype: Optional[datetime.datetime]
+    """
+    return current_state()[1]
+
+
+def bump_version():
+    """Increments dataset version in database.
+    """
+
+    global _checked
+
+    bumped = DatasetVersion.objects.filter(pk=1).update(
+        version=F('version') + 1, updated_at=timezone.now()
+    )
+    if not bumped:
+        DatasetVersion.objects.get_or_create(pk=1, defaults={'version': 1})
+    _checked = (None, None, 0.0)
+
+
+def schedule_bump(using=None):
+    """Bumps dataset version once current transaction is committed,
+    or immediately in autocommit mode.
+    Any number of changes made in one transaction bump version once.
+
+    :param using: database alias. Default is 'default'
+    :type using: str
+    """
+
+    connection = transaction.get_connection(using)
+    if all(func is not bump_version for _, func in connection.run_on_commit):
+        transaction.on_commit(bump_version, using)
+
+
+class VersionedCache:
+    """Keeps value built by `builder` in process memory
+    and rebuilds it when dataset version changes.
+    """
+
+    def __init__(self, builder):
+        """Initializes `VersionedCache` instance.
+
+        :param builder: callable without arguments which builds cached value.
+        :type builder: Callable[[], Any]
+        """
+
+        self.builder = builder
+        self.value = None
+        self.version = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        """Returns cached value, rebuilding it if dataset has changed.
+
+        :rtype: Any
+        """
+
+        version = current_version()
+        if self.version != version:
+            with self.lock:
+                if self.version != version:
+                    self.value = self.builder()
+                    self.version = version
+
+        return self.value
+
+    def invalidate(self):
+        """Drops cached value, it is rebuilt on next access.
+        """
+
+        with self.lock:
+            self.value = None
+            self.version = None
@@ -1,3 +1,401 @@
-from django.shortcuts import render
+from datetime import timedelta
 
-# Create your views here.
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import require_GET
+
+from myflights.apps.core import resolvers
+from myflights.apps.core.caching import cache_response
+from myflights.apps.core.graph import route_graph
+from myflights.apps.core.metrics import registry
+from myflights.apps.core.models import Flight
+from myflights.apps.core.search import search_index
+from myflights.apps.core.spatial import airport_index
+from myflights.apps.core.utils import BadRequest
+
+# Upper limit for number of itineraries requested at once
+MAX_ITINERARIES = 10
+# Upper limits for number of nearest Airports and for search radius
+MAX_NEAREST = 100
+MAX_RADIUS_KM = 20000
+# Upper limits for time window and number of flights of departure and arrival boards
+MAX_BOARD_HOURS = 48
+MAX_BOARD_FLIGHTS = 200
+# Upper limit for number of search results
+MAX_SEARCH_RESULTS = 50
+# Kinds of documents search could be restricted to
+SEARCH_TYPES = ('airport', 'airline')
+
+
+def _int_param(request, name, default=None, minimum=0, maximum=None):
+    """Reads integer query parameter.
+
+    :param request: HTTP request
+    :type request: django.http.HttpRequest
+    :param name: parameter name
+    :type name: str
+    :param default: value of missing parameter
+    :type default: Optional[int]
+    :param minimum: min allowed value
+    :type minimum: int
+    :param maximum: max allowed value. Default is unlimited
+    :type maximum: int
+    :rtype: Optional[int]
+    :raises BadRequest: if value is not an integer or is out of range.
+    """
+
+    value = request.GET.get(name)
+    if value in (None, ''):
+        return default
+
+    try:
+        value = int(value)
+    except ValueError:
+        raise BadRequest(f'{name} must be an integer')
+
+    if value < minimum or (maximum is not None and value > maximum):
+        raise BadRequest(f'{name} must be between {minimum} and {maximum or "inf"}')
+    return value
+
+
+def _float_param(request, name, minimum, maximum):
+    """Reads required float query parameter.
+
+    :param request: HTTP request
+    :type request: django.http.HttpRequest
+    :param name: parameter name
+    :type name: str
+    :param minimum: min allowed value
+    :type minimum: float
+    :param maximum: max allowed value
+    :type maximum: float
+    :rtype: float
+    :raises BadRequest: if value is missing, is not a number or is out of range.
+    """
+
+    value = request.GET.get(name)
+    if value in (None, ''):
+        raise BadRequest(f'{name} is required')
+
+    try:
+        value = float(value)
+    except ValueError:
+        raise BadRequest(f'{name} must be a number')
+
+    if not minimum <= value <= maximum:
+        raise BadRequest(f'{name} must be between {minimum} and {maximum}')
+    return value
+
+
+def _airport_json(source, pk):
+    """Serializes Airport known to route graph or spatial index.
+
+    :param source: route graph or spatial index
+    :type source: Union[myflights.apps.core.graph.RouteGraph,
+    myflights.apps.core.spatial.AirportIndex]
+    :param pk: Airport primary key
+    :type pk: int
+    :rtype: Dict[str, Any]
+    """
+
+    iata, icao, name = source.airports[pk]
+    return {'id': pk, 'iata': iata, 'icao': icao, 'name': name}
+
+
+def _airline_json(graph, pk):
+    """Serializes Airline known to route graph.
+
+    :param graph: route graph
+    :type graph: myflights.apps.core.graph.RouteGraph
+    :param pk: Airline primary key
+    :type pk: int
+    :rtype: Dict[str, Any]
+    """
+
+    iata, icao, name = graph.airlines.get(pk, (None, None, None))
+    return {'id': pk, 'iata': iata, 'icao': icao, 'name': name}
+
+
+def _itinerary_json(graph, itinerary):
+    """Serializes itinerary found in route graph.
+
+    :param graph: route graph
+    :type graph: myflights.apps.core.graph.RouteGraph
+    :param itinerary: itinerary
+    :type itinerary: myflights.apps.core.graph.Itinerary
+    :rtype: Dict[str, Any]
+    """
+
+    return {
+        'distance_km': round(itinerary.distance_km, 1),
+        'stops': len(itinerary.legs) - 1,
+        'legs': [
+            {
+                'origin': _airport_json(graph, leg.origin),
+                'destination': _airport_json(graph, leg.destination),
+                'distance_km': round(leg.distance_km, 1),
+                'airlines': [_airline_json(graph, pk) for pk in leg.airlines],
+            }
+            for leg in itinerary.legs
+        ],
+    }
+
+
+@cache_response
+@require_GET
+def itineraries(request):
+    """Finds shortest itineraries between two Airports. Query parameters:
+    `origin` and `destination` Airport IATA or ICAO codes,
+    `k` max number of itineraries (default 3),
+    `max_stops` max number of intermediate Airports (default unlimited),
+    `airlines` comma separated IATA or ICAO codes of Airlines allowed to operate legs.
+    """
+
+    graph = route_graph.get()
+
+    try:
+        airports = {}
+        for name in ('origin', 'destination'):
+            code = request.GET.get(name)
+            if not code:
+                raise BadRequest(f'{name} is required')
+            airports[name] = graph.airport_by_code(code)
+            if airports[name] is None:
+                return JsonResponse(
+                    {'error': f'Airport {code!r} not found'}, status=404
+                )
+
+        k = _int_param(request, 'k', default=3, minimum=1, maximum=MAX_ITINERARIES)
+        max_stops = _int_param(request, 'max_stops')
+
+        airlines = None
+        if request.GET.get('airlines'):
+            airlines = [
+                pk
+                for code in request.GET['airlines'].split(',')
+                for pk in graph.airlines_by_code(code)
+            ]
+    except BadRequest as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    found = graph.itineraries(
+        airports['origin'], airports['destination'], k, max_stops, airlines
+    )
+
+    return JsonResponse(
+        {
+            'origin': _airport_json(graph, airports['origin']),
+            'destination': _airport_json(graph, airports['destination']),
+            'itineraries': [_itinerary_json(graph, itinerary) for itinerary in found],
+        }
+    )
+
+
+def _located_airports_json(index, found):
+    """Serializes Airports found in spatial index.
+
+    :param index: spatial index
+    :type index: myflights.apps.core.spatial.AirportIndex
+    :param found: Airport pks and distances
+    :type found: List[Tuple[int, float]]
+    :rtype: Dict[str, Any]
+    """
+
+    return {
+        'airports': [
+            dict(_airport_json(index, pk), distance_km=round(distance, 1))
+            for pk, distance in found
+        ]
+    }
+
+
+@cache_response
+@require_GET
+def nearest_airports(request):
+    """Finds Airports nearest to the point. Query parameters:
+    `lat` and `lon` in degrees, `k` number of Airports (default 5).
+    """
+
+    try:
+        lat = _float_param(request, 'lat', -90, 90)
+        lon = _float_param(request, 'lon', -180, 180)
+        k = _int_param(request, 'k', default=5, minimum=1, maximum=MAX_NEAREST)
+    except BadRequest as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    index = airport_index.get()
+    return JsonResponse(_located_airports_json(index, index.nearest(lat, lon, k)))
+
+
+@cache_response
+@require_GET
+def airports_within(request):
+    """Finds Airports within distance from the point. Query parameters:
+    `lat` and `lon` in degrees, `radius_km` max distance in kilometers.
+    """
+
+    try:
+        lat = _float_param(request, 'lat', -90, 90)
+        lon = _float_param(request, 'lon', -180, 180)
+        radius_km = _float_param(request, 'radius_km', 0, MAX_RADIUS_KM)
+    except BadRequest as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    index = airport_index.get()
+    return JsonResponse(
+        _located_airports_json(index, index.within(lat, lon, radius_km))
+    )
+
+
+def _datetime_param(request, name):
+    """Reads optional ISO 8601 date time query parameter, naive values are in UTC.
+
+    :param request: HTTP request
+    :type request: django.http.HttpRequest
+    :param name: parameter name
+    :type name: str
+    :rtype: Optional[datetime.datetime]
+    :raises BadRequest: if value is not a valid date time.
+    """
+
+    value = request.GET.get(name)
+    if value in (None, ''):
+        return None
+
+    try:
+        parsed = parse_datetime(value.replace(' ', '+'))
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise BadRequest(f'{name} must be ISO 8601 date time')
+
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, timezone.utc)
+    return parsed
+
+
+def _ref_json(ref):
+    """Serializes Airport or Airline resolved by code resolver.
+
+    :param ref: essential fields of object, None if it is unknown.
+    :type ref: Optional[Union[myflights.apps.core.resolvers.AirportRef,
+    myflights.apps.core.resolvers.AirlineRef]]
+    :rtype: Optional[Dict[str, Any]]
+    """
+
+    if ref is None:
+        return None
+    return {'id': ref.pk, 'iata': ref.iata, 'icao': ref.icao, 'name': ref.name}
+
+
+def _board(request, code, arrivals=False):
+    """Responds with departure or arrival board of Airport. Query parameters:
+    `since` ISO 8601 date time (default now), `hours` time window (default 12),
+    `limit` max number of flights (default 50).
+    Airports and Airlines are taken from code resolvers, not joined in query.
+
+    :param request: HTTP request
+    :type request: django.http.HttpRequest
+    :param code: Airport IATA or ICAO code
+    :type code: str
+    :param arrivals: make arrival board instead of departure one.
+    :type arrivals: bool
+    :rtype: django.http.JsonResponse
+    """
+
+    airport = resolvers.airports.by_code(code)
+    if airport is None:
+        return JsonResponse({'error': f'Airport {code!r} not found'}, status=404)
+
+    try:
+        start = _datetime_param(request, 'since') or timezone.now()
+        hours = _int_param(
+            request, 'hours', default=12, minimum=1, maximum=MAX_BOARD_HOURS
+        )
+        limit = _int_param(
+            request, 'limit', default=50, minimum=1, maximum=MAX_BOARD_FLIGHTS
+        )
+    except BadRequest as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    end = start + timedelta(hours=hours)
+    if arrivals:
+        flights = Flight.objects.arrivals(airport.pk, start, end)
+    else:
+        flights = Flight.objects.departures(airport.pk, start, end)
+    rows = flights.values_list(
+        'id',
+        'departure_date',
+        'arrival_date',
+        'origin_airport_id',
+        'destination_airport_id',
+        'route__airline_id',
+    )[:limit]
+
+    return JsonResponse(
+        {
+            'airport': _ref_json(airport),
+            'flights': [
+                {
+                    'id': pk,
+                    'departure_date': departure_date,
+                    'arrival_date': arrival_date,
+                    'origin': _ref_json(resolvers.airports.by_pk(origin)),
+                    'destination': _ref_json(resolvers.airports.by_pk(destination)),
+                    'airline': _ref_json(resolvers.airlines.by_pk(airline)),
+                }
+                for pk, departure_date, arrival_date, origin, destination, airline in rows
+            ],
+        }
+    )
+
+
+@require_GET
+def departures(request, code):
+    """Departure board of Airport given by IATA or ICAO code.
+    """
+    return _board(request, code)
+
+
+@require_GET
+def arrivals(request, code):
+    """Arrival board of Airport given by IATA or ICAO code.
+    """
+    return _board(request, code, arrivals=True)
+
+
+@cache_response
+@require_GET
+def search(request):
+    """Suggests Airports and Airlines as the user types, from in-memory index.
+    Query parameters: `q` beginning of name, city, alias, callsign or code,
+    with few typos tolerated, `type` 'airport' or 'airline' (default both),
+    `limit` max number of results (default 10).
+    """
+
+    try:
+        query = request.GET.get('q', '').strip()
+        if not query:
+            raise BadRequest('q is required')
+        kind = request.GET.get('type') or None
+        if kind is not None and kind not in SEARCH_TYPES:
+            raise BadRequest(f'type must be one of {", ".join(SEARCH_TYPES)}')
+        limit = _int_param(
+            request, 'limit', default=10, minimum=1, maximum=MAX_SEARCH_RESULTS
+        )
+    except BadRequest as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    results = search_index.get().search(query, kind, limit)
+    return JsonResponse({'query': query, 'results': results})
+
+
+@require_GET
+def metrics(request):
+    """Request and SQL query metrics in Prometheus text format, summed up
+    over all processes of web server if `METRICS_DIR` is set.
+    """
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
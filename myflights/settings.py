@@ -45,6 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'myflights.apps.core.middleware.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -81,15 +82,67 @@ WSGI_APPLICATION = 'myflights.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'postgres',
-        'USER': 'postgres',
-        'PASSWORD': 'postgres',
-        'HOST': 'db',
-        'PORT': '5432',
+        'NAME': os.getenv('DATABASE_NAME', 'postgres'),
+        'USER': os.getenv('DATABASE_USER', 'postgres'),
+        'PASSWORD': os.getenv('DATABASE_PASSWORD', 'postgres'),
+        'HOST': os.getenv('DATABASE_HOST', 'db'),
+        'PORT': os.getenv('DATABASE_PORT', '5432'),
+        # Seconds a connection is reused by requests of the same worker thread,
+        # instead of connecting to database on every request
+        'CONN_MAX_AGE': int(os.getenv('DATABASE_CONN_MAX_AGE', 60)),
+        # Named cursors of `QuerySet.iterator` do not survive transaction pooling
+        # of PgBouncer, set when connecting through it
+        'DISABLE_SERVER_SIDE_CURSORS': os.getenv('DATABASE_POOLER') is not None,
     }
 }
 
 
+# Data import
+# Backend used by importers to save data: 'orm' (bulk_create) or 'copy' (PostgreSQL COPY)
+
+IMPORT_LOADER = os.getenv('IMPORT_LOADER', 'orm')
+
+# Max seconds in-process caches of imported data may serve previous dataset version
+
+DATASET_VERSION_TTL = float(os.getenv('DATASET_VERSION_TTL', 5))
+
+# Alias of cache from CACHES shared by all processes (like Redis) used as second tier
+# of code resolvers, they keep data in process memory only if not set
+
+RESOLVER_CACHE = os.getenv('RESOLVER_CACHE')
+RESOLVER_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Responses of reference data views are cached until dataset version changes:
+# number of responses kept in process memory (0 disables response caching),
+# alias of cache from CACHES shared by all processes used as second tier
+# and seconds clients and proxies may reuse response before revalidating it
+
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', 1000))
+RESPONSE_CACHE = os.getenv('RESPONSE_CACHE')
+RESPONSE_CACHE_TIMEOUT = 24 * 60 * 60
+RESPONSE_CACHE_MAX_AGE = int(os.getenv('RESPONSE_CACHE_MAX_AGE', 60))
+
+# Flights table is partitioned by month of departure, partitions are created this
+# number of months ahead after migrations and by `flight_partitions` script
+
+FLIGHT_PARTITIONS_AHEAD = int(os.getenv('FLIGHT_PARTITIONS_AHEAD', 3))
+
+
+# Instrumentation
+# Requests slower than this number of seconds or running at least this number of
+# SQL queries are logged with their slowest and duplicated queries
+
+SLOW_REQUEST_SECONDS = float(os.getenv('SLOW_REQUEST_SECONDS', 1))
+SLOW_REQUEST_QUERIES = int(os.getenv('SLOW_REQUEST_QUERIES', 50))
+
+# Directory shared by processes of web server, like gunicorn workers, where every
+# process writes its metrics every this number of seconds, so `metrics` view sums
+# up metrics of all processes. Metrics are kept in process memory only if not set
+
+METRICS_DIR = os.getenv('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 1))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -1,7 +1,11 @@
 from django.contrib import admin
 from django.urls import include, path
 
+from myflights.apps.core.views import metrics
+
 urlpatterns = [
     path('hello/', include('myflights.apps.hello.urls')),
+    path('api/', include('myflights.apps.core.urls')),
     path('admin/', admin.site.urls),
+    path('metrics', metrics, name='metrics'),
 ]
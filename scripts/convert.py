@@ -2,12 +2,18 @@
 
 import csv
 import json
+import logging
+import argparse
 
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+encoder = json.JSONEncoder(separators=(',', ':'))
 
-def csv_file_to_json(file, output_dir, labels=None):
+
+def csv_file_to_json(file, output_dir, labels=None, lines=False):
     """Converts CSV data file to JSON data file.
+    Rows are streamed one by one, so memory usage does not depend on file size.
 
     :param file: path to CSV file.
     :type file: pathlib.Path
@@ -15,6 +21,10 @@ def csv_file_to_json(file, output_dir, labels=None):
     :type output_dir: pathlib.Path
     :param labels: list of columns names.
     :type labels: list[str]
+    :param lines: write JSON Lines ('.jsonl') file instead of JSON array.
+    :type lines: bool
+    :returns: path to written file
+    :rtype: pathlib.Path
     """
 
     if labels is None:
@@ -23,32 +33,73 @@ def csv_file_to_json(file, output_dir, labels=None):
     if output_dir is None:
         output_dir = file.parent
 
-    with open(file) as f:
-        reader = csv.DictReader(f, labels)
-        contents = list(reader)
-
     if not output_dir.exists():
-        output_dir.mkdir(parents=True)
-
-    output_file = output_dir / file.with_suffix('.json').name
-    with open(output_file, 'w') as f:
-        json.dump(contents, f, indent=2)
-
-
-def main():
-    data_dir = Path('data')
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+    suffix = '.jsonl' if lines else '.json'
+    output_file = output_dir / file.with_suffix(suffix).name
+
+    with open(file, newline='') as src, open(output_file, 'w') as dst:
+        rows = (encoder.encode(row) for row in csv.DictReader(src, labels))
+
+        if lines:
+            for row in rows:
+                dst.write(row)
+                dst.write('\n')
+        else:
+            dst.write('[')
+            for i, row in enumerate(rows):
+                if i:
+                    dst.write(',\n')
+                dst.write(row)
+            dst.write(']\n')
+
+    return output_file
+
+
+def main(lines=False, workers=None, data_dir=Path('data')):
+    """Converts all CSV files described in metadata concurrently,
+    every file in its own process.
+
+    :param lines: write JSON Lines files instead of JSON arrays.
+    :type lines: bool
+    :param workers: max number of processes. Default is number of CPUs
+    :type workers: int
+    :param data_dir: path to directory with metadata and CSV files,
+    JSON files are written to its 'json' subdirectory. Default is './data'
+    :type data_dir: pathlib.Path
+    :returns: paths to written files
+    :rtype: list[pathlib.Path]
+    """
 
     with open(data_dir / 'metadata.json') as f:
         metadata = json.load(f)
 
-    output_dir = Path('data') / 'json'
+    output_dir = data_dir / 'json'
+
+    with ProcessPoolExecutor(workers) as executor:
+        futures = []
+        for entry in metadata.values():
+            filename = entry['filename']
+            labels = entry['labels']
+            csv_file = (data_dir / filename).with_suffix('.csv')
+            futures.append(
+                executor.submit(csv_file_to_json, csv_file, output_dir, labels, lines)
+            )
+
+        output_files = [future.result() for future in futures]
 
-    for entry in metadata:
-        filename = entry['filename']
-        labels = entry['labels']
-        csv_file = (data_dir / filename).with_suffix('.csv')
-        csv_file_to_json(csv_file, output_dir, labels)
+    for output_file in output_files:
+        logging.warning(f'Converted {output_file}')
+    return output_files
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description='Converts CSV data files to JSON.')
+    parser.add_argument(
+        '--lines', action='store_true', help='write JSON Lines instead of JSON arrays'
+    )
+    parser.add_argument('--workers', type=int, help='max number of processes')
+    args = parser.parse_args()
+
+    main(lines=args.lines, workers=args.workers)
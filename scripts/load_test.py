@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+
+import json
+import time
+import argparse
+import threading
+import statistics
+import http.client
+
+from itertools import cycle
+from urllib.parse import urlsplit
+
+
+class Worker(threading.Thread):
+    """Sends requests one after another over single keep-alive connection
+    until deadline and records their latencies.
+    """
+
+    def __init__(self, urls, deadline):
+        """Initializes Worker instance.
+
+        :param urls: URLs requested in turn, all on the same host.
+        :type urls: list[str]
+        :param deadline: `time.monotonic` value to stop at.
+        :type deadline: float
+        """
+
+        super().__init__(daemon=True)
+        self.urls = cycle(urls)
+        self.deadline = deadline
+        self.latencies = []
+        self.errors = 0
+        self.connection = None
+
+    def _connect(self, url):
+        parts = urlsplit(url)
+        Connection = (
+            http.client.HTTPSConnection
+            if parts.scheme == 'https'
+            else http.client.HTTPConnection
+        )
+        return Connection(parts.netloc, timeout=30)
+
+    def _request(self, url):
+        """Requests URL, reconnecting if server closed connection.
+
+        :param url: absolute URL
+        :type url: str
+        :returns: response status
+        :rtype: int
+        """
+
+        parts = urlsplit(url)
+        path = parts.path + (f'?{parts.query}' if parts.query else '')
+
+        if self.connection is None:
+            self.connection = self._connect(url)
+        try:
+            self.connection.request('GET', path)
+            response = self.connection.getresponse()
+            response.read()
+        except (http.client.HTTPException, OSError):
+            self.connection.close()
+            self.connection = None
+            raise
+        return response.status
+
+    def run(self):
+        while time.monotonic() < self.deadline:
+            url = next(self.urls)
+            started = time.perf_counter()
+            try:
+                status = self._request(url)
+            except (http.client.HTTPException, OSError):
+                self.errors += 1
+                continue
+            if status >= 400:
+                self.errors += 1
+            else:
+                self.latencies.append(time.perf_counter() - started)
+
+
+def percentile(values, fraction):
+    """Returns value below which given fraction of sorted values falls.
+
+    :param values: sorted values
+    :type values: list[float]
+    :param fraction: fraction between 0 and 1
+    :type fraction: float
+    :rtype: float
+    """
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main(urls, concurrency=10, duration=10.0, warmup=2.0):
+    """Requests URLs from concurrent connections for given number of seconds
+    and summarizes throughput and latencies of successful requests.
+
+    :param urls: URLs requested in turn
+    :type urls: list[str]
+    :param concurrency: number of simultaneous connections
+    :type concurrency: int
+    :param duration: seconds of measurement
+    :type duration: float
+    :param warmup: seconds of requests before measurement, not counted
+    :type warmup: float
+    :returns: summary
+    :rtype: dict
+    """
+
+    if warmup:
+        run(urls, concurrency, warmup)
+    return run(urls, concurrency, duration)
+
+
+def run(urls, concurrency, duration):
+    """Runs workers for given number of seconds and summarizes their results.
+
+    :param urls: URLs requested in turn
+    :type urls: list[str]
+    :param concurrency: number of workers
+    :type concurrency: int
+    :param duration: seconds to run
+    :type duration: float
+    :rtype: dict
+    """
+
+    deadline = time.monotonic() + duration
+    workers = [Worker(urls, deadline) for _ in range(concurrency)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    latencies = sorted(latency for worker in workers for latency in worker.latencies)
+    summary = {
+        'requests': len(latencies),
+        'errors': sum(worker.errors for worker in workers),
+        'throughput': len(latencies) / duration,
+    }
+    if latencies:
+        summary.update(
+            {
+                f'{name}_ms': value * 1000
+                for name, value in (
+                    ('mean', statistics.mean(latencies)),
+                    ('p50', percentile(latencies, 0.5)),
+                    ('p90', percentile(latencies, 0.9)),
+                    ('p99', percentile(latencies, 0.99)),
+                    ('max', latencies[-1]),
+                )
+            }
+        )
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Measures throughput and latency of HTTP endpoints.'
+    )
+    parser.add_argument('urls', nargs='+', help='URLs requested in turn')
+    parser.add_argument(
+        '--concurrency', type=int, default=10, help='number of connections'
+    )
+    parser.add_argument(
+        '--duration', type=float, default=10, help='seconds of measurement'
+    )
+    parser.add_argument(
+        '--warmup', type=float, default=2, help='seconds of requests not measured'
+    )
+    args = parser.parse_args()
+
+    print(json.dumps(main(args.urls, args.concurrency, args.duration, args.warmup)))
@@ -1,11 +1,25 @@
 import json
+import hashlib
+import logging
+import unicodedata
 import pandas as pd
 import numpy as np
+import pkg_resources
 
 from abc import ABC, abstractmethod, abstractproperty
+from collections import Counter
+from functools import lru_cache
 from pathlib import Path
+from django.conf import settings
+from django.utils.translation import override
 from django_countries import countries
 
+from myflights.apps.core.utils import parse_script_args
+
+# Rows of row group of Parquet file or record batch of Arrow file,
+# parallel importers split columnar files by them
+ROW_GROUP_SIZE = 10000
+
 
 def meter_from_feet(feet):
     """Converts feet to meters.
@@ -19,6 +33,156 @@ def meter_from_feet(feet):
     return feet * ratio
 
 
+def normalize_country_name(name):
+    """Normalizes country name for lookups: strips accents, extra whitespace and case.
+
+    :param name: human readable country name
+    :type name: str
+    :returns: normalized country name
+    :rtype: str
+    """
+
+    ascii_name = (
+        unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('ascii')
+    )
+    return ' '.join(ascii_name.split()).casefold()
+
+
+class CountryResolver:
+    """Converts country names to ISO-3166 alpha-2 country codes using map
+    of normalized names. The map is built once from `django_countries` and cached
+    to disk, names from alias table in data directory take precedence over it.
+    """
+
+    cache_filename = Path('.cache') / 'countries.json'
+    aliases_filename = 'country_aliases.json'
+
+    def __init__(self, data_dir=Path('data')):
+        """Initializes CountryResolver instance.
+
+        :param data_dir: path to directory with alias table and cache.
+        Default is './data'
+        :type data_dir: pathlib.Path
+        """
+        self.cache_file = data_dir / self.cache_filename
+        self.aliases_file = data_dir / self.aliases_filename
+        self.unmapped = Counter()
+        self.codes = self._load_codes()
+        self.codes.update(self._load_aliases())
+
+    def _cache_key(self):
+        """Makes key identifying `django_countries` data cached to disk.
+
+        :rtype: str
+        """
+        version = pkg_resources.get_distribution('django-countries').version
+        options = [
+            getattr(settings, option, None)
+            for option in ('COUNTRIES_OVERRIDE', 'COUNTRIES_ONLY')
+        ]
+        content = json.dumps([version, options], sort_keys=True, default=str)
+        return hashlib.sha1(content.encode()).hexdigest()
+
+    def _build_codes(self):
+        """Builds map of normalized English country names, including old ones,
+        to country codes.
+
+        :rtype: Dict[str, str]
+        """
+
+        codes = {}
+        with override('en'):
+            for code, name in countries:
+                for old_name in countries.OLD_NAMES.get(code, ()):
+                    codes[normalize_country_name(str(old_name))] = code
+                codes[normalize_country_name(str(name))] = code
+        return codes
+
+    def _load_codes(self):
+        """Loads country names map from disk cache, rebuilds and caches it
+        if it is missing or outdated.
+
+        :rtype: Dict[str, str]
+        """
+
+        key = self._cache_key()
+        if self.cache_file.exists():
+            with open(self.cache_file) as f:
+                cache = json.load(f)
+            if cache.get('key') == key:
+                return cache['codes']
+
+        codes = self._build_codes()
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.cache_file, 'w') as f:
+            json.dump({'key': key, 'codes': codes}, f)
+        return codes
+
+    def _load_aliases(self):
+        """Loads alias table mapping country names to codes if it exists.
+
+        :rtype: Dict[str, str]
+        """
+
+        if not self.aliases_file.exists():
+            return {}
+
+        with open(self.aliases_file) as f:
+            aliases = json.load(f)
+        return {normalize_country_name(name): code for name, code in aliases.items()}
+
+    def code(self, name):
+        """Converts given country name to corresponding ISO-3166 alpha-2 country code.
+
+        :param name: human readable country name
+        :type name: str
+        :returns: ISO-3166 alpha-2 country code or None if not found
+        :rtype: str
+        """
+
+        if not isinstance(name, str):
+            return None
+        return self.codes.get(normalize_country_name(name))
+
+    def resolve(self, names):
+        """Converts Series of country names to country codes. Every distinct name is
+        looked up once, unmapped names are counted in `unmapped`.
+
+        :param names: human readable country names
+        :type names: pandas.Series
+        :returns: ISO-3166 alpha-2 country codes, NaN where name is not found
+        :rtype: pandas.Series
+        """
+
+        categories = names.astype('category')
+        mapping = {name: self.code(name) for name in categories.cat.categories}
+
+        counts = categories.value_counts()
+        self.unmapped.update(
+            {name: int(counts[name]) for name, code in mapping.items() if code is None}
+        )
+
+        return categories.map(mapping).astype(object)
+
+    def log_unmapped(self):
+        """Logs names which were not resolved to country codes with number of rows.
+        """
+
+        for name, count in self.unmapped.most_common():
+            logging.warning(f'Country {name!r} is not mapped to code ({count} rows)')
+
+
+@lru_cache(maxsize=None)
+def country_resolver(data_dir):
+    """Returns shared CountryResolver for given data directory.
+
+    :param data_dir: path to directory with alias table and cache.
+    :type data_dir: pathlib.Path
+    :rtype: CountryResolver
+    """
+    return CountryResolver(data_dir)
+
+
 def country_code_by_name(name):
     """Converts given country name to corresponding ISO-3166 alpha-2 country code.
 
@@ -27,16 +191,7 @@ def country_code_by_name(name):
     :returns: ISO-3166 alpha-2 country code
     :rtype: str
     """
-
-    if name is None:
-        return None
-    elif name == 'United States':
-        return 'US'
-    elif name == 'Cote d\'Ivoire':
-        return 'CI'
-    else:
-        code = countries.by_name(name)
-        return code if code else None
+    return country_resolver(Path('data')).code(name)
 
 
 class DataPurger(ABC):
@@ -44,6 +199,9 @@ class DataPurger(ABC):
     clean up and convert pre-fetched historical flights data.
     """
 
+    # Column types of prepared data, kept by columnar formats.
+    dtypes = {}
+
     def __init__(self, data_dir=Path('data')):
         """Initializes DataPurger instance.
 
@@ -53,6 +211,7 @@ class DataPurger(ABC):
         self.data_dir = data_dir
         self.dataframe = None
         self.all_metadata = {}
+        self.countries = country_resolver(data_dir)
 
         metadata_file = self.data_dir / 'metadata.json'
         with open(metadata_file) as f:
@@ -118,19 +277,66 @@ class DataPurger(ABC):
         labels = self.metadata['labels']
         self.dataframe = pd.read_csv(self.csv_file, header=None, names=labels)
 
-    def write(self):
-        """Write current state of DataFrame to corresponding by metadata json file.
+    def typed_dataframe(self):
+        """Converts columns of current DataFrame to types declared in `dtypes`.
+        Values which could not be converted become missing.
+
+        :returns: DataFrame with declared column types
+        :rtype: pandas.DataFrame
+        """
+
+        df = self.dataframe.reset_index(drop=True)
+        for column, dtype in self.dtypes.items():
+            values = df[column]
+            if dtype == 'boolean':
+                values = values.map({True: True, False: False})
+            elif dtype not in ('string', 'category'):
+                values = pd.to_numeric(values, errors='coerce')
+            df[column] = values.astype(dtype)
+        return df
+
+    def write(self, data_format='json'):
+        """Writes current state of DataFrame to corresponding by metadata file.
+
+        :param data_format: 'json', 'jsonl' (JSON Lines), 'parquet' or 'arrow'
+        (Arrow IPC). Columnar formats keep column types declared in `dtypes`.
+        Default is 'json'
+        :type data_format: str
         """
-        string = self.dataframe.to_json(orient='records')
-        data = json.loads(string)
-        with open(self.json_file, 'w') as f:
-            json.dump(data, f, indent=2)
+
+        file = self._data_file_with_suffix(f'.{data_format}')
+
+        if data_format == 'json':
+            self.dataframe.to_json(file, orient='records')
+        elif data_format == 'jsonl':
+            self.dataframe.to_json(file, orient='records', lines=True)
+        elif data_format == 'parquet':
+            self.typed_dataframe().to_parquet(
+                file, index=False, row_group_size=ROW_GROUP_SIZE
+            )
+        elif data_format == 'arrow':
+            self.typed_dataframe().to_feather(
+                file, compression='uncompressed', chunksize=ROW_GROUP_SIZE
+            )
+        else:
+            raise ValueError(f'Unknown data format {data_format!r}')
 
 
 class AirlineDataPurger(DataPurger):
     """Takes care of Airlines related historical data.
     """
 
+    dtypes = {
+        'openflights_id': 'Int32',
+        'name': 'string',
+        'alias': 'string',
+        'iata': 'string',
+        'icao': 'string',
+        'callsign': 'string',
+        'country': 'category',
+        'is_active': 'boolean',
+    }
+
     @property
     def metadata_key(self):
         """Key to be used to get sub-dictionary from metadata corresponding to Airlines.
@@ -144,7 +350,7 @@ class AirlineDataPurger(DataPurger):
 
         df = df.replace(['\\N', '-'], np.nan)
         df = df.dropna(subset=['country'])
-        df['country'] = df['country'].apply(country_code_by_name)
+        df['country'] = self.countries.resolve(df['country'])
         df = df.dropna(subset=['country'])
         df['is_active'] = df['is_active'].replace(['Y'], True).replace(['N'], False)
 
@@ -155,6 +361,14 @@ class RouteDataPurger(DataPurger):
     """Takes care of Routes related historical data.
     """
 
+    dtypes = {
+        'airline': 'Int32',
+        'origin_airport': 'Int32',
+        'destination_airport': 'Int32',
+        'stops': 'Int8',
+        'equipment': 'string',
+    }
+
     @property
     def metadata_key(self):
         """Key to be used to get sub-dictionary from metadata corresponding to Routes.
@@ -185,6 +399,20 @@ class AirportDataPurger(DataPurger):
     """Takes care of Airports related historical data.
     """
 
+    dtypes = {
+        'openflights_id': 'Int32',
+        'name': 'string',
+        'city_name': 'string',
+        'country': 'category',
+        'iata': 'string',
+        'icao': 'string',
+        'latitude': 'float64',
+        'longitude': 'float64',
+        'altitude': 'float64',
+        'timezone_offset': 'float64',
+        'timezone': 'string',
+    }
+
     @property
     def metadata_key(self):
         """Key to be used to get sub-dictionary from metadata corresponding to Airports.
@@ -197,7 +425,7 @@ class AirportDataPurger(DataPurger):
         df = self.dataframe
 
         df['altitude'] = df['altitude'].apply(meter_from_feet)
-        df['country'] = df['country'].apply(country_code_by_name)
+        df['country'] = self.countries.resolve(df['country'])
         df = df.dropna()
 
         df = df.replace(['\\N'], np.nan)
@@ -209,14 +437,21 @@ class AirportDataPurger(DataPurger):
         self.dataframe = df
 
 
-def main():
+def main(data_format='json'):
     purgers = [AirlineDataPurger(), RouteDataPurger(), AirportDataPurger()]
 
     for purger in purgers:
         purger.load()
         purger.cleanup()
-        purger.write()
+        purger.write(data_format)
 
+    for resolver in {purger.countries for purger in purgers}:
+        resolver.log_unmapped()
 
-def run():
-    main()
+
+def run(*args):
+    """Prepares data. Pass `--script-args format=parquet` to write data
+    in other format: 'jsonl', 'parquet' or 'arrow'. Default is 'json'.
+    """
+    options = parse_script_args(args)
+    main(data_format=options.get('format', 'json'))